@@ -0,0 +1,90 @@
+"""
+generate.py: writes synthetic LHE files of configurable size and
+multiplicity for the benchmarks.
+
+The events conserve momentum, with massless final state partons and
+leptons and two incoming partons along the beam axis, so they pass the
+validation of the readers.
+"""
+import argparse
+import numpy as np
+
+
+INIT_BLOCK = """<init>
+  2212  2212  6.5000000e+03  6.5000000e+03 0 0 303400 303400 -3 1
+  1.2500000e+01  5.0000000e-01  1.0000000e+00  1
+</init>
+"""
+
+# pdg ids drawn for the final state particles
+FINAL_IDS = [1, 2, 3, 4, 5, 21, 21, 21, -1, -2, 11, -12]
+
+
+def event_block(rng, multiplicity: int, n_weights: int):
+    """
+    Returns the text of one event with `multiplicity` final state particles.
+
+    :param rng: numpy random Generator.
+    :param multiplicity: int number of final state particles, at least 2.
+    :param n_weights: int number of entries of the <weights> block.
+    """
+    pt = rng.exponential(40., multiplicity) + 20.
+    phi = rng.uniform(-np.pi, np.pi, multiplicity)
+    rap = rng.uniform(-4., 4., multiplicity)
+    px, py = pt * np.cos(phi), pt * np.sin(phi)
+    # the last particle balances the transverse momentum of the others
+    px[-1], py[-1] = -np.sum(px[:-1]), -np.sum(py[:-1])
+    pt[-1] = np.hypot(px[-1], py[-1])
+    pz, e = pt * np.sinh(rap), pt * np.cosh(rap)
+
+    plus, minus = (np.sum(e) + np.sum(pz)) / 2., (np.sum(e) - np.sum(pz)) / 2.
+    lines = ["<event>",
+             " {} 1 {:.6e} 9.1188000e+01 7.5467711e-03 1.1800000e-01".format(
+                 multiplicity + 2, rng.uniform(0.5, 1.5))]
+    particles = [(21, -1, 0, 0, 0., 0., plus, plus), (21, -1, 0, 0, 0., 0., -minus, minus)]
+    particles += [(int(pdg), 1, 1, 2, x, y, z, en)
+                  for pdg, x, y, z, en in zip(rng.choice(FINAL_IDS, multiplicity), px, py, pz, e)]
+    for (pdg, status, m1, m2, x, y, z, en) in particles:
+        lines.append(" {:>8d} {:>2d} {:>4d} {:>4d}    0    0 {:.10e} {:.10e} {:.10e} {:.10e} "
+                     "0.0000000000e+00 0.0000e+00 9.0000e+00".format(pdg, status, m1, m2,
+                                                                     x, y, z, en))
+    weights = rng.uniform(0.5, 1.5, n_weights)
+    lines.append("<weights> " + " ".join("{:.6e}".format(w) for w in weights) + " </weights>")
+    lines.append("</event>")
+    return "\n".join(lines) + "\n"
+
+
+def write_sample(filename: str, n_events: int = 10000, multiplicity=(2, 6),
+                 n_weights: int = 3, seed: int = 1):
+    """
+    Writes a synthetic LHE file and returns its name.
+
+    :param filename: str name of the file.
+    :param n_events: int number of events.
+    :param multiplicity: int number of final state particles of each event,
+           or (min, max) tuple of the range they are drawn from.
+    :param n_weights: int number of weights of each event.
+    :param seed: int seed of the random numbers, so samples are reproducible.
+    """
+    low, high = (multiplicity, multiplicity) if (np.ndim(multiplicity) == 0) else multiplicity
+    if (low < 2):
+        raise(ValueError("Events need at least two final state particles"))
+    rng = np.random.default_rng(seed)
+    with open(filename, "w") as f:
+        f.write('<LesHouchesEvents version="3.0">\n<header>\n<!-- synthetic -->\n</header>\n')
+        f.write(INIT_BLOCK)
+        for mult in rng.integers(low, high + 1, n_events):
+            f.write(event_block(rng, int(mult), n_weights))
+        f.write("</LesHouchesEvents>\n")
+    return filename
+
+
+if __name__ == """__main__""":
+    parser = argparse.ArgumentParser(description="Write a synthetic LHE file.")
+    parser.add_argument("filename")
+    parser.add_argument("-n", "--events", type=int, default=10000)
+    parser.add_argument("-m", "--multiplicity", type=int, nargs=2, default=[2, 6])
+    parser.add_argument("-w", "--weights", type=int, default=3)
+    parser.add_argument("-s", "--seed", type=int, default=1)
+    args = parser.parse_args()
+    write_sample(args.filename, args.events, tuple(args.multiplicity), args.weights, args.seed)
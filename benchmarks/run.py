@@ -0,0 +1,192 @@
+"""
+run.py: benchmarks of the reading, event construction, validation,
+image filling and rendering hot paths on synthetic LHE files.
+
+Each benchmark reports the events processed per second, from the best of
+several repeats, and the peak memory allocated by python in a separate
+traced run. Results are written as json and can be compared against a
+stored baseline, e.g.:
+
+    $ python run.py -n 20000 -o baseline.json
+    $ python run.py -n 20000 -o results.json --baseline baseline.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from EventPlotter import EventBatch, Plotter, ReaderLHEF
+from generate import write_sample
+
+
+def bench_parse(sample):
+    for batch in ReaderLHEF(sample["filename"], wgt_idx=0, validate="none").iter_batches(10000):
+        pass
+
+
+def bench_construct(sample):
+    for ev in ReaderLHEF(sample["filename"], wgt_idx=0, validate="none"):
+        pass
+
+
+def bench_validate_events(sample):
+    for ev in sample["events"]:
+        ev.check_momentum()
+
+
+def bench_validate_batch(sample):
+    sample["batch"].check_momentum()
+
+
+def bench_image(sample):
+    for ev in sample["events"]:
+        sample["plotter"].get_image(ev)
+
+
+def bench_image_batch(sample):
+    sample["plotter"].accumulator().fill(sample["batch"])
+
+
+def bench_render(sample):
+    renderer = sample["plotter"].renderer()
+    with tempfile.TemporaryDirectory() as tmp:
+        for idx, image in enumerate(sample["images"]):
+            renderer.render(image, os.path.join(tmp, "{}.png".format(idx)))
+
+
+# name: (function, whether it processes only the rendered images)
+BENCHMARKS = {
+    "parse": (bench_parse, False),
+    "construct": (bench_construct, False),
+    "validate_events": (bench_validate_events, False),
+    "validate_batch": (bench_validate_batch, False),
+    "image": (bench_image, False),
+    "image_batch": (bench_image_batch, False),
+    "render": (bench_render, True),
+}
+
+
+def measure(func, sample, repeat: int):
+    """
+    Returns the best time of `repeat` calls of func(sample) and the peak
+    memory in MB allocated during a further traced call.
+    """
+    times = []
+    for idx in range(repeat):
+        start = time.perf_counter()
+        func(sample)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(sample)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), peak / 2**20
+
+
+def run(n_events: int, multiplicity, n_weights: int, n_render: int, repeat: int,
+        names=None, seed: int = 1):
+    """
+    Runs the benchmarks on a new synthetic sample and returns the results.
+
+    :param n_events: int number of events of the sample.
+    :param multiplicity: (min, max) numbers of final state particles.
+    :param n_weights: int number of weights of each event.
+    :param n_render: int number of images rendered.
+    :param repeat: int number of timed repeats of each benchmark.
+    :param names: optional list of the names of the benchmarks to run.
+    :param seed: int seed of the sample.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = write_sample(os.path.join(tmp, "sample.lhe"), n_events, multiplicity,
+                                n_weights, seed)
+        events = list(ReaderLHEF(filename, wgt_idx=0, validate="none"))
+        plotter = Plotter(rap_extent=[-4.5, 4.5], bins=50, include_wgt=True)
+        sample = {"filename": filename,
+                  "events": events,
+                  "batch": EventBatch.concatenate(
+                      ReaderLHEF(filename, wgt_idx=0, validate="none").iter_batches(10000)),
+                  "plotter": plotter,
+                  "images": [plotter.get_image(ev) for ev in events[:n_render]]}
+
+        for name in (names or BENCHMARKS):
+            func, renders = BENCHMARKS[name]
+            seconds, peak = measure(func, sample, repeat)
+            n = len(sample["images"]) if (renders) else n_events
+            results[name] = {"n_events": n,
+                             "seconds": seconds,
+                             "events_per_s": n / seconds if (seconds > 0) else float("inf"),
+                             "peak_mb": peak}
+            print("{:<16} {:>12.1f} events/s {:>10.1f} MB".format(
+                name, results[name]["events_per_s"], peak))
+    return results
+
+
+def compare(results, baseline, tolerance: float):
+    """
+    Prints the ratio of the rates of each benchmark to the baseline and
+    returns the names of those slower by more than `tolerance`.
+
+    :param results: dict of results of run.
+    :param baseline: dict of baseline results.
+    :param tolerance: float fraction of the baseline rate allowed to be lost.
+    """
+    slower = []
+    for name, result in results.items():
+        if (name not in baseline):
+            continue
+        ratio = result["events_per_s"] / baseline[name]["events_per_s"]
+        flag = ""
+        if (ratio < 1. - tolerance):
+            slower.append(name)
+            flag = "  REGRESSION"
+        print("{:<16} {:>8.2f}x baseline{}".format(name, ratio, flag))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the EventPlotter benchmarks.")
+    parser.add_argument("-n", "--events", type=int, default=10000)
+    parser.add_argument("-m", "--multiplicity", type=int, nargs=2, default=[2, 6])
+    parser.add_argument("-w", "--weights", type=int, default=3)
+    parser.add_argument("--render", type=int, default=50, help="number of images rendered")
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-b", "--bench", nargs="+", choices=list(BENCHMARKS))
+    parser.add_argument("-s", "--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", help="json file the results are written to")
+    parser.add_argument("--baseline", help="json file of results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="fraction of the baseline rate allowed to be lost")
+    args = parser.parse_args(argv)
+
+    results = run(args.events, tuple(args.multiplicity), args.weights, args.render,
+                  args.repeat, args.bench, args.seed)
+    output = {"meta": {"date": datetime.datetime.now().isoformat(timespec="seconds"),
+                       "python": platform.python_version(),
+                       "numpy": np.__version__,
+                       "platform": platform.platform(),
+                       "events": args.events,
+                       "multiplicity": args.multiplicity,
+                       "weights": args.weights,
+                       "seed": args.seed},
+              "results": results}
+    if (args.output):
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+
+    if (args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        if (compare(results, baseline, args.tolerance)):
+            return 1
+    return 0
+
+
+if __name__ == """__main__""":
+    sys.exit(main())
@@ -2,26 +2,21 @@
 lhe-analysis.py: example showing application of LHE reading methods
 to produce 1D histograms with matplotlib.
 
-To use, unzip the sample LHE file in the test directory.
+The sample LHE file used may be found in the `test` directory.
 """
-from EventPlotter import Particle, Event, ReaderLHEF
+from EventPlotter import Histogram1D, ReaderLHEF, observables
 import numpy as np
 import matplotlib.pyplot as plt
-import os
 
 
-def H_T(event):
+def H_T(batch):
     """
     Calculates the scalar sum of transverse momenta in the final
-    state of an event.
+    state of each event in a batch.
 
-    :param event: event for which to calculate
+    :param batch: EventBatch for which to calculate
     """
-    ht = 0.
-    for part in event:
-        if part.is_final():
-            ht += part.perp()
-    return ht
+    return observables.h_t(batch)
 
 
 def main(filename):
@@ -33,29 +28,22 @@ def main(filename):
     """
     reading = ReaderLHEF(str(filename), wgt_idx=0)
  
-    bins = np.linspace(0, 1000, 25)
-    data = bins*0.
+    hist = Histogram1D(np.linspace(0, 1000, 25), path="/H_T")
 
-    for ev in reading:
-       x = H_T(ev)
-       for j, edge in enumerate(bins):
-           if edge > x:
-                data[j] += ev.wgt
-                break
+    for batch in reading.iter_batches(10000):
+        hist.fill(H_T(batch), batch.wgt)
 
-    data /= np.sum(data)
+    hist.scale(1. / hist.integral(flow=True))
 
     plt.rc('text', usetex=True)
     plt.rc('font', family='serif')
     plt.xlabel(r"$H_T$ [GeV]")
     plt.ylabel(r"$d\sigma/dH_T$ [pb/GeV]")
 
-    plt.step(bins, data, where="pre")
+    plt.hist(hist.edges[:-1], hist.edges, weights=hist.values(), histtype="step")
     plt.show()
     plt.clf()
 
 
 if __name__ == """__main__""":
-    os.system("gunzip ../test/HEJFOG.lhe.gz")
-    main("../test/HEJFOG.lhe")
-    os.system("gzip ../test/HEJFOG.lhe")
+    main("../test/HEJFOG.lhe.gz")
@@ -5,7 +5,6 @@ to produce 2D histogram plots with the Plotter class
 The LHE file used may be found in the `test` directory.
 """
 from EventPlotter import Particle, Event, Plotter, ReaderLHEF
-import os
 
 
 def energy_over_perp(particle):
@@ -41,6 +40,4 @@ def main(filename):
 
 
 if __name__ == """__main__""":
-    os.system("gunzip ../test/HEJFOG.lhe.gz")
-    main("../test/HEJFOG.lhe")
-    os.system("gzip ../test/HEJFOG.lhe")
+    main("../test/HEJFOG.lhe.gz")
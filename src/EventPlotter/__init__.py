@@ -4,15 +4,30 @@ events in high energy physics.
 
 This package includes classes for particles and events
 in high energy physics (HEP) as well as functionality
-for reading events as output in the LHE format used for
-MC event generators.
+for reading events as output in the LHE and HepMC3 formats
+used for MC event generators.
 
 The plotter class allows for a novel method of analysis
 for events, including invaluable visualisation in the
 rapidity-azimuthal angle plane.
 """
 from .particle import Particle
-from .event import Event
-from .reader import Reader, ReaderLHEF
-from .plotter import Plotter
+from .event import Event, ValidationError
+from .batch import ParticleTable, ParticleView, EventBatch
+from .lhe import LHEParser, LHEInit, LHERecord
+from .hepmc import HepMCParser, HepMCRun, HepMCRecord
+from .selection import Selection
+from .reader import Reader, ReaderLHEF, ReaderHepMC3, open_events, register_reader
+from .index import build_index, load_index
+from .cache import ReaderCache, write_cache
+from .export import export_events, write_parquet, write_hdf5, ReaderParquet, ReaderHDF5
+from .prefetch import PrefetchReader
+from .parallel import ParallelReader, read_many
+from .summary import WeightSummary, summarise
+from .histogram import Histogram1D, Histogram2D
+from .plotter import Plotter, ImageAccumulator
+from .render import FigureRenderer, render_many
+from . import kinematics
+from . import observables
+from . import profiling
 from .utils import *
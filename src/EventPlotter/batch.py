@@ -0,0 +1,589 @@
+#!/usr/bin/env python
+"""
+Columnar particle table and event batch definitions.
+"""
+import itertools
+import numpy as np
+import pylorentz
+from . import kinematics
+from . import profiling
+from .particle import Particle
+from .event import Event, ROLE_UNKNOWN, ROLE_INCOMING, ROLE_FINAL, particle_roles
+
+
+class ParticleView(Particle):
+    """
+    Lightweight view of a single row of a ParticleTable.
+
+    Behaves as a Particle, but reads and writes its data directly
+    from and to the columns of the parent table, so no per-particle
+    storage is allocated.
+
+    Kinematics are computed from the table on every call rather than
+    cached, since the table may be modified independently of the view.
+
+    :param table: ParticleTable holding the particle data.
+    :param row: int, row of the particle in the table.
+    """
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table, row: int):
+        self._table = table
+        self._row = row
+
+    def __repr__(self):
+        return ("ParticleView(pdg={}, status={}, px={}, py={}, pz={}, e={}, m={})"
+                .format(self.pdg, self.status, self.px, self.py, self.pz, self.e, self.m))
+
+    @property
+    def pdg(self):
+        return int(self._table.pdg[self._row])
+
+    @pdg.setter
+    def pdg(self, val):
+        self._table.pdg[self._row] = val
+
+    @property
+    def status(self):
+        return int(self._table.status[self._row])
+
+    @status.setter
+    def status(self, val):
+        self._table.status[self._row] = val
+
+    @property
+    def mothers(self):
+        return tuple(int(i) for i in self._table.mothers[self._row])
+
+    @mothers.setter
+    def mothers(self, val):
+        self._table.mothers[self._row] = val
+
+    @property
+    def daughters(self):
+        return tuple(int(i) for i in self._table.daughters[self._row])
+
+    @daughters.setter
+    def daughters(self, val):
+        self._table.daughters[self._row] = val
+
+    @property
+    def cols(self):
+        return tuple(int(i) for i in self._table.cols[self._row])
+
+    @cols.setter
+    def cols(self, val):
+        self._table.cols[self._row] = val
+
+    @property
+    def px(self):
+        return float(self._table.px[self._row])
+
+    @px.setter
+    def px(self, val):
+        self._table.px[self._row] = val
+
+    @property
+    def py(self):
+        return float(self._table.py[self._row])
+
+    @py.setter
+    def py(self, val):
+        self._table.py[self._row] = val
+
+    @property
+    def pz(self):
+        return float(self._table.pz[self._row])
+
+    @pz.setter
+    def pz(self, val):
+        self._table.pz[self._row] = val
+
+    @property
+    def e(self):
+        return float(self._table.e[self._row])
+
+    @e.setter
+    def e(self, val):
+        self._table.e[self._row] = val
+
+    @property
+    def m(self):
+        return float(self._table.m[self._row])
+
+    @m.setter
+    def m(self, val):
+        self._table.m[self._row] = val
+
+    @property
+    def check_on_shell(self):
+        return False
+
+    @property
+    def momentum(self):
+        """
+        Returns the momentum of the particle.
+        """
+        return pylorentz.Momentum4(self.e, self.px, self.py, self.pz)
+
+    def __getstate__(self):
+        return (self._table, self._row)
+
+    def __setstate__(self, state):
+        self._table, self._row = state
+
+    def m_calc(self):
+        return kinematics.mass(self.px, self.py, self.pz, self.e)
+
+    def rap(self):
+        return kinematics.rapidity(self.pz, self.e)
+
+    def eta(self):
+        return kinematics.pseudorapidity(self.px, self.py, self.pz)
+
+    def phi(self):
+        return kinematics.phi(self.px, self.py)
+
+    def perp(self):
+        return kinematics.perp(self.px, self.py)
+
+
+class ParticleTable():
+    """
+    Columnar storage of particle data in contiguous numpy arrays.
+
+    Indexing with an int returns a ParticleView of that row, while
+    slicing returns a ParticleTable whose columns are views into the
+    columns of this table, so no data is copied.
+
+    :param pdg: int array of pdg ids.
+    :param status: int array of (Pythia) status codes.
+    :param mothers: (n, 2) int array of mother indices.
+    :param daughters: (n, 2) int array of daughter indices.
+    :param cols: (n, 2) int array of col, anticol values.
+    :param px, py, pz, e: float arrays of momentum components.
+    :param m: float array of particle masses.
+    :param roles: int8 array of the role index of the particles, one of
+           the ROLE_ codes of the event module, by default ROLE_UNKNOWN.
+    """
+
+    COLUMNS = ("pdg", "status", "mothers", "daughters", "cols",
+               "px", "py", "pz", "e", "m", "roles")
+
+    def __init__(self, pdg=None, status=None, mothers=None, daughters=None, cols=None,
+                 px=None, py=None, pz=None, e=None, m=None, roles=None):
+        n = 0 if (pdg is None) else len(pdg)
+        self.pdg = self._column(pdg, n, np.int64)
+        self.status = self._column(status, n, np.int64)
+        self.mothers = self._column(mothers, (n, 2), np.int64)
+        self.daughters = self._column(daughters, (n, 2), np.int64)
+        self.cols = self._column(cols, (n, 2), np.int64)
+        self.px = self._column(px, n, np.float64)
+        self.py = self._column(py, n, np.float64)
+        self.pz = self._column(pz, n, np.float64)
+        self.e = self._column(e, n, np.float64)
+        self.m = self._column(m, n, np.float64)
+        self.roles = (np.full(n, ROLE_UNKNOWN, dtype=np.int8) if (roles is None)
+                      else np.asarray(roles, dtype=np.int8))
+
+        for name in ParticleTable.COLUMNS:
+            if (len(getattr(self, name)) != n):
+                raise(ValueError("All columns of a particle table must have the same length"))
+
+    @staticmethod
+    def _column(data, shape, dtype):
+        """
+        Converts data to a contiguous array, or zeros if not provided.
+        """
+        if (data is None):
+            return np.zeros(shape, dtype=dtype)
+        return np.asarray(data, dtype=dtype)
+
+    @classmethod
+    def from_particles(cls, particles):
+        """
+        Builds a table from an array-like container of Particles.
+
+        :param particles: array-like container of EventPlotter Particles.
+        """
+        particles = list(particles)
+        n = len(particles)
+        table = cls(pdg=np.zeros(n, dtype=np.int64))
+        for idx, p in enumerate(particles):
+            table[idx] = p
+        return table
+
+    @classmethod
+    def concatenate(cls, tables):
+        """
+        Joins several tables into a single contiguous table.
+
+        :param tables: array-like container of ParticleTables.
+        """
+        tables = list(tables)
+        if (not tables):
+            return cls()
+        return cls(**{name: np.concatenate([getattr(t, name) for t in tables])
+                      for name in cls.COLUMNS})
+
+    def __len__(self):
+        """
+        Number of particles in the table.
+        """
+        return len(self.pdg)
+
+    def __getitem__(self, idx):
+        """
+        Returns a ParticleView for an int index or a table view for a slice.
+        """
+        if (isinstance(idx, slice)):
+            return ParticleTable(**{name: getattr(self, name)[idx]
+                                    for name in ParticleTable.COLUMNS})
+
+        n = len(self)
+        if (idx < -n or idx >= n):
+            raise(IndexError("Particle index out of range"))
+        return ParticleView(self, idx % n)
+
+    def __setitem__(self, idx, val):
+        """
+        Writes the data of a Particle into row `idx` of the table, whose
+        role is reset to ROLE_UNKNOWN.
+        """
+        for name in Particle.FIELDS[:-1]:
+            getattr(self, name)[idx] = getattr(val, name)
+        self.roles[idx] = ROLE_UNKNOWN
+
+    def __iter__(self):
+        """
+        Yields a ParticleView for each row of the table.
+        """
+        for idx in range(len(self)):
+            yield ParticleView(self, idx)
+
+    def m_calc(self):
+        """
+        Masses of all particles calculated from their momenta.
+        """
+        return kinematics.mass(self.px, self.py, self.pz, self.e)
+
+    def rap(self):
+        """
+        Rapidities of all particles, +/-inf along the beam axis.
+        """
+        return kinematics.rapidity(self.pz, self.e)
+
+    def eta(self):
+        """
+        Pseudorapidities of all particles, +/-inf along the beam axis.
+        """
+        return kinematics.pseudorapidity(self.px, self.py, self.pz)
+
+    def phi(self):
+        """
+        Azimuthal angles of all particles.
+        """
+        return kinematics.phi(self.px, self.py)
+
+    def perp(self):
+        """
+        Transverse momenta of all particles.
+        """
+        return kinematics.perp(self.px, self.py)
+
+    def to_particles(self):
+        """
+        Returns a list of independent Particle copies of the table rows.
+        """
+        return [Particle(pdg=p.pdg, status=p.status, mothers=p.mothers,
+                         daughters=p.daughters, cols=p.cols, px=p.px, py=p.py,
+                         pz=p.pz, e=p.e, m=p.m, check_on_shell=False)
+                for p in self]
+
+
+class EventBatch():
+    """
+    Batch of events stored as a jagged ParticleTable.
+
+    The particles of event i occupy rows offsets[i]:offsets[i+1] of the
+    table and event-level quantities are held in arrays of length equal
+    to the number of events.
+
+    Indexing with an int returns an Event whose particles are views into
+    the table, so existing analysis code can be used unchanged, while
+    bulk code can operate on the columns of `table` directly.
+
+    :param table: ParticleTable holding the particles of all events.
+    :param offsets: int array of length n_events + 1 with the first row of
+           each event and the total number of particles as the last entry.
+    :param root_s, mur, muf, x_plus, x_minus, wgt: float arrays of the
+           event-level quantities as in Event.
+    :param weights: optional (n_events, n_weights) float array of all the
+           weights of each event, e.g. scale and PDF variations.
+    :param weight_ids: optional list of the ids of the weights, None where
+           unnamed.
+    """
+
+    EVENT_COLUMNS = ("root_s", "mur", "muf", "x_plus", "x_minus", "wgt")
+
+    def __init__(self, table: ParticleTable = None, offsets=None,
+                 root_s=None, mur=None, muf=None, x_plus=None, x_minus=None, wgt=None,
+                 weights=None, weight_ids=None):
+        self.table = ParticleTable() if (table is None) else table
+        self.offsets = (np.zeros(1, dtype=np.int64) if (offsets is None)
+                        else np.asarray(offsets, dtype=np.int64))
+        if (len(self.offsets) < 1 or self.offsets[0] != 0
+                or self.offsets[-1] != len(self.table) or np.any(np.diff(self.offsets) < 0)):
+            raise(ValueError("Offsets must increase from 0 to the number of particles"))
+
+        n = len(self.offsets) - 1
+        self.root_s = ParticleTable._column(root_s, n, np.float64)
+        self.mur = ParticleTable._column(mur, n, np.float64)
+        self.muf = ParticleTable._column(muf, n, np.float64)
+        self.x_plus = ParticleTable._column(x_plus, n, np.float64)
+        self.x_minus = ParticleTable._column(x_minus, n, np.float64)
+        self.wgt = (np.ones(n, dtype=np.float64) if (wgt is None)
+                    else np.asarray(wgt, dtype=np.float64))
+
+        self.weights = (np.zeros((n, 0)) if (weights is None)
+                        else np.asarray(weights, dtype=np.float64))
+        if (self.weights.ndim != 2):
+            self.weights = self.weights.reshape(n, -1) if (self.weights.size) else np.zeros((n, 0))
+        self.weight_ids = ([None] * self.weights.shape[1] if (weight_ids is None)
+                           else list(weight_ids))
+
+        for name in EventBatch.EVENT_COLUMNS + ("weights",):
+            if (len(getattr(self, name)) != n):
+                raise(ValueError("All event columns must have one entry per event"))
+        if (len(self.weight_ids) != self.weights.shape[1]):
+            raise(ValueError("Number of weight ids must match the number of weights"))
+
+    @classmethod
+    def from_events(cls, events):
+        """
+        Builds a batch from an array-like container of Events.
+
+        :param events: array-like container of EventPlotter Events.
+        """
+        events = list(events)
+        counts = [len(ev) for ev in events]
+        offsets = np.zeros(len(events) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        table = ParticleTable.from_particles(p for ev in events for p in ev)
+        weights = [np.zeros(0) if (ev.weights is None) else np.asarray(ev.weights)
+                   for ev in events]
+        if (len({len(w) for w in weights}) > 1):
+            raise(ValueError("All events must have the same number of weights"))
+        if (events):
+            table.roles[:] = np.concatenate([ev.roles for ev in events])
+        return cls(table, offsets,
+                   weights=np.array(weights, dtype=np.float64).reshape(len(events), -1)
+                   if (events) else None,
+                   **{name: [getattr(ev, name) for ev in events]
+                      for name in cls.EVENT_COLUMNS})
+
+    @classmethod
+    def concatenate(cls, batches):
+        """
+        Joins several batches into a single contiguous batch.
+
+        :param batches: array-like container of EventBatches.
+        """
+        batches = list(batches)
+        if (not batches):
+            return cls()
+        offsets = [np.zeros(1, dtype=np.int64)]
+        start = 0
+        for b in batches:
+            offsets.append(b.offsets[1:] + start)
+            start += len(b.table)
+        if (len({b.weights.shape[1] for b in batches}) > 1):
+            raise(ValueError("All batches must have the same number of weights"))
+        return cls(ParticleTable.concatenate(b.table for b in batches),
+                   np.concatenate(offsets),
+                   weights=np.concatenate([b.weights for b in batches]),
+                   weight_ids=batches[0].weight_ids,
+                   **{name: np.concatenate([getattr(b, name) for b in batches])
+                      for name in cls.EVENT_COLUMNS})
+
+    def __len__(self):
+        """
+        Number of events in the batch.
+        """
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        """
+        Returns an Event view for an int index or a batch view for a slice.
+
+        Event views are not validated again, since the reader of the batch
+        has already applied its validation.
+        """
+        if (isinstance(idx, slice)):
+            start, stop, step = idx.indices(len(self))
+            if (step != 1):
+                raise(ValueError("Event batches only support contiguous slices"))
+            stop = max(start, stop)
+            lo, hi = self.offsets[start], self.offsets[stop]
+            return EventBatch(self.table[lo:hi], self.offsets[start:stop + 1] - lo,
+                              weights=self.weights[start:stop], weight_ids=self.weight_ids,
+                              **{name: getattr(self, name)[start:stop]
+                                 for name in EventBatch.EVENT_COLUMNS})
+
+        n = len(self)
+        if (idx < -n or idx >= n):
+            raise(IndexError("Event index out of range"))
+        idx %= n
+        lo, hi = self.offsets[idx], self.offsets[idx + 1]
+        return Event(particles=self.table[lo:hi],
+                     set_info=False,
+                     validate=False,
+                     weights=self.weights[idx],
+                     roles=self.table.roles[lo:hi],
+                     **{name: float(getattr(self, name)[idx])
+                        for name in EventBatch.EVENT_COLUMNS})
+
+    def __iter__(self):
+        """
+        Yields an Event view for each event in the batch.
+        """
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def select(self, mask):
+        """
+        Returns a new batch holding copies of the events where `mask` is True.
+
+        :param mask: bool array with one entry per event.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        counts = self.counts[mask]
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        rows = np.repeat(mask, self.counts)
+        return EventBatch(ParticleTable(**{name: getattr(self.table, name)[rows]
+                                           for name in ParticleTable.COLUMNS}),
+                          offsets,
+                          weights=self.weights[mask], weight_ids=self.weight_ids,
+                          **{name: getattr(self, name)[mask] for name in EventBatch.EVENT_COLUMNS})
+
+    def segment_sum(self, values):
+        """
+        Sums per-particle values over the particles of each event.
+
+        :param values: array with one entry (or row) per particle.
+        """
+        values = np.asarray(values)
+        out = np.zeros((len(self),) + values.shape[1:], dtype=values.dtype)
+        filled = self.counts > 0
+        if (np.any(filled)):
+            out[filled] = np.add.reduceat(values, self.offsets[:-1][filled], axis=0)
+        return out
+
+    def segment_max(self, values, initial: float = -np.inf):
+        """
+        Maximum of per-particle values over the particles of each event.
+
+        :param values: array with one entry per particle.
+        :param initial: float returned for events without particles.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        out = np.full(len(self), initial, dtype=np.float64)
+        filled = self.counts > 0
+        if (np.any(filled)):
+            out[filled] = np.maximum(np.maximum.reduceat(values, self.offsets[:-1][filled]),
+                                     initial)
+        return out
+
+    def particle_roles(self):
+        """
+        Returns the role index of all particles, as set by the reader, with
+        the roles of particles of unknown role derived from their status
+        codes and momenta as in Event.find_incoming.
+        """
+        t = self.table
+        unknown = t.roles == ROLE_UNKNOWN
+        if (not np.any(unknown)):
+            return t.roles
+        roles = t.roles.copy()
+        root_s = np.repeat(self.root_s, self.counts)[unknown]
+        roles[unknown] = particle_roles(t.status[unknown], t.e[unknown], t.px[unknown],
+                                        t.py[unknown], t.pz[unknown], root_s)
+        return roles
+
+    def incoming_mask(self):
+        """
+        Returns a mask of the incoming partons of each event.
+        """
+        return self.particle_roles() == ROLE_INCOMING
+
+    @profiling.timed("check_momentum_batch", count=profiling.result_length)
+    def check_momentum(self, tol: float = 1E-2):
+        """
+        Checks momentum conservation in all events at once, with the same
+        rule as Event.check_momentum.
+
+        Returns a bool array which is False for events with a momentum
+        imbalance beyond `tol` between the first incoming parton along each
+        direction of the beam axis and the final state, for events without
+        an incoming parton along either direction, and for events with an
+        incoming parton of non-zero transverse momentum.
+
+        :param tol: float tolerance, by default 1E-2
+        """
+        t = self.table
+        roles = self.particle_roles()
+        incoming = roles == ROLE_INCOMING
+        event_index = self.event_index
+        selected = np.zeros(len(t), dtype=bool)
+        found = []
+        for side in (incoming & (t.pz > 0.), incoming & (t.pz < 0.)):
+            rows = np.flatnonzero(side)
+            events, first = np.unique(event_index[rows], return_index=True)
+            selected[rows[first]] = True
+            has_side = np.zeros(len(self), dtype=bool)
+            has_side[events] = True
+            found.append(has_side)
+
+        sign = np.where(selected, 1., 0.) - np.where(roles == ROLE_FINAL, 1., 0.)
+        p_check = self.segment_sum(np.stack([t.e, t.px, t.py, t.pz], axis=1) * sign[:, None])
+        transverse = self.segment_sum((incoming & (kinematics.perp(t.px, t.py) != 0.))
+                                      .astype(np.int64))
+        return (found[0] & found[1] & (transverse == 0)
+                & ~np.any(np.abs(p_check) > tol, axis=1))
+
+    @property
+    def counts(self):
+        """
+        Number of particles in each event.
+        """
+        return np.diff(self.offsets)
+
+    @property
+    def event_index(self):
+        """
+        Index of the event each row of the table belongs to.
+        """
+        return np.repeat(np.arange(len(self)), self.counts)
+
+
+def iter_event_chunks(events, chunk_size: int):
+    """
+    Yields EventBatches of up to `chunk_size` consecutive events.
+
+    :param events: EventBatch, Reader with an iter_batches method or
+           iterable of Events.
+    :param chunk_size: int, maximum number of events of each batch.
+    """
+    if (isinstance(events, EventBatch)):
+        for start in range(0, len(events), chunk_size):
+            yield events[start:start + chunk_size]
+    elif (hasattr(events, "iter_batches")):
+        yield from events.iter_batches(chunk_size)
+    else:
+        events = iter(events)
+        chunk = list(itertools.islice(events, chunk_size))
+        while chunk:
+            yield EventBatch.from_events(chunk)
+            chunk = list(itertools.islice(events, chunk_size))
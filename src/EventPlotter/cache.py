@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+"""
+Binary columnar cache of parsed LHE files, reopened with memory mapping.
+"""
+import hashlib
+import json
+import os
+import pickle
+import numpy as np
+from .batch import ParticleTable, EventBatch
+from .reader import Reader, ReaderLHEF
+from .selection import Selection
+from .streams import source_stamp
+
+
+CACHE_VERSION = 3
+
+# Reader arguments which do not change the events written to a cache
+IGNORED_KWARGS = ("threaded",)
+
+
+def cache_dir_for(filename: str):
+    """
+    Returns the default cache directory of an event file.
+
+    :param filename: str name of the event file.
+    """
+    return str(filename) + ".epcache"
+
+
+def read_meta(cache_dir: str):
+    """
+    Returns the metadata of a cache, or None if the cache is incomplete.
+
+    :param cache_dir: str name of the cache directory.
+    """
+    try:
+        with open(os.path.join(cache_dir, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def reader_key(reader_kwargs: dict = None):
+    """
+    Returns a hash of the reader arguments a cache is written with, such
+    as its selection and validation, so a cache is only reused for the
+    same arguments. Selections are identified by their cuts, and values
+    which cannot be pickled by their repr, which may change between runs
+    and then causes the cache to be rebuilt.
+
+    :param reader_kwargs: optional dict of keyword arguments of ReaderLHEF.
+    """
+    items = []
+    for name, value in sorted((reader_kwargs or {}).items()):
+        if name in IGNORED_KWARGS:
+            continue
+        if isinstance(value, Selection):
+            value = value.cuts
+        try:
+            data = pickle.dumps(value, protocol=4)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            data = repr(value).encode()
+        items.append(name.encode() + b"=" + data)
+    return hashlib.sha256(b"\n".join(items)).hexdigest()
+
+
+def is_valid_cache(filename: str, cache_dir: str = None, wgt_idx: int = None,
+                   reader_kwargs: dict = None):
+    """
+    Checks whether a cache exists and matches the current source file and
+    the arguments of the reader.
+
+    :param filename: str name of the event file.
+    :param cache_dir: optional str name of the cache directory.
+    :param wgt_idx: optional int index of the weight stored in the cache.
+    :param reader_kwargs: optional dict of the further keyword arguments of
+           ReaderLHEF the cache must have been written with.
+    """
+    meta = read_meta(cache_dir or cache_dir_for(filename))
+    return (meta is not None and meta["version"] == CACHE_VERSION
+            and meta["source"] == source_stamp(filename) and meta["wgt_idx"] == wgt_idx
+            and meta.get("reader_key") == reader_key(reader_kwargs))
+
+
+def write_cache(filename: str, cache_dir: str = None, wgt_idx: int = None,
+                batch_size: int = 100000, **reader_kwargs):
+    """
+    Parses an LHE file once and writes its events as binary columns.
+
+    Each column of the resulting EventBatch is stored as a raw binary file
+    alongside a json file of the dtypes, shapes and init information. The
+    file is read in batches so memory use does not grow with its size.
+
+    :param filename: str name of the LHE file.
+    :param cache_dir: optional str name of the cache directory, by default
+           the name of the file followed by .epcache.
+    :param wgt_idx: optional int indexing which weight to save.
+    :param batch_size: int, number of events parsed at a time.
+    :param reader_kwargs: keyword arguments passed to ReaderLHEF.
+    """
+    cache_dir = cache_dir or cache_dir_for(filename)
+    os.makedirs(cache_dir, exist_ok=True)
+    meta_file = os.path.join(cache_dir, "meta.json")
+    if os.path.exists(meta_file):
+        os.remove(meta_file)
+
+    source = source_stamp(filename)
+    reader = ReaderLHEF(filename, wgt_idx=wgt_idx, **reader_kwargs)
+    names = ParticleTable.COLUMNS + EventBatch.EVENT_COLUMNS + ("weights", "offsets")
+    files = {name: open(os.path.join(cache_dir, name + ".bin"), "wb") for name in names}
+    shapes = {name: 0 for name in names}
+    dtypes = {"weights": ["<f8", [len(reader.weight_ids)]]}
+    weight_ids = list(reader.weight_ids)
+    n_parts = 0
+    try:
+        files["offsets"].write(np.zeros(1, dtype=np.int64).tobytes())
+        shapes["offsets"] = 1
+        for batch in reader.iter_batches(batch_size):
+            columns = {name: getattr(batch.table, name) for name in ParticleTable.COLUMNS}
+            columns.update({name: getattr(batch, name) for name in EventBatch.EVENT_COLUMNS})
+            columns["weights"] = batch.weights
+            weight_ids = batch.weight_ids
+            columns["offsets"] = batch.offsets[1:] + n_parts
+            for name, column in columns.items():
+                files[name].write(np.ascontiguousarray(column).tobytes())
+                shapes[name] += len(column)
+                dtypes[name] = [column.dtype.str, list(column.shape[1:])]
+            n_parts += len(batch.table)
+    finally:
+        for f in files.values():
+            f.close()
+        reader.close()
+
+    meta = {"version": CACHE_VERSION,
+            "source": source,
+            "wgt_idx": wgt_idx,
+            "reader_key": reader_key(reader_kwargs),
+            "init_info": reader.init_info,
+            "weight_ids": weight_ids,
+            "columns": {name: {"dtype": dtypes.get(name, ["<i8", []])[0],
+                               "shape": [shapes[name]] + dtypes.get(name, ["<i8", []])[1]}
+                        for name in names}}
+    with open(meta_file, "w") as f:
+        json.dump(meta, f)
+    return cache_dir
+
+
+class ReaderCache(Reader):
+    """
+    Reader for the binary cache of an LHE file written by write_cache.
+
+    The columns are memory mapped, so opening the cache is immediate and
+    events and batches are views into the mapped data without copies.
+    The cache is rebuilt automatically if it is missing or the size or
+    modification time of the LHE file has changed.
+    """
+
+    def __init__(self, filename: str, wgt_idx: int = None, cache_dir: str = None,
+                 rebuild: bool = True, **reader_kwargs):
+        """
+        Opens the cache of the LHE file `filename`.
+
+        :param filename: str name of the LHE file.
+        :param wgt_idx: optional int indexing which weight to save.
+        :param cache_dir: optional str name of the cache directory.
+        :param rebuild: bool, whether to (re)build a missing or stale cache,
+               otherwise a ValueError is raised.
+        :param reader_kwargs: keyword arguments passed to ReaderLHEF when
+               the cache is built, e.g. a selection. A cache written with
+               other arguments is stale.
+        """
+        self.filename = str(filename)
+        self.cache_dir = cache_dir or cache_dir_for(filename)
+        self.wgt_idx = wgt_idx
+        if not is_valid_cache(self.filename, self.cache_dir, wgt_idx, reader_kwargs):
+            if not rebuild:
+                raise(ValueError("Cache of {} is missing or out of date".format(self.filename)))
+            write_cache(self.filename, self.cache_dir, wgt_idx, **reader_kwargs)
+
+        meta = read_meta(self.cache_dir)
+        columns = {}
+        for name, col in meta["columns"].items():
+            shape = tuple(col["shape"])
+            if 0 in shape:
+                columns[name] = np.zeros(shape, dtype=col["dtype"])
+                continue
+            columns[name] = np.memmap(os.path.join(self.cache_dir, name + ".bin"),
+                                      dtype=col["dtype"], mode="r", shape=shape)
+
+        table = ParticleTable(**{name: columns[name] for name in ParticleTable.COLUMNS})
+        self.batch = EventBatch(table, columns["offsets"], weights=columns["weights"],
+                                weight_ids=meta["weight_ids"],
+                                **{name: columns[name] for name in EventBatch.EVENT_COLUMNS})
+        self.init_info = meta["init_info"]
+        self.com_energy = self.init_info[2] + self.init_info[3]
+        self.weight_ids = meta["weight_ids"]
+        self.position = 0
+
+    def __len__(self):
+        """
+        Number of events in the cache.
+        """
+        return len(self.batch)
+
+    def __getitem__(self, idx):
+        """
+        Returns an Event view for an int index or an EventBatch for a slice.
+        """
+        return self.batch[idx]
+
+    def __next__(self):
+        """
+        Advances the reader by one event.
+        """
+        if self.position >= len(self.batch):
+            raise StopIteration
+        self.position += 1
+        return self.batch[self.position - 1]
+
+    def read_batch(self, size: int):
+        """
+        Returns the next `size` events as an EventBatch view, empty at the end.
+
+        :param size: int, maximum number of events in the batch.
+        """
+        batch = self.batch[self.position:self.position + size]
+        self.position += len(batch)
+        return batch
+
+    def iter_batches(self, size: int):
+        """
+        Yields EventBatch views of up to `size` events until the end of the cache.
+
+        :param size: int, maximum number of events in each batch.
+        """
+        batch = self.read_batch(size)
+        while len(batch):
+            yield batch
+            batch = self.read_batch(size)
+
+    def close(self):
+        """
+        Releases the memory maps of the cache.
+        """
+        self.batch = EventBatch()
@@ -3,10 +3,54 @@
 Event class definition
 """
 import numpy as np
-import pylorentz
+from . import kinematics
+from . import profiling
 from dataclasses import dataclass, field
 
 
+class ValidationError(ValueError):
+    """
+    Raised for events failing validation, e.g. without incoming particles
+    or conserved momentum, as opposed to invalid arguments.
+    """
+
+
+# Codes of the role index of the particles of an event
+ROLE_UNKNOWN = -1
+ROLE_OTHER = 0
+ROLE_BEAM = 1
+ROLE_INCOMING = 2
+ROLE_INTERMEDIATE = 3
+ROLE_FINAL = 4
+
+
+def particle_roles(status, e, px, py, pz, root_s):
+    """
+    Returns the role index of particles from their status codes and
+    momenta, for particles whose roles were not set by a reader.
+
+    Particles with negative status are beams if they carry half the CoM
+    energy, incoming partons if they have the incoming status -1 or -21, or
+    no transverse momentum and non-zero longitudinal momentum and energy,
+    and intermediate otherwise. Particles with positive status are final,
+    all others have no role.
+
+    :param status: int array of (Pythia) status codes.
+    :param e, px, py, pz: float arrays of momentum components.
+    :param root_s: float or float array, CoM energy of the events.
+    """
+    status = np.asarray(status)
+    roles = np.full(len(status), ROLE_OTHER, dtype=np.int8)
+    negative = status < 0
+    beam = negative & (e == np.asarray(root_s) / 2.)
+    roles[negative] = ROLE_INTERMEDIATE
+    incoming = np.isin(status, (-1, -21)) | ((px == 0.) & (py == 0.) & (pz != 0.) & (e != 0.))
+    roles[negative & ~beam & incoming] = ROLE_INCOMING
+    roles[beam] = ROLE_BEAM
+    roles[status > 0] = ROLE_FINAL
+    return roles
+
+
 @dataclass
 class Event():
     """
@@ -21,6 +65,13 @@ class Event():
     :param x_plus: float, x value of +z incoming particle
     :param x_minus: float, x value of -z incoming particle
     :param wgt: float, event weight
+    :param validate: bool, whether to check momentum conservation on init
+    :param weights: optional float array of all the weights of the event,
+           e.g. scale and PDF variations, of which `wgt` is the nominal one
+    :param roles: optional int array of the role of each particle, one of
+           the ROLE_ codes, as set by the readers from the status codes.
+           By default, and wherever it is ROLE_UNKNOWN, it is derived from
+           the status codes and momenta, see particle_roles.
     """
 
     particles: list = field(default_factory=list)
@@ -32,14 +83,29 @@ class Event():
     x_plus: float = 0.
     x_minus: float = 0.
     wgt: float = 1.
+    validate: bool = True
+    weights: np.ndarray = None
+    roles: np.ndarray = None
+
+    def __setattr__(self, name, val):
+        super().__setattr__(name, val)
+        if (name == "particles"):
+            self.clear_roles()
+
+    def clear_roles(self):
+        """
+        Discards the role index of the particles, which is derived again
+        from their status codes and momenta when it is next needed.
+        """
+        self.__dict__["roles"] = None
 
     def __post_init__(self):
         """
         Find incoming particles and set info if not provided in constructor.
         """
         self.find_incoming()
-        if (not self.check_momentum()):
-            raise(ValueError("""Momentum not conserved in event"""))
+        if (self.validate and not self.check_momentum()):
+            raise(ValidationError("""Momentum not conserved in event"""))
 
         if (self.set_info):
             self.setup()
@@ -71,6 +137,9 @@ class Event():
         Allow indexing of particles in event.
         """
         self.particles[idx] = val
+        if (self.roles is not None):
+            self.roles = self.roles.copy()
+            self.roles[idx] = ROLE_UNKNOWN
 
     def __iter__(self):
         """
@@ -78,35 +147,62 @@ class Event():
         """
         yield from self.particles
 
+    @profiling.timed("find_incoming")
     def find_incoming(self):
         """
-        Finds the positions of the incoming particles in the particles
-        container.
-        """
-        incoming = [-1, -1]
-        beams = [-1, -1]
-        for idx, part in enumerate(self.particles):
-            if (part.is_incoming() and part.E() == self.root_s / 2.):
-                if (part.p_z() > 0.):
-                    beams[0] = idx
-                if (part.p_z() < 0.):
-                    beams[1] = idx
-            elif ((part.is_incoming()) and (part.perp() == 0.)
-                  and (part.p_z() != 0.) and (part.E() != 0.)):
-                side = int(part.p_z() / np.abs(part.p_z()))
-                if (side == 1):
-                    incoming[0] = idx
-                elif (side == -1):
-                    incoming[1] = idx
-            elif (part.is_incoming()):
-                raise(ValueError("Incoming particle has non-zero transverse momentum"))
-            if (incoming[0] != -1 and incoming[1] != -1):
-                self.beams = beams
-                self.incoming = incoming
-                return
-
-        if (incoming[0] == -1 or incoming[1] == -1):
-            raise(ValueError("One or more incoming particles was not found"))
+        Finds the positions of the incoming particles and beams in the
+        particles container from the role index of the event, which is
+        first derived from the particles if not set.
+
+        Events without incoming partons, e.g. from generators marking the
+        hard process with other status codes, are only rejected if they
+        are validated or their info is set, and have incoming [-1, -1].
+        """
+        roles = self.particle_roles()
+        for idx in np.flatnonzero(roles == ROLE_INCOMING).tolist():
+            if (self.particles[idx].perp() != 0.):
+                raise(ValidationError("Incoming particle has non-zero transverse momentum"))
+
+        incoming = self.find_role(ROLE_INCOMING)
+        if ((incoming[0] == -1 or incoming[1] == -1) and (self.validate or self.set_info)):
+            raise(ValidationError("One or more incoming particles was not found"))
+        self.beams = self.find_role(ROLE_BEAM)
+        self.incoming = incoming
+
+    def particle_roles(self):
+        """
+        Returns the role index of the particles, as set by the reader, with
+        the roles of particles of unknown role derived from their status
+        codes and momenta, see particle_roles.
+        """
+        roles = self.roles
+        if (roles is None):
+            roles = np.full(len(self.particles), ROLE_UNKNOWN, dtype=np.int8)
+        roles = np.asarray(roles, dtype=np.int8)
+        unknown = roles == ROLE_UNKNOWN
+        if (np.any(unknown)):
+            status, momenta = self.momenta()
+            roles = roles.copy()
+            roles[unknown] = particle_roles(status[unknown], *momenta[unknown].T, self.root_s)
+        self.roles = roles
+        return roles
+
+    def find_role(self, role: int):
+        """
+        Returns the positions of the first particles of a role along the
+        positive and negative z directions, -1 where there are none.
+
+        :param role: int, one of the ROLE_ codes.
+        """
+        found = [-1, -1]
+        for idx in np.flatnonzero(self.particle_roles() == role).tolist():
+            pz = self.particles[idx].p_z()
+            side = 0 if (pz > 0.) else 1 if (pz < 0.) else None
+            if (side is not None and found[side] == -1):
+                found[side] = idx
+            if (-1 not in found):
+                break
+        return found
 
     def setup(self):
         """
@@ -123,19 +219,30 @@ class Event():
         self.x_plus = self.calc_x(1)
         self.x_minus = self.calc_x(-1)
 
+    def momenta(self):
+        """
+        Returns the status codes and an (n, 4) array of the (e, px, py, pz)
+        momenta of all particles in the event.
+        """
+        parts = self.particles
+        if (isinstance(getattr(parts, "px", None), np.ndarray)):
+            return parts.status, np.stack([parts.e, parts.px, parts.py, parts.pz], axis=1)
+
+        data = np.array([(p.status, p.e, p.px, p.py, p.pz) for p in parts],
+                        dtype=np.float64).reshape(-1, 5)
+        return data[:, 0], data[:, 1:]
+
     def calc_root_s_hat(self):
         """
         Calculates the hard interaction CoM energy of an event.
         """
         inc = self.incoming
-        p_ini = pylorentz.Momentum4(0., 0., 0., 0.)
-        p_ini += self.particles[inc[0]].momentum
-        p_ini += self.particles[inc[1]].momentum
-        if (p_ini.p_z == 0. or p_ini.e == 0. or p_ini.p_t != 0):
+        p_ini = self.momenta()[1][inc].sum(axis=0)
+        if (p_ini[3] == 0. or p_ini[0] == 0. or kinematics.perp(p_ini[1], p_ini[2]) != 0):
             raise(ValueError("""Event does not contain incoming particles
                              of valid momentum."""))
 
-        return p_ini.m
+        return kinematics.mass(p_ini[1], p_ini[2], p_ini[3], p_ini[0])
 
     def calc_x(self, direction: int):
         """
@@ -154,23 +261,22 @@ class Event():
             raise(ValueError("""The direction must be +/-1 for the incoming
                              particles for the +/- z axis respectively."""))
 
+    @profiling.timed("check_momentum")
     def check_momentum(self, tol: float = 1E-2):
         """
-        Checks momentum conservation in the event to within a tolerance.
+        Checks momentum conservation in the event to within a tolerance,
+        between the incoming partons found by find_incoming, the first along
+        each direction of the beam axis, and the final state. Events
+        without incoming partons fail the check.
+
+        The incoming and final state momenta are summed in a single
+        vectorised operation.
 
         :param tol: float tolerance of output, by default 1E-2
         """
-        inc = self.incoming
-        EPS = 1E-2
-        p_check = pylorentz.Momentum4(0., 0., 0., 0.)
-        p_check += self.particles[inc[0]].momentum
-        p_check += self.particles[inc[1]].momentum
-        for idx, part in enumerate(self.particles):
-            if (part.is_final()):
-                p_check -= part.momentum
-
-        for comp in p_check:
-            if (abs(comp) > EPS):
-                return False
-
-        return True
+        if (-1 in self.incoming):
+            return False
+        momenta = self.momenta()[1]
+        p_check = (momenta[self.incoming].sum(axis=0)
+                   - momenta[self.particle_roles() == ROLE_FINAL].sum(axis=0))
+        return not np.any(np.abs(p_check) > tol)
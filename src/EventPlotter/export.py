@@ -0,0 +1,362 @@
+#!/usr/bin/env python
+"""
+Export of events to chunked, compressed columnar Parquet and HDF5 files.
+
+Events are written batch by batch, so any reader can be exported with
+constant memory. Parquet files hold one row per event, with the particle
+columns as list columns, and one row group per batch. HDF5 files hold the
+particle columns as flat datasets alongside an `offsets` dataset of the
+first particle of each event. Both are read back as EventBatches by
+readers which only load the requested columns and row groups.
+"""
+import abc
+import json
+import numpy as np
+from .batch import ParticleTable, EventBatch, iter_event_chunks
+from .reader import Reader
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+
+EXPORT_VERSION = 1
+
+# Columns of an exported file, all of which are read by default
+COLUMNS = ParticleTable.COLUMNS + EventBatch.EVENT_COLUMNS + ("weights",)
+
+
+def _require(module, name: str, files: str):
+    if module is None:
+        raise(ImportError("The {} module is required to read and write {} files.".format(
+            name, files)))
+
+
+def check_columns(columns=None):
+    """
+    Returns the list of columns to read, all by default.
+
+    :param columns: optional array-like container of str column names.
+    """
+    if columns is None:
+        return list(COLUMNS)
+    columns = list(columns)
+    unknown = [name for name in columns if name not in COLUMNS]
+    if unknown:
+        raise(ValueError("Unknown columns {}, must be among {}".format(unknown, COLUMNS)))
+    return columns
+
+
+def make_batch(counts, columns: dict, weight_ids):
+    """
+    Builds an EventBatch from the particle counts of the events and the
+    columns read, other columns being left at their defaults.
+
+    :param counts: int array of the number of particles of each event.
+    :param columns: dict of arrays keyed by column name.
+    :param weight_ids: list of the ids of the weights.
+    """
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    if "pdg" not in columns:
+        columns["pdg"] = np.zeros(offsets[-1], dtype=np.int64)
+    table = ParticleTable(**{name: columns.get(name) for name in ParticleTable.COLUMNS})
+    weights = columns.get("weights")
+    return EventBatch(table, offsets, weights=weights,
+                      weight_ids=weight_ids if (weights is not None) else None,
+                      **{name: columns.get(name) for name in EventBatch.EVENT_COLUMNS})
+
+
+def _arrow_table(batch: EventBatch):
+    """
+    Returns an Arrow table with one row per event of a batch.
+    """
+    # 64 bit offsets, so batches may hold more than 2^31 particles
+    offsets = pyarrow.array(batch.offsets, type=pyarrow.int64())
+    names, arrays = ["n_particles"], [pyarrow.array(batch.counts, type=pyarrow.int64())]
+    for name in ParticleTable.COLUMNS:
+        column = getattr(batch.table, name)
+        values = pyarrow.array(column.reshape(-1))
+        if column.ndim > 1:
+            values = pyarrow.FixedSizeListArray.from_arrays(values, column.shape[1])
+        names.append(name)
+        arrays.append(pyarrow.LargeListArray.from_arrays(offsets, values))
+    for name in EventBatch.EVENT_COLUMNS:
+        names.append(name)
+        arrays.append(pyarrow.array(getattr(batch, name)))
+    n_weights = batch.weights.shape[1]
+    names.append("weights")
+    arrays.append(pyarrow.LargeListArray.from_arrays(
+        pyarrow.array(np.arange(len(batch) + 1) * n_weights, type=pyarrow.int64()),
+        pyarrow.array(batch.weights.reshape(-1), type=pyarrow.float64())))
+    return pyarrow.Table.from_arrays(arrays, names=names)
+
+
+def write_parquet(events, filename: str, batch_size: int = 100000, compression: str = "zstd"):
+    """
+    Writes events to a Parquet file with one row group per batch.
+
+    :param events: EventBatch, Reader with an iter_batches method or
+           iterable of Events.
+    :param filename: str name of the file.
+    :param batch_size: int, number of events of each row group.
+    :param compression: str compression codec of the columns.
+    """
+    _require(pyarrow, "pyarrow", "Parquet")
+    writer = None
+    weight_ids = None
+    try:
+        for batch in iter_event_chunks(events, batch_size):
+            table = _arrow_table(batch)
+            if writer is None:
+                weight_ids = batch.weight_ids
+                meta = {"version": EXPORT_VERSION, "weight_ids": weight_ids}
+                schema = table.schema.with_metadata({"eventplotter": json.dumps(meta)})
+                writer = pyarrow.parquet.ParquetWriter(str(filename), schema,
+                                                       compression=compression)
+            elif batch.weight_ids != weight_ids:
+                raise(ValueError("All batches must have the same weights"))
+            writer.write_table(table, row_group_size=len(batch))
+        if writer is None:
+            meta = {"version": EXPORT_VERSION, "weight_ids": []}
+            table = _arrow_table(EventBatch())
+            pyarrow.parquet.write_table(
+                table.replace_schema_metadata({"eventplotter": json.dumps(meta)}),
+                str(filename), compression=compression)
+    finally:
+        if writer is not None:
+            writer.close()
+    return str(filename)
+
+
+def write_hdf5(events, filename: str, batch_size: int = 100000, compression: str = "gzip"):
+    """
+    Writes events to an HDF5 file with chunked, compressed datasets.
+
+    :param events: EventBatch, Reader with an iter_batches method or
+           iterable of Events.
+    :param filename: str name of the file.
+    :param batch_size: int, number of events written at a time, and of each
+           row group when reading the file back.
+    :param compression: str compression filter of the datasets.
+    """
+    _require(h5py, "h5py", "HDF5")
+    with h5py.File(str(filename), "w") as f:
+        f.attrs["version"] = EXPORT_VERSION
+        f.attrs["row_group_size"] = batch_size
+        f.attrs["weight_ids"] = json.dumps([])
+        f.create_dataset("offsets", data=np.zeros(1, dtype=np.int64), maxshape=(None,),
+                         chunks=True)
+        weight_ids = None
+        for batch in iter_event_chunks(events, batch_size):
+            if weight_ids is None:
+                weight_ids = batch.weight_ids
+                f.attrs["weight_ids"] = json.dumps(weight_ids)
+            elif batch.weight_ids != weight_ids:
+                raise(ValueError("All batches must have the same weights"))
+
+            columns = {"particles/" + name: getattr(batch.table, name)
+                       for name in ParticleTable.COLUMNS}
+            columns.update({"events/" + name: getattr(batch, name)
+                            for name in EventBatch.EVENT_COLUMNS})
+            columns["events/weights"] = batch.weights
+            columns["offsets"] = batch.offsets[1:] + f["offsets"][-1]
+            for path, column in columns.items():
+                if 0 in column.shape[1:]:
+                    continue
+                if path not in f:
+                    f.create_dataset(path, shape=(0,) + column.shape[1:], dtype=column.dtype,
+                                     maxshape=(None,) + column.shape[1:], chunks=True,
+                                     compression=compression)
+                data = f[path]
+                start = data.shape[0]
+                data.resize(start + len(column), axis=0)
+                data[start:] = column
+    return str(filename)
+
+
+def export_events(events, filename: str, batch_size: int = 100000, compression: str = None):
+    """
+    Writes events to a Parquet (.parquet) or HDF5 (.h5, .hdf5) file,
+    chosen from the extension of the filename, e.g.:
+
+        export_events(ReaderLHEF("events.lhe.gz", wgt_idx=0), "events.parquet")
+
+    :param events: EventBatch, Reader with an iter_batches method or
+           iterable of Events.
+    :param filename: str name of the file.
+    :param batch_size: int, number of events of each row group.
+    :param compression: optional str compression of the columns, by default
+           zstd for Parquet and gzip for HDF5.
+    """
+    name = str(filename)
+    kwargs = {} if (compression is None) else {"compression": compression}
+    if name.endswith(".parquet"):
+        return write_parquet(events, name, batch_size, **kwargs)
+    if name.endswith(".h5") or name.endswith(".hdf5"):
+        return write_hdf5(events, name, batch_size, **kwargs)
+    raise(ValueError("Export file must end with the .parquet, .h5 or .hdf5 extension."))
+
+
+class ReaderColumnar(Reader, abc.ABC):
+    """
+    Base class of the readers of exported files, reading EventBatches of
+    whole row groups and only the requested columns.
+
+    :param columns: optional array-like container of the names of the
+           columns to read, all by default. Other columns keep their
+           defaults, e.g. zero momenta or unit weights. The roles of the
+           particles are always read, so the final state and incoming
+           particles are known for any subset of columns.
+    :param row_groups: optional array-like container of the indices of the
+           row groups to read, all by default.
+    """
+
+    # Number of events of the batches events are iterated from
+    EVENT_CHUNK = 1024
+
+    def __init__(self, columns=None, row_groups=None):
+        self.columns = check_columns(columns)
+        if "roles" not in self.columns:
+            self.columns.append("roles")
+        self.row_groups = (list(range(self.n_row_groups)) if (row_groups is None)
+                           else list(row_groups))
+        self._events = None
+
+    @abc.abstractmethod
+    def read_row_group(self, idx: int):
+        """
+        Returns the EventBatch of row group `idx`.
+        """
+
+    def read(self):
+        """
+        Returns the selected row groups as a single EventBatch.
+        """
+        return EventBatch.concatenate(self.read_row_group(idx) for idx in self.row_groups)
+
+    def iter_batches(self, size: int):
+        """
+        Yields EventBatches of up to `size` events of the selected row groups.
+
+        :param size: int, maximum number of events in each batch.
+        """
+        for idx in self.row_groups:
+            batch = self.read_row_group(idx)
+            for start in range(0, len(batch), size):
+                yield batch[start:start + size]
+
+    def __next__(self):
+        """
+        Advances the reader by one event.
+        """
+        if self._events is None:
+            self._events = (ev for batch in self.iter_batches(self.EVENT_CHUNK) for ev in batch)
+        return next(self._events)
+
+
+class ReaderParquet(ReaderColumnar):
+    """
+    Reader for the Parquet files written by write_parquet.
+
+    :param filename: str name of the file.
+    :param columns: optional array-like container of the names of the
+           columns to read, all by default.
+    :param row_groups: optional array-like container of the indices of the
+           row groups to read, all by default.
+    """
+
+    def __init__(self, filename: str, columns=None, row_groups=None):
+        _require(pyarrow, "pyarrow", "Parquet")
+        self.filename = str(filename)
+        self.file = pyarrow.parquet.ParquetFile(self.filename)
+        self.n_row_groups = self.file.num_row_groups
+        meta = json.loads(self.file.schema_arrow.metadata[b"eventplotter"])
+        self.weight_ids = meta["weight_ids"]
+        super().__init__(columns, row_groups)
+
+    def __len__(self):
+        """
+        Number of events in the file.
+        """
+        return self.file.metadata.num_rows
+
+    def read_row_group(self, idx: int):
+        table = self.file.read_row_group(idx, columns=["n_particles"] + self.columns)
+        columns = {}
+        for name in self.columns:
+            column = table.column(name).combine_chunks()
+            if name in ParticleTable.COLUMNS:
+                values = column.flatten()
+                if isinstance(values.type, pyarrow.FixedSizeListType):
+                    values = values.flatten().to_numpy().reshape(-1, values.type.list_size)
+                columns[name] = np.asarray(values)
+            elif name == "weights":
+                columns[name] = column.flatten().to_numpy().reshape(len(table),
+                                                                    len(self.weight_ids))
+            else:
+                columns[name] = column.to_numpy()
+        return make_batch(table.column("n_particles").to_numpy(), columns, self.weight_ids)
+
+    def close(self):
+        """
+        Closes the file.
+        """
+        self.file.close()
+
+
+class ReaderHDF5(ReaderColumnar):
+    """
+    Reader for the HDF5 files written by write_hdf5.
+
+    Row groups are the consecutive blocks of events written at a time.
+
+    :param filename: str name of the file.
+    :param columns: optional array-like container of the names of the
+           columns to read, all by default.
+    :param row_groups: optional array-like container of the indices of the
+           row groups to read, all by default.
+    """
+
+    def __init__(self, filename: str, columns=None, row_groups=None):
+        _require(h5py, "h5py", "HDF5")
+        self.filename = str(filename)
+        self.file = h5py.File(self.filename, "r")
+        self.offsets = self.file["offsets"][:]
+        self.row_group_size = int(self.file.attrs["row_group_size"])
+        self.n_row_groups = -(-len(self) // self.row_group_size)
+        self.weight_ids = json.loads(self.file.attrs["weight_ids"])
+        super().__init__(columns, row_groups)
+
+    def __len__(self):
+        """
+        Number of events in the file.
+        """
+        return len(self.offsets) - 1
+
+    def read_row_group(self, idx: int):
+        start = idx * self.row_group_size
+        stop = min(start + self.row_group_size, len(self))
+        if start < 0 or start >= stop:
+            raise(IndexError("Row group index out of range"))
+        lo, hi = self.offsets[start], self.offsets[stop]
+        columns = {}
+        for name in self.columns:
+            if name in ParticleTable.COLUMNS:
+                columns[name] = self.file["particles/" + name][lo:hi]
+            elif "events/" + name in self.file:
+                columns[name] = self.file["events/" + name][start:stop]
+        return make_batch(np.diff(self.offsets[start:stop + 1]), columns, self.weight_ids)
+
+    def close(self):
+        """
+        Closes the file.
+        """
+        self.file.close()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+"""
+Streaming parser for the HepMC3 ASCII event file format.
+
+Like the LHEParser, the parser scans the raw bytes of a file line by line,
+so memory use is independent of the file size, and converts the numeric
+particle lines of many events to numpy arrays in a single call.
+"""
+import re
+import time
+import numpy as np
+from dataclasses import dataclass, field
+from . import profiling
+
+
+_VERTEX = re.compile(rb"V\s+(-?\d+)\s+-?\d+\s+\[([^\]]*)\]")
+
+# Number of values of a particle line:
+# id, production vertex or mother id, pdg id, px, py, pz, e, m, status
+N_PARTICLE_VALUES = 9
+
+# Factors converting the momentum units of an event to GeV
+MOMENTUM_UNITS = {b"GEV": 1., b"MEV": 1E-3}
+
+
+@dataclass
+class HepMCRun():
+    """
+    Run information from the header of a HepMC3 file.
+
+    :param version: str, HepMC version which wrote the file.
+    :param weight_ids: list of the names of the event weights.
+    :param tools: list of the tools which generated the events.
+    """
+
+    version: str = ""
+    weight_ids: list = field(default_factory=list)
+    tools: list = field(default_factory=list)
+
+
+@dataclass
+class HepMCRecord():
+    """
+    Raw numeric content of a single HepMC3 event.
+
+    :param number: int, event number.
+    :param particles: (n, 9) float array of the particle lines, with columns
+           id, production vertex (negative) or mother particle (positive)
+           id, pdg id, px, py, pz, e, m, status, momenta in GeV.
+    :param vertices: list of (vertex id, list of incoming particle ids).
+    :param weights: float array of the event weights.
+    :param offset: int, byte offset of the event line in the stream.
+    """
+
+    number: int
+    particles: np.ndarray = None
+    vertices: list = field(default_factory=list)
+    weights: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    offset: int = 0
+
+    def relations(self):
+        """
+        Returns (n, 2) int arrays of the first and last mother and daughter
+        ids of each particle, 0 where it has none, from the vertices of the
+        event. Particle ids start at 1, in the order of the particle lines.
+        """
+        n = len(self.particles)
+        ids = np.arange(1, n + 1, dtype=np.int64)
+        parent = self.particles[:, 1].astype(np.int64)
+        if (n and np.any(self.particles[:, 0] != ids)):
+            raise(ValueError("Particle ids of HepMC event {} are not sequential".format(
+                self.number)))
+
+        # a positive parent is the single mother of an implicit vertex keyed by its id
+        implicit = np.unique(parent[parent > 0])
+        in_key = np.concatenate([np.array([vid for vid, inc in self.vertices for p in inc],
+                                          dtype=np.int64), implicit])
+        in_part = np.concatenate([np.array([p for vid, inc in self.vertices for p in inc],
+                                           dtype=np.int64), implicit])
+        produced = parent != 0
+
+        mothers = _lookup(parent, in_key, in_part, produced)
+        end = np.zeros(n, dtype=np.int64)
+        end[in_part - 1] = in_key
+        daughters = _lookup(end, parent[produced], ids[produced], end != 0)
+        return mothers, daughters
+
+
+def _lookup(keys, group_keys, values, mask):
+    """
+    Returns the (min, max) of the values of the group of each key, or
+    (0, 0) for keys outside `mask` or without a group.
+    """
+    result = np.zeros((len(keys), 2), dtype=np.int64)
+    if (not len(group_keys)):
+        return result
+    order = np.argsort(group_keys, kind="stable")
+    unique, starts = np.unique(group_keys[order], return_index=True)
+    low = np.minimum.reduceat(values[order], starts)
+    high = np.maximum.reduceat(values[order], starts)
+
+    idx = np.minimum(np.searchsorted(unique, keys), len(unique) - 1)
+    found = mask & (unique[idx] == keys)
+    result[found, 0] = low[idx[found]]
+    result[found, 1] = high[idx[found]]
+    return result
+
+
+class HepMCParser():
+    """
+    Streaming tokenizer for HepMC3 ASCII files opened in binary mode.
+
+    Event (E), units (U), weight (W), particle (P) and vertex (V) lines are
+    interpreted, attribute and other lines are skipped.
+
+    Events are read up to the end of the stream, or up to the first event
+    whose E line starts at or after byte `stop`, so consecutive byte ranges
+    [start, stop) of a file contain each event exactly once.
+
+    :param stream: binary file-like object supporting readline.
+    :param stop: optional int, byte offset at which to stop reading events.
+    """
+
+    def __init__(self, stream, stop: int = None):
+        self.stream = stream
+        self.position = 0
+        self.stop = stop
+        self._line = None
+
+    def seek(self, position: int):
+        """
+        Moves the stream to byte `position`, from where the next event is read.
+
+        :param position: int, byte offset in the stream.
+        """
+        self.stream.seek(position)
+        self.position = position
+        self._line = None
+
+    def readline(self):
+        """
+        Reads one line from the stream, or returns the line put back by the
+        last scan, with the byte offset of its start.
+        """
+        if (self._line is not None):
+            line, self._line = self._line, None
+            return line, self.position - len(line)
+        line = self.stream.readline()
+        self.position += len(line)
+        return line, self.position - len(line)
+
+    def read_run(self):
+        """
+        Advances the stream up to the first event and returns the run
+        information of the header.
+        """
+        run = HepMCRun()
+        line = self.readline()[0]
+        while line and not line.startswith(b"HepMC::Asciiv3-START_EVENT_LISTING"):
+            if (line.startswith(b"HepMC::Version")):
+                run.version = line.split()[-1].decode()
+            elif (line.startswith(b"HepMC::")):
+                raise(ValueError("Only the HepMC3 ASCII format is supported"))
+            line = self.readline()[0]
+        if (not line):
+            raise(ValueError("No event listing found in HepMC file"))
+
+        line = self.readline()[0]
+        while line and not line.startswith(b"E ") and not line.startswith(b"HepMC::"):
+            if (line.startswith(b"W ")):
+                run.weight_ids = [wid.decode() for wid in line.split()[1:]]
+            elif (line.startswith(b"T ")):
+                run.tools.append(line[2:].strip().decode())
+            line = self.readline()[0]
+        self._line = line
+        return run
+
+    def scan_event(self, particles: bool = True):
+        """
+        Advances the stream past the next event.
+
+        Returns the offset, number, momentum unit factor, raw particle lines,
+        vertex lines, weights and signal process id (0 if not given) of the
+        event, or None when the end of the stream or event listing is reached.
+
+        :param particles: bool, whether to keep the particle and vertex lines,
+               which are otherwise skipped and returned as empty lists.
+        """
+        line, offset = self.readline()
+        while line and not line.startswith(b"E "):
+            if (line.startswith(b"HepMC::Asciiv3-END_EVENT_LISTING")):
+                return None
+            line, offset = self.readline()
+        if (not line):
+            return None
+        if (self.stop is not None and offset >= self.stop):
+            return None
+
+        number = int(line.split()[1])
+        unit, lines, vertices, weights, process = 1., [], [], [], 0
+        line = self.readline()[0]
+        while line and not line.startswith(b"E ") and not line.startswith(b"HepMC::"):
+            kind = line[:2]
+            if (kind == b"P "):
+                if (particles):
+                    lines.append(line[2:])
+            elif (kind == b"V "):
+                if (particles):
+                    vertices.append(line)
+            elif (kind == b"A "):
+                values = line.split()
+                if (len(values) > 3 and values[2] == b"signal_process_id"):
+                    process = int(values[3])
+            elif (kind == b"W "):
+                weights = [float(x) for x in line.split()[1:]]
+            elif (kind == b"U "):
+                unit = MOMENTUM_UNITS.get(line.split()[1].upper())
+                if (unit is None):
+                    raise(ValueError("Unknown momentum unit in HepMC event {}".format(number)))
+            line = self.readline()[0]
+        self._line = line
+        return offset, number, unit, lines, vertices, weights, process
+
+    @staticmethod
+    def parse_particles(lines, n_events=1):
+        """
+        Converts raw particle lines to a float array in a single call.
+
+        :param lines: list of bytes, the particle lines without the leading P.
+        :param n_events: int, number of events the lines belong to, used only
+               for the error message.
+        """
+        values = np.array(b" ".join(lines).split(), dtype=np.float64)
+        if (len(values) != len(lines) * N_PARTICLE_VALUES):
+            raise(ValueError("Malformed particle lines in {} HepMC event(s)".format(n_events)))
+        return values.reshape(len(lines), N_PARTICLE_VALUES)
+
+    @staticmethod
+    def parse_vertices(lines):
+        """
+        Returns the (id, incoming particle ids) of raw vertex lines.
+
+        :param lines: list of bytes, the vertex lines.
+        """
+        vertices = []
+        for line in lines:
+            match = _VERTEX.match(line)
+            if (match is None):
+                raise(ValueError("Malformed vertex line in HepMC event"))
+            vertices.append((int(match.group(1)),
+                             [int(x) for x in match.group(2).split(b",") if x.strip()]))
+        return vertices
+
+    def read_events(self, n: int):
+        """
+        Returns the HepMCRecords of up to `n` events.
+
+        The particle lines of all events are converted in a single call.
+
+        :param n: int, maximum number of events to read.
+        """
+        profiler = profiling.active()
+        if (profiler is not None):
+            start_time, position = time.perf_counter(), self.position
+        scanned = []
+        for idx in range(n):
+            event = self.scan_event()
+            if (event is None):
+                break
+            scanned.append(event)
+
+        particles = self.parse_particles([line for ev in scanned for line in ev[3]],
+                                         len(scanned))
+        records = []
+        start = 0
+        for offset, number, unit, lines, vertices, weights, process in scanned:
+            stop = start + len(lines)
+            data = particles[start:stop]
+            if (unit != 1.):
+                data[:, 3:8] *= unit
+            records.append(HepMCRecord(number, data, self.parse_vertices(vertices),
+                                       np.array(weights, dtype=np.float64), offset))
+            start = stop
+        if (profiler is not None):
+            profiler.record("parse", start_time, time.perf_counter(), len(records),
+                            self.position - position)
+        return records
+
+    def next_event(self):
+        """
+        Returns the HepMCRecord of the next event, or None at the end of the stream.
+        """
+        records = self.read_events(1)
+        return records[0] if (records) else None
+
+    def read_weights(self, n: int):
+        """
+        Returns the signal process ids, first (nominal) weights, 1 for events
+        without weights, and lists of all weights of up to `n` events,
+        skipping their particle and vertex lines without parsing them.
+
+        :param n: int, maximum number of events to read.
+        """
+        profiler = profiling.active()
+        if (profiler is not None):
+            start_time, position = time.perf_counter(), self.position
+        processes, weights = [], []
+        for idx in range(n):
+            event = self.scan_event(particles=False)
+            if (event is None):
+                break
+            weights.append(event[5])
+            processes.append(event[6])
+        nominal = np.array([wgts[0] if (wgts) else 1. for wgts in weights], dtype=np.float64)
+        if (profiler is not None):
+            profiler.record("parse", start_time, time.perf_counter(), len(weights),
+                            self.position - position)
+        return np.array(processes, dtype=np.int64), nominal, weights
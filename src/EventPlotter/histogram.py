@@ -0,0 +1,398 @@
+#!/usr/bin/env python
+"""
+Weighted 1D and 2D histograms that can be filled in bulk and merged.
+"""
+import abc
+import copy
+import numpy as np
+
+
+def make_edges(edges, low: float = None, high: float = None):
+    """
+    Returns a float array of bin edges.
+
+    :param edges: int number of equal bins between `low` and `high`, or an
+           array-like container of increasing bin edges.
+    :param low, high: floats, range of the equal bins.
+    """
+    if (np.ndim(edges) == 0):
+        if (low is None or high is None or int(edges) < 1):
+            raise(ValueError("Equal binning requires a number of bins and a range"))
+        return np.linspace(low, high, int(edges) + 1)
+
+    edges = np.asarray(edges, dtype=np.float64)
+    if (edges.ndim != 1 or len(edges) < 2 or np.any(np.diff(edges) <= 0)):
+        raise(ValueError("Bin edges must be a strictly increasing array of at least two values"))
+    return edges
+
+
+class Histogram(abc.ABC):
+    """
+    Base class of the weighted histograms.
+
+    Every statistic named in STATS is an array of the sums over the entries
+    of each bin, including an underflow and an overflow bin along each axis.
+    Histograms filled separately, e.g. in parallel worker processes, can be
+    merged with `+` or merge.
+
+    With `n_weights` set, the histogram holds one set of statistics for each
+    of several weights of every entry, e.g. scale and PDF variations, along
+    a trailing axis of the arrays, and all of them are filled in one pass.
+
+    :param path: str name of the histogram, used when writing to file.
+    :param n_weights: optional int, number of weights of each entry.
+    :param weight_ids: optional list of the ids of the weights.
+    """
+
+    STATS = ("sumw", "sumw2", "n_entries")
+
+    def __init__(self, path: str = "", n_weights: int = None, weight_ids=None):
+        self.path = path
+        self.n_weights = n_weights
+        self.weight_ids = (list(weight_ids) if (weight_ids is not None)
+                           else [None] * (n_weights or 0))
+        if (n_weights is not None and len(self.weight_ids) != n_weights):
+            raise(ValueError("Number of weight ids must match the number of weights"))
+        for name in self.STATS:
+            setattr(self, name, np.zeros(self.shape))
+
+    @property
+    @abc.abstractmethod
+    def bin_shape(self):
+        """
+        Number of bins along each axis, including the flow bins.
+        """
+
+    @property
+    def shape(self):
+        """
+        Shape of the statistics arrays, including the flow bins.
+        """
+        return self.bin_shape + (() if (self.n_weights is None) else (self.n_weights,))
+
+    @abc.abstractmethod
+    def axes(self):
+        """
+        Returns the bin edges of each axis.
+        """
+
+    def _fill(self, bins, weights, coords):
+        """
+        Adds entries with flat bin indices `bins` to the statistics.
+
+        :param bins: int array of flat bin indices.
+        :param weights: float array of the weights of the entries, of shape
+               (n_entries, n_weights) for multiple weights.
+        :param coords: dict of float arrays of the entry coordinates.
+        """
+        size = int(np.prod(self.shape))
+        if (self.n_weights is not None):
+            bins = (bins[:, None] * self.n_weights + np.arange(self.n_weights)).reshape(-1)
+            coords = {name: x[:, None] for name, x in coords.items()}
+        sums = {"sumw": weights, "sumw2": weights**2, "n_entries": np.ones(weights.shape)}
+        for name, x in coords.items():
+            sums["sumw" + name] = weights * x
+            sums["sumw" + name + "2"] = weights * x**2
+        if ("x" in coords and "y" in coords):
+            sums["sumwxy"] = weights * coords["x"] * coords["y"]
+
+        for name in self.STATS:
+            getattr(self, name).reshape(-1)[:] += np.bincount(bins, sums[name].reshape(-1), size)
+        return self
+
+    def _entries(self, values, weights):
+        """
+        Broadcasts values and weights to float arrays of equal length.
+        """
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        shape = values.shape[:1] + (() if (self.n_weights is None) else (self.n_weights,))
+        weights = np.asarray(1. if (weights is None) else weights, dtype=np.float64)
+        if (self.n_weights is not None and weights.ndim == 1 and len(weights) == len(values)):
+            weights = weights[:, None]
+        try:
+            weights = np.broadcast_to(weights, shape)
+        except ValueError:
+            raise(ValueError("Weights of shape {} do not match entries of shape {}".format(
+                weights.shape, shape)))
+        return values, weights
+
+    def merge(self, other):
+        """
+        Adds the contents of another histogram with the same binning.
+
+        :param other: Histogram to add.
+        """
+        if (type(self) is not type(other)
+                or any(len(a) != len(b) or np.any(a != b)
+                       for a, b in zip(self.axes(), other.axes()))):
+            raise(ValueError("Cannot merge histograms with different binning"))
+        if (self.n_weights != other.n_weights):
+            raise(ValueError("Cannot merge histograms with different numbers of weights"))
+        for name in self.STATS:
+            getattr(self, name)[...] += getattr(other, name)
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def __add__(self, other):
+        return copy.deepcopy(self).merge(other)
+
+    def scale(self, factor: float):
+        """
+        Multiplies the weights of all entries by `factor`.
+
+        :param factor: float scale factor.
+        """
+        for name in self.STATS:
+            if (name == "sumw2"):
+                self.sumw2 *= factor**2
+            elif (name.startswith("sumw")):
+                getattr(self, name)[...] *= factor
+        return self
+
+    def values(self, flow: bool = False):
+        """
+        Returns the sum of weights in each bin.
+
+        :param flow: bool, whether to include the underflow and overflow bins.
+        """
+        return self.sumw if (flow) else self.sumw[self._inner]
+
+    def errors(self, flow: bool = False):
+        """
+        Returns the statistical error, sqrt of the sum of squared weights,
+        of each bin.
+
+        :param flow: bool, whether to include the underflow and overflow bins.
+        """
+        sumw2 = self.sumw2 if (flow) else self.sumw2[self._inner]
+        return np.sqrt(sumw2)
+
+    def integral(self, flow: bool = False):
+        """
+        Returns the sum of weights of all bins.
+
+        :param flow: bool, whether to include the underflow and overflow bins.
+        """
+        return float(np.sum(self.values(flow)))
+
+    @property
+    def _inner(self):
+        return tuple(slice(1, -1) for dim in self.bin_shape)
+
+    def variation(self, idx: int):
+        """
+        Returns a histogram of a single weight of a multi-weight histogram.
+
+        :param idx: int index of the weight.
+        """
+        if (self.n_weights is None):
+            raise(ValueError("Histogram has a single weight"))
+        hist = copy.copy(self)
+        hist.n_weights = None
+        hist.weight_ids = []
+        wid = self.weight_ids[idx]
+        hist.path = "{}[{}]".format(self.path, idx if (wid is None) else wid)
+        for name in self.STATS:
+            setattr(hist, name, getattr(self, name)[..., idx].copy())
+        return hist
+
+    def to_dict(self):
+        """
+        Returns the bin edges, weight ids and statistics as a dict of arrays.
+        """
+        data = {"edges_{}".format(idx): edges for idx, edges in enumerate(self.axes())}
+        if (self.n_weights is not None):
+            data["weight_ids"] = np.array(["" if (wid is None) else wid
+                                           for wid in self.weight_ids], dtype=str)
+        data.update({name: getattr(self, name) for name in self.STATS})
+        return data
+
+
+class Histogram1D(Histogram):
+    """
+    Weighted one-dimensional histogram.
+
+    Entries below the first edge or at or above the last edge are counted
+    in the underflow and overflow bins, NaN entries are discarded.
+
+    :param edges: int number of equal bins between `low` and `high`, or an
+           array-like container of increasing bin edges.
+    :param low, high: floats, range of the equal bins.
+    :param path: str name of the histogram, used when writing to file.
+    :param n_weights: optional int, number of weights of each entry.
+    :param weight_ids: optional list of the ids of the weights.
+    """
+
+    STATS = ("sumw", "sumw2", "sumwx", "sumwx2", "n_entries")
+
+    def __init__(self, edges, low: float = None, high: float = None, path: str = "",
+                 n_weights: int = None, weight_ids=None):
+        self.edges = make_edges(edges, low, high)
+        super().__init__(path, n_weights, weight_ids)
+
+    @property
+    def bin_shape(self):
+        return (len(self.edges) + 1,)
+
+    def axes(self):
+        return (self.edges,)
+
+    def fill(self, values, weights=None):
+        """
+        Adds entries to the histogram.
+
+        :param values: float or float array of the entries.
+        :param weights: optional float or float array of the weights of the
+               entries, by default 1, or an (entries, n_weights) array for
+               multiple weights.
+        """
+        values, weights = self._entries(values, weights)
+        keep = ~np.isnan(values)
+        values, weights = values[keep], weights[keep]
+        return self._fill(np.searchsorted(self.edges, values, side="right"),
+                          weights, {"x": values})
+
+
+class Histogram2D(Histogram):
+    """
+    Weighted two-dimensional histogram, with statistics indexed [x, y].
+
+    Entries outside of the edges along either axis are counted in the flow
+    bins of that axis, entries with a NaN coordinate are discarded.
+
+    :param xedges, yedges: int numbers of equal bins, or array-like
+           containers of increasing bin edges, along each axis.
+    :param xrange, yrange: optional (low, high) ranges of the equal bins.
+    :param path: str name of the histogram, used when writing to file.
+    :param n_weights: optional int, number of weights of each entry.
+    :param weight_ids: optional list of the ids of the weights.
+    """
+
+    STATS = ("sumw", "sumw2", "sumwx", "sumwx2", "sumwy", "sumwy2", "sumwxy", "n_entries")
+
+    def __init__(self, xedges, yedges, xrange=(None, None), yrange=(None, None), path: str = "",
+                 n_weights: int = None, weight_ids=None):
+        self.xedges = make_edges(xedges, *xrange)
+        self.yedges = make_edges(yedges, *yrange)
+        super().__init__(path, n_weights, weight_ids)
+
+    @property
+    def bin_shape(self):
+        return (len(self.xedges) + 1, len(self.yedges) + 1)
+
+    def axes(self):
+        return (self.xedges, self.yedges)
+
+    def fill(self, x, y, weights=None):
+        """
+        Adds entries to the histogram.
+
+        :param x, y: floats or float arrays of the coordinates of the entries.
+        :param weights: optional float or float array of the weights of the
+               entries, by default 1, or an (entries, n_weights) array for
+               multiple weights.
+        """
+        x, weights = self._entries(x, weights)
+        y = np.broadcast_to(np.asarray(y, dtype=np.float64), x.shape)
+        keep = ~(np.isnan(x) | np.isnan(y))
+        x, y, weights = x[keep], y[keep], weights[keep]
+        bins = (np.searchsorted(self.xedges, x, side="right") * self.bin_shape[1]
+                + np.searchsorted(self.yedges, y, side="right"))
+        return self._fill(bins, weights, {"x": x, "y": y})
+
+
+def save_npz(histograms, filename: str):
+    """
+    Writes histograms to a numpy .npz file, keyed by their paths.
+
+    :param histograms: array-like container of Histograms with unique paths.
+    :param filename: str name of the file.
+    """
+    data = {}
+    for hist in histograms:
+        if (hist.path + "/sumw") in data:
+            raise(ValueError("Duplicate histogram path {}".format(hist.path)))
+        data[hist.path + "/type"] = np.array(type(hist).__name__)
+        data.update({hist.path + "/" + name: val for name, val in hist.to_dict().items()})
+    np.savez(filename, **data)
+
+
+def load_npz(filename: str):
+    """
+    Reads the histograms written by save_npz into a dict keyed by path.
+
+    :param filename: str name of the file.
+    """
+    types = {"Histogram1D": Histogram1D, "Histogram2D": Histogram2D}
+    histograms = {}
+    with np.load(filename) as data:
+        for key in data.files:
+            if (not key.endswith("/type")):
+                continue
+            path = key[:-len("/type")]
+            cls = types[str(data[key])]
+            n_axes = 2 if (cls is Histogram2D) else 1
+            weight_ids = None
+            if (path + "/weight_ids" in data.files):
+                weight_ids = [str(wid) or None for wid in data[path + "/weight_ids"]]
+            hist = cls(*[data["{}/edges_{}".format(path, idx)] for idx in range(n_axes)],
+                       path=path, n_weights=None if (weight_ids is None) else len(weight_ids),
+                       weight_ids=weight_ids)
+            for name in cls.STATS:
+                getattr(hist, name)[...] = data[path + "/" + name]
+            histograms[path] = hist
+    return histograms
+
+
+def write_yoda(histograms, filename: str):
+    """
+    Writes histograms to a YODA-like text file.
+
+    Each histogram is written as a block of the total, flow and bin
+    statistics, with the columns of the corresponding YODA histogram type.
+    Multi-weight histograms are written as one block per weight, with the
+    weight id in square brackets after the path as in YODA.
+
+    :param histograms: array-like container of Histograms.
+    :param filename: str name of the file.
+    """
+    with open(filename, "w") as f:
+        for hist in histograms:
+            if (hist.n_weights is None):
+                f.write(_yoda_block(hist))
+                continue
+            for idx in range(hist.n_weights):
+                f.write(_yoda_block(hist.variation(idx)))
+
+
+def _yoda_block(hist):
+    """
+    Returns the text of the YODA block of a histogram.
+    """
+    is_2d = isinstance(hist, Histogram2D)
+    kind, title = ("HISTO2D", "Histo2D") if (is_2d) else ("HISTO1D", "Histo1D")
+    stats = [getattr(hist, name) for name in hist.STATS]
+    lines = ["BEGIN YODA_{} {}".format(kind, hist.path),
+             "Path: {}".format(hist.path),
+             "Type: {}".format(title),
+             "# ID\tID\t" + "\t".join(hist.STATS),
+             "Total\tTotal\t" + "\t".join("{:e}".format(np.sum(s)) for s in stats)]
+
+    if (not is_2d):
+        lines.append("Underflow\tUnderflow\t" + "\t".join("{:e}".format(s[0]) for s in stats))
+        lines.append("Overflow\tOverflow\t" + "\t".join("{:e}".format(s[-1]) for s in stats))
+        lines.append("# xlow\txhigh\t" + "\t".join(hist.STATS))
+        for idx in range(len(hist.edges) - 1):
+            lines.append("{:e}\t{:e}\t".format(hist.edges[idx], hist.edges[idx + 1])
+                         + "\t".join("{:e}".format(s[idx + 1]) for s in stats))
+    else:
+        lines.append("# xlow\txhigh\tylow\tyhigh\t" + "\t".join(hist.STATS))
+        for i in range(len(hist.xedges) - 1):
+            for j in range(len(hist.yedges) - 1):
+                lines.append("{:e}\t{:e}\t{:e}\t{:e}\t".format(hist.xedges[i], hist.xedges[i + 1],
+                                                               hist.yedges[j], hist.yedges[j + 1])
+                             + "\t".join("{:e}".format(s[i + 1, j + 1]) for s in stats))
+    lines.append("END YODA_{}".format(kind))
+    return "\n".join(lines) + "\n\n"
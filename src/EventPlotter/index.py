@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+On-disk index of the byte offsets of the events in an LHE file.
+"""
+import re
+import numpy as np
+from .lhe import LHEParser
+from .streams import open_stream, source_stamp
+
+
+# Event tags starting a line, as recognised by the LHEParser
+_EVENT_TAG = re.compile(rb"^[ \t\r\f\v]*(<event[ >])", re.MULTILINE)
+
+# Size of the blocks read while scanning for event tags
+SCAN_SIZE = 1 << 24
+
+
+def index_path(filename: str):
+    """
+    Returns the name of the sidecar index file of an event file.
+
+    :param filename: str name of the event file.
+    """
+    return str(filename) + ".epidx"
+
+
+def build_index(filename: str):
+    """
+    Scans an LHE file once and returns the byte offsets of its <event> tags.
+
+    Offsets refer to the decompressed stream for compressed files and match
+    the offsets of the LHERecords returned by the LHEParser.
+
+    :param filename: str name of the LHE file.
+    """
+    with open_stream(filename) as stream:
+        parser = LHEParser(stream)
+        parser.read_init()
+        start = parser.position
+        offsets = []
+        tail = b""
+        block = stream.read(SCAN_SIZE)
+        while block:
+            # the last line of a block is matched with the next block
+            data = tail + block
+            limit = data.rfind(b"\n") + 1
+            offsets.extend(start + match.start(1) for match in _EVENT_TAG.finditer(data, 0, limit))
+            tail = data[limit:]
+            start += limit
+            block = stream.read(SCAN_SIZE)
+        offsets.extend(start + match.start(1) for match in _EVENT_TAG.finditer(tail))
+    return np.array(offsets, dtype=np.int64)
+
+
+def write_index(filename: str, offsets):
+    """
+    Writes the event offsets of a file to its sidecar index, if possible.
+
+    :param filename: str name of the event file.
+    :param offsets: int array of event offsets.
+    """
+    stamp = source_stamp(filename)
+    try:
+        with open(index_path(filename), "wb") as f:
+            np.savez(f, offsets=offsets, size=stamp["size"], mtime_ns=stamp["mtime_ns"])
+    except OSError:
+        pass
+
+
+def load_index(filename: str):
+    """
+    Returns the event offsets of a file from its sidecar index.
+
+    The index is built and written on first use, and rebuilt whenever the
+    size or modification time of the file has changed.
+
+    :param filename: str name of the event file.
+    """
+    stamp = source_stamp(filename)
+    try:
+        with np.load(index_path(filename)) as data:
+            if int(data["size"]) == stamp["size"] and int(data["mtime_ns"]) == stamp["mtime_ns"]:
+                return data["offsets"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    offsets = build_index(filename)
+    write_index(filename, offsets)
+    return offsets
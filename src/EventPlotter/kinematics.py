@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Vectorised kinematics of particle momenta.
+
+Each function accepts scalars or numpy arrays of momentum components
+and returns a result of the same shape, so whole batches of particles
+are processed in a single call.
+"""
+import numpy as np
+
+
+def _light_cone(plus, minus, pos_edge, neg_edge):
+    """
+    Evaluates 0.5 * log(plus / minus) with the edge cases of Particle.rap.
+
+    Entries with minus == 0 are +inf, then entries with plus == 0 are -inf.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 0.5 * np.log(plus / minus)
+    out = np.where(neg_edge, -np.inf, out)
+    out = np.where(pos_edge, np.inf, out)
+    return out[()]
+
+
+def rapidity(pz, e):
+    """
+    Rapidity of momenta, +/-inf for particles along the beam axis.
+
+    :param pz: float or array of longitudinal momenta.
+    :param e: float or array of energies.
+    """
+    pz = np.asarray(pz, dtype=np.float64)
+    e = np.asarray(e, dtype=np.float64)
+    plus = e + pz
+    minus = e - pz
+    return _light_cone(plus, minus, minus == 0., plus == 0.)
+
+
+def pseudorapidity(px, py, pz):
+    """
+    Pseudorapidity of momenta, +/-inf for particles along the beam axis.
+
+    :param px, py, pz: floats or arrays of momentum components.
+    """
+    pz = np.asarray(pz, dtype=np.float64)
+    p = np.sqrt(perp(px, py)**2 + pz**2)
+    plus = p + pz
+    minus = p - pz
+    return _light_cone(plus, minus, minus == 0., plus == 0.)
+
+
+def phi(px, py):
+    """
+    Azimuthal angle of momenta in (-pi, pi].
+
+    :param px, py: floats or arrays of transverse momentum components.
+    """
+    return np.arctan2(py, px)
+
+
+def perp(px, py):
+    """
+    Transverse momentum of momenta.
+
+    :param px, py: floats or arrays of transverse momentum components.
+    """
+    px = np.asarray(px, dtype=np.float64)
+    py = np.asarray(py, dtype=np.float64)
+    return np.sqrt(px**2 + py**2)[()]
+
+
+def mass(px, py, pz, e):
+    """
+    Mass of momenta, taken as sqrt(|m^2|) for spacelike momenta.
+
+    :param px, py, pz, e: floats or arrays of momentum components.
+    """
+    px = np.asarray(px, dtype=np.float64)
+    py = np.asarray(py, dtype=np.float64)
+    pz = np.asarray(pz, dtype=np.float64)
+    e = np.asarray(e, dtype=np.float64)
+    return np.sqrt(np.abs(e**2 - px**2 - py**2 - pz**2))[()]
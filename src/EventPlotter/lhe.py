@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+"""
+Streaming parser for the Les Houches Event (LHE) file format.
+
+The parser scans the raw bytes of an LHE file line by line, so memory use
+is independent of the file size, and converts the numeric particle lines
+of each event block to numpy arrays in bulk.
+"""
+import re
+import time
+import numpy as np
+from dataclasses import dataclass, field
+from . import profiling
+
+
+_TAG = re.compile(rb"<[^>]*>")
+_INIT = re.compile(rb"<init[\s>]")
+_WEIGHT_ID = re.compile(rb"<weight\s[^>]*?id\s*=\s*['\"]([^'\"]*)['\"]")
+_WGT = re.compile(rb"<wgt\s+id\s*=\s*['\"]([^'\"]*)['\"][^>]*>([^<]*)</wgt>")
+
+
+@dataclass
+class LHEInit():
+    """
+    Contents of the <init> block of an LHE file.
+
+    :param beam_info: list of floats, the first line of the block
+           (IDBMUP, EBMUP, PDFGUP, PDFSUP, IDWTUP, NPRUP).
+    :param processes: (NPRUP, 4) array of XSECUP, XERRUP, XMAXUP, LPRUP.
+    :param weight_ids: list of the ids of the event weights declared in the
+           <initrwgt> block of the header.
+    """
+
+    beam_info: list = field(default_factory=list)
+    processes: np.ndarray = field(default_factory=lambda: np.zeros((0, 4)))
+    weight_ids: list = field(default_factory=list)
+
+    @classmethod
+    def from_text(cls, text):
+        """
+        Parses the text content of an <init> block.
+
+        :param text: str or bytes, content of the block without the tags.
+        """
+        if (isinstance(text, str)):
+            text = text.encode()
+        lines = [line.split() for line in text.strip().split(b"\n")]
+        lines = [line for line in lines if line and not line[0].startswith(b"#")]
+        if (not lines):
+            raise(ValueError("Empty <init> block in LHE file"))
+
+        beam_info = [float(x) for x in lines[0]]
+        processes = np.array([[float(x) for x in line[:4]] for line in lines[1:]
+                              if len(line) >= 4], dtype=np.float64).reshape(-1, 4)
+        return cls(beam_info, processes)
+
+
+@dataclass
+class LHERecord():
+    """
+    Raw numeric content of a single <event> block.
+
+    :param header: float array, NUP, IDPRUP, XWGTUP, SCALUP, AQEDUP, AQCDUP.
+    :param particles: (NUP, n_cols) float array of the particle lines, with
+           columns IDUP, ISTUP, MOTHUP(2), ICOLUP(2), PUP(5), VTIMUP, SPINUP.
+    :param weights: float array of the <weights> entries followed by the
+           <rwgt> entries of the event.
+    :param weight_ids: list of the ids of the weights, None where unnamed.
+    :param offset: int, byte offset of the <event> tag in the stream.
+    """
+
+    header: np.ndarray
+    particles: np.ndarray = None
+    weights: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    weight_ids: list = field(default_factory=list)
+    offset: int = 0
+
+
+class _IncompleteEvent(Exception):
+    """
+    Raised when the end of a followed stream is reached inside an event.
+    """
+
+
+class LHEParser():
+    """
+    Streaming tokenizer for LHE files opened in binary mode.
+
+    Only the <init> and <event> blocks (including any <weights> and
+    <rwgt> sub-blocks) are interpreted, everything else is skipped.
+
+    Events are read up to the end of the stream, or up to the first event
+    whose <event> tag starts at or after byte `stop`. Since the offset of an
+    event is that of its tag, consecutive byte ranges [start, stop) of a file
+    contain each event exactly once, wherever the range boundaries fall.
+
+    When following a file which is still being written, an event which is
+    not yet complete at the end of the stream is not read. The stream is
+    moved back to its start, from where it is read again once the rest of
+    it has been appended.
+
+    :param stream: binary file-like object supporting readline.
+    :param stop: optional int, byte offset at which to stop reading events.
+    :param follow: bool, whether to wait for incomplete events to be
+           completed instead of raising a ValueError. The stream must be
+           seekable.
+    """
+
+    def __init__(self, stream, stop: int = None, follow: bool = False):
+        self.stream = stream
+        self.position = 0
+        self.stop = stop
+        self.follow = follow
+        self.finished = False
+
+    def seek(self, position: int):
+        """
+        Moves the stream to byte `position`, from where the next event is read.
+
+        :param position: int, byte offset in the stream.
+        """
+        self.stream.seek(position)
+        self.position = position
+
+    def readline(self):
+        """
+        Reads one line from the stream, keeping track of the byte position.
+        """
+        line = self.stream.readline()
+        if (self.follow and not line.endswith(b"\n")
+                and not line.lstrip().startswith(b"</LesHouchesEvents")):
+            raise(_IncompleteEvent())
+        self.position += len(line)
+        return line
+
+    def read_init(self):
+        """
+        Advances the stream past the <init> block and returns its contents,
+        including the weight ids of any <initrwgt> block before it.
+        """
+        follow, self.follow = self.follow, False
+        try:
+            return self._read_init()
+        finally:
+            self.follow = follow
+
+    def _read_init(self):
+        rwgt = []
+        in_rwgt = False
+        line = self.readline()
+        while line and not _INIT.match(line.lstrip()):
+            in_rwgt = in_rwgt or b"<initrwgt" in line
+            if (in_rwgt):
+                rwgt.append(line)
+                in_rwgt = b"</initrwgt>" not in line
+            line = self.readline()
+        if (not line):
+            raise(ValueError("No <init> block found in LHE file"))
+
+        text = [line]
+        while b"</init>" not in line:
+            line = self.readline()
+            if (not line):
+                raise(ValueError("Unexpected end of file inside <init> block"))
+            text.append(line)
+
+        info = LHEInit.from_text(_TAG.sub(b"\n", b"".join(text)))
+        info.weight_ids = [wid.decode() for wid in _WEIGHT_ID.findall(b"".join(rwgt))]
+        return info
+
+    def scan_event(self, particles: bool = True):
+        """
+        Advances the stream past the next <event> block.
+
+        Returns the offset, header, raw particle lines, weights and weight ids
+        of the event, or None when the end of the stream is reached.
+
+        :param particles: bool, whether to keep the particle lines, which are
+               otherwise skipped and returned as an empty list.
+        """
+        if (not self.follow):
+            return self._scan_event(particles)
+        start = self.position
+        try:
+            return self._scan_event(particles)
+        except _IncompleteEvent:
+            self.seek(start)
+            return None
+
+    def _scan_event(self, particles):
+        line = self.readline()
+        while line:
+            stripped = line.lstrip()
+            if (stripped.startswith(b"<event>") or stripped.startswith(b"<event ")):
+                break
+            if (stripped.startswith(b"</LesHouchesEvents")):
+                self.finished = True
+            line = self.readline()
+        if (not line):
+            return None
+        offset = self.position - len(stripped)
+        if (self.stop is not None and offset >= self.stop):
+            return None
+
+        line = self.readline()
+        while line and (not line.strip() or line.lstrip().startswith(b"<!--")):
+            line = self.readline()
+        header = np.array(line.split(), dtype=np.float64)
+        if (len(header) < 1):
+            raise(ValueError("Unexpected end of file inside <event> block"))
+
+        if (particles):
+            lines = [self.readline() for i in range(int(header[0]))]
+        else:
+            lines = []
+            for i in range(int(header[0])):
+                self.readline()
+        weights, weight_ids = [], []
+        line = self.readline()
+        while b"</event>" not in line:
+            if (not line):
+                raise(ValueError("Unexpected end of file inside <event> block"))
+            if (b"<weights" in line):
+                block = [line]
+                while b"</weights>" not in line:
+                    line = self.readline()
+                    if (not line):
+                        raise(ValueError("Unexpected end of file inside <weights> block"))
+                    block.append(line)
+                values = _TAG.sub(b" ", b"".join(block)).split()
+                weights.extend(float(x) for x in values)
+                weight_ids.extend([None] * len(values))
+            elif (b"<wgt" in line):
+                for wid, val in _WGT.findall(line):
+                    weights.append(float(val))
+                    weight_ids.append(wid.decode())
+            line = self.readline()
+
+        return offset, header, lines, weights, weight_ids
+
+    @staticmethod
+    def parse_particles(lines, n_events=1):
+        """
+        Converts raw particle lines to a float array in a single call.
+
+        :param lines: list of bytes, the particle lines.
+        :param n_events: int, number of events the lines belong to, used only
+               for the error message.
+        """
+        values = np.array(b" ".join(lines).split(), dtype=np.float64)
+        if (not lines):
+            return values.reshape(0, 13)
+        if (len(values) % len(lines) != 0):
+            raise(ValueError("Malformed particle lines in {} LHE event(s)".format(n_events)))
+        return values.reshape(len(lines), -1)
+
+    def next_event(self):
+        """
+        Returns the LHERecord of the next event, or None at the end of the stream.
+        """
+        profiler = profiling.active()
+        if (profiler is not None):
+            start_time, position = time.perf_counter(), self.position
+        scanned = self.scan_event()
+        if (scanned is None):
+            return None
+        offset, header, lines, weights, weight_ids = scanned
+        record = LHERecord(header, self.parse_particles(lines),
+                           np.array(weights, dtype=np.float64), weight_ids, offset)
+        if (profiler is not None):
+            profiler.record("parse", start_time, time.perf_counter(), 1, self.position - position)
+        return record
+
+    def read_events(self, n: int):
+        """
+        Returns the LHERecords of up to `n` events.
+
+        The particle lines of all events are converted in a single call.
+
+        :param n: int, maximum number of events to read.
+        """
+        profiler = profiling.active()
+        if (profiler is not None):
+            start_time, position = time.perf_counter(), self.position
+        scanned = []
+        for idx in range(n):
+            event = self.scan_event()
+            if (event is None):
+                break
+            scanned.append(event)
+
+        particles = self.parse_particles([line for ev in scanned for line in ev[2]],
+                                         len(scanned))
+        records = []
+        start = 0
+        for offset, header, lines, weights, weight_ids in scanned:
+            stop = start + len(lines)
+            records.append(LHERecord(header, particles[start:stop],
+                                     np.array(weights, dtype=np.float64), weight_ids, offset))
+            start = stop
+        if (profiler is not None):
+            profiler.record("parse", start_time, time.perf_counter(), len(records),
+                            self.position - position)
+        return records
+
+    def read_weights(self, n: int):
+        """
+        Returns the process ids (IDPRUP), XWGTUP weights and lists of the
+        further weights of up to `n` events, skipping their particle lines
+        without parsing them.
+
+        :param n: int, maximum number of events to read.
+        """
+        profiler = profiling.active()
+        if (profiler is not None):
+            start_time, position = time.perf_counter(), self.position
+        headers, weights = [], []
+        for idx in range(n):
+            event = self.scan_event(particles=False)
+            if (event is None):
+                break
+            headers.append(event[1][:3])
+            weights.append(event[3])
+        headers = np.array(headers, dtype=np.float64).reshape(-1, 3)
+        if (profiler is not None):
+            profiler.record("parse", start_time, time.perf_counter(), len(weights),
+                            self.position - position)
+        return headers[:, 1].astype(np.int64), headers[:, 2], weights
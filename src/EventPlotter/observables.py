@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+Event-level observables of columnar event batches.
+
+Each function takes an EventBatch (or an Event, or a container of Events,
+which are converted to a batch first) and returns an array with one entry
+per event, computed with segment reductions over the event offsets instead
+of loops over particles.
+"""
+import numpy as np
+from . import kinematics
+from .batch import EventBatch
+from .event import Event, ROLE_FINAL
+
+
+# pdg ids of partons, as in Particle.is_parton
+PARTONS = [1, 2, 3, 4, 5, 6, 21]
+
+
+def as_batch(events):
+    """
+    Returns `events` as an EventBatch.
+
+    :param events: EventBatch, Event or array-like container of Events.
+    """
+    if (isinstance(events, EventBatch)):
+        return events
+    if (isinstance(events, Event)):
+        return EventBatch.from_events([events])
+    return EventBatch.from_events(events)
+
+
+def final_mask(batch: EventBatch, partons_only: bool = False):
+    """
+    Returns a mask of the final state particles of a batch.
+
+    :param batch: EventBatch of the events.
+    :param partons_only: bool, whether to select only final state partons.
+    """
+    t = batch.table
+    mask = batch.particle_roles() == ROLE_FINAL
+    if (partons_only):
+        mask &= np.isin(np.abs(t.pdg), PARTONS)
+    return mask
+
+
+def multiplicity(events, partons_only: bool = False):
+    """
+    Number of final state particles (or partons) in each event.
+
+    :param events: EventBatch, Event or array-like container of Events.
+    :param partons_only: bool, whether to count only partons.
+    """
+    batch = as_batch(events)
+    return batch.segment_sum(final_mask(batch, partons_only).astype(np.int64))
+
+
+def h_t(events, partons_only: bool = False):
+    """
+    Scalar sum of the final state transverse momenta of each event.
+
+    :param events: EventBatch, Event or array-like container of Events.
+    :param partons_only: bool, whether to sum only over partons.
+    """
+    batch = as_batch(events)
+    t = batch.table
+    return batch.segment_sum(np.where(final_mask(batch, partons_only),
+                                      kinematics.perp(t.px, t.py), 0.))
+
+
+def total_momentum(events, partons_only: bool = False):
+    """
+    Summed final state four-momentum (e, px, py, pz) of each event.
+
+    :param events: EventBatch, Event or array-like container of Events.
+    :param partons_only: bool, whether to sum only over partons.
+    """
+    batch = as_batch(events)
+    t = batch.table
+    momenta = np.stack([t.e, t.px, t.py, t.pz], axis=1)
+    return batch.segment_sum(momenta * final_mask(batch, partons_only)[:, None])
+
+
+def leading(events, n: int = 2, partons_only: bool = True):
+    """
+    Table rows of the `n` final state particles of highest transverse
+    momentum in each event, ordered by decreasing transverse momentum.
+
+    Returns an (n_events, n) int array, -1 where an event has fewer than
+    `n` such particles. Ties keep the order of the particles in the event.
+
+    :param events: EventBatch, Event or array-like container of Events.
+    :param n: int, number of leading particles.
+    :param partons_only: bool, whether to select only partons.
+    """
+    batch = as_batch(events)
+    t = batch.table
+    rows = np.flatnonzero(final_mask(batch, partons_only))
+    event_idx = batch.event_index[rows]
+    rows = rows[np.lexsort((-kinematics.perp(t.px[rows], t.py[rows]), event_idx))]
+    event_idx = batch.event_index[rows]
+
+    first = np.searchsorted(event_idx, event_idx, side="left")
+    rank = np.arange(len(rows)) - first
+    keep = rank < n
+    out = np.full((len(batch), n), -1, dtype=np.int64)
+    out[event_idx[keep], rank[keep]] = rows[keep]
+    return out
+
+
+def pair_masses(events, n: int = 2, partons_only: bool = True):
+    """
+    Invariant masses of all pairs of the `n` leading final state particles.
+
+    Returns an (n_events, n * (n - 1) / 2) array with the pairs ordered as
+    (0, 1), (0, 2), ..., (1, 2), ..., NaN where a particle is missing.
+
+    :param events: EventBatch, Event or array-like container of Events.
+    :param n: int, number of leading particles.
+    :param partons_only: bool, whether to select only partons.
+    """
+    batch = as_batch(events)
+    t = batch.table
+    rows = leading(batch, n, partons_only)
+    first, second = np.triu_indices(n, k=1)
+    if (not len(t)):
+        return np.full((len(batch), len(first)), np.nan)
+    i, j = rows[:, first], rows[:, second]
+    masses = kinematics.mass(t.px[i] + t.px[j], t.py[i] + t.py[j],
+                             t.pz[i] + t.pz[j], t.e[i] + t.e[j])
+    return np.where((i < 0) | (j < 0), np.nan, masses)
+
+
+def rapidity_gap(events, partons_only: bool = True):
+    """
+    Absolute rapidity difference of the two leading final state particles,
+    NaN for events with fewer than two.
+
+    :param events: EventBatch, Event or array-like container of Events.
+    :param partons_only: bool, whether to select only partons.
+    """
+    batch = as_batch(events)
+    t = batch.table
+    rows = leading(batch, 2, partons_only)
+    if (not len(t)):
+        return np.full(len(batch), np.nan)
+    rap = kinematics.rapidity(t.pz[rows], t.e[rows])
+    with np.errstate(invalid="ignore"):
+        gap = np.abs(rap[:, 0] - rap[:, 1])
+    return np.where(np.any(rows < 0, axis=1), np.nan, gap)
+
+
+def max_abs_rapidity(events, partons_only: bool = False):
+    """
+    Largest absolute rapidity of the final state particles of each event,
+    NaN for events without any.
+
+    :param events: EventBatch, Event or array-like container of Events.
+    :param partons_only: bool, whether to select only partons.
+    """
+    batch = as_batch(events)
+    t = batch.table
+    mask = final_mask(batch, partons_only)
+    values = np.where(mask, np.abs(kinematics.rapidity(t.pz, t.e)), -np.inf)
+    out = batch.segment_max(values)
+    return np.where(np.isneginf(out), np.nan, out)
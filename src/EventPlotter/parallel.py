@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Parallel map-reduce over events in many files with a process pool.
+"""
+import functools
+import operator
+import os
+from concurrent.futures import ProcessPoolExecutor
+from .reader import open_events
+from .streams import split_compression
+
+
+def _run_shard(shard, func, reduce, batch_size, reader_kwargs):
+    """
+    Applies `func` to every event (or batch) of a shard and reduces the results.
+
+    Returns a list holding the reduced value, empty if the shard has no events.
+    """
+    filename, start, stop = shard
+    result = []
+    with open_events(filename, start=start, stop=stop, **reader_kwargs) as reader:
+        items = reader if (batch_size is None) else reader.iter_batches(batch_size)
+        for item in items:
+            value = func(item)
+            result = [reduce(result[0], value)] if result else [value]
+    return result
+
+
+class ParallelReader():
+    """
+    Distributes the events of several event files across a process pool.
+
+    Each file is split into shards: byte ranges of uncompressed files are
+    read by separate workers, which only handle the events whose first
+    line starts in their range, while compressed files are read whole.
+
+    :param files: str or array-like container of str names of LHE or
+           HepMC3 files, or of any format added with register_reader.
+    :param workers: optional int, number of worker processes, by default
+           the number of CPUs. With a single worker all shards are read in
+           the calling process.
+    :param chunks_per_file: int, number of byte ranges each uncompressed
+           file is split into.
+    :param reader_kwargs: keyword arguments passed to the reader of each
+           file, opened with open_events.
+    """
+
+    def __init__(self, files, workers: int = None, chunks_per_file: int = 1, **reader_kwargs):
+        if isinstance(files, (str, os.PathLike)):
+            files = [files]
+        if chunks_per_file < 1:
+            raise(ValueError("Number of chunks per file must be larger than 0"))
+
+        self.files = [str(f) for f in files]
+        self.workers = os.cpu_count() if (workers is None) else workers
+        self.chunks_per_file = chunks_per_file
+        self.reader_kwargs = reader_kwargs
+
+    def shards(self):
+        """
+        Returns the (filename, start, stop) byte ranges handed to the workers.
+        """
+        shards = []
+        for filename in self.files:
+            if split_compression(filename)[1] or self.chunks_per_file == 1:
+                shards.append((filename, None, None))
+                continue
+
+            size = os.path.getsize(filename)
+            bounds = [size * k // self.chunks_per_file for k in range(self.chunks_per_file)]
+            for start, stop in zip(bounds, bounds[1:] + [None]):
+                shards.append((filename, start, stop))
+        return shards
+
+    def map_shards(self, job):
+        """
+        Returns the results of `job` for every shard, in the order of the
+        shards, run across the process pool.
+
+        :param job: Callable taking a (filename, start, stop) shard, which
+               must be picklable with more than one worker.
+        """
+        shards = self.shards()
+        if self.workers == 1 or len(shards) == 1:
+            return list(map(job, shards))
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(job, shards))
+
+    def map_reduce(self, func, reduce=operator.add, initial=None, batch_size: int = None):
+        """
+        Applies `func` to every event and reduces the results with `reduce`.
+
+        Results are reduced in each worker and the partial results of all
+        shards are reduced in the parent, in the order of the shards. With
+        more than one worker, `func` and `reduce` must be picklable, e.g.
+        functions defined at module level.
+
+        :param func: Callable applied to each Event, or to each EventBatch if
+               `batch_size` is given, e.g. an observable.
+        :param reduce: Callable combining two results, by default addition.
+        :param initial: optional starting value of the reduction.
+        :param batch_size: optional int, pass columnar batches of this size to
+               `func` instead of Events.
+        """
+        job = functools.partial(_run_shard, func=func, reduce=reduce, batch_size=batch_size,
+                                reader_kwargs=self.reader_kwargs)
+        values = [val for part in self.map_shards(job) for val in part]
+
+        if initial is not None:
+            return functools.reduce(reduce, values, initial)
+        if not values:
+            return None
+        return functools.reduce(reduce, values)
+
+
+def read_many(files, func, reduce=operator.add, workers: int = None, chunks_per_file: int = 1,
+              initial=None, batch_size: int = None, **reader_kwargs):
+    """
+    Applies `func` to every event of several event files in parallel.
+
+    Convenience wrapper around ParallelReader.map_reduce, see there for the
+    description of the arguments.
+    """
+    reader = ParallelReader(files, workers, chunks_per_file, **reader_kwargs)
+    return reader.map_reduce(func, reduce, initial, batch_size)
@@ -5,14 +5,23 @@ Particle class definition
 import numpy as np
 import pylorentz
 from typing import Tuple
-from dataclasses import dataclass
+from . import kinematics
+from . import profiling
 
 
-@dataclass
 class Particle():
     """
     Initialise particle from provided data, most of which is optional.
 
+    The four-momentum and derived kinematics are only computed when first
+    requested and are cached until a momentum component is changed. The
+    attributes are stored in __slots__ to keep the footprint per particle
+    small.
+
+    Particle is no longer a dataclass: comparison and repr use the FIELDS
+    of the particle, and as_dict and replace take the place of
+    dataclasses.asdict and dataclasses.replace.
+
     :param pdg: int id of particle according to pdg database convention
     :param status: status code of particle following the Pythia convention
     :param mothers: tuple containing index of mother particles if applicable
@@ -26,64 +35,165 @@ class Particle():
     # Review value of tolerance
     TOL = 1E-1
 
-    pdg: int = 0
-    status: int = 0
-    mothers: Tuple[int, int] = (0, 0)
-    daughters: Tuple[int, int] = (0, 0)
-    cols: Tuple[int, int] = (0, 0)
-    px: float = 0.
-    py: float = 0.
-    pz: float = 0.
-    e: float = 0.
-    m: float = 0.
-    check_on_shell: bool = True
+    FIELDS = ("pdg", "status", "mothers", "daughters", "cols",
+              "px", "py", "pz", "e", "m", "check_on_shell")
 
-    def __post_init__(self):
+    __slots__ = ("pdg", "status", "mothers", "daughters", "cols", "_px", "_py", "_pz", "_e",
+                 "m", "check_on_shell", "_momentum", "_rap", "_eta", "_phi", "_perp", "_mass")
+
+    def __init__(self, pdg: int = 0, status: int = 0, mothers: Tuple[int, int] = (0, 0),
+                 daughters: Tuple[int, int] = (0, 0), cols: Tuple[int, int] = (0, 0),
+                 px: float = 0., py: float = 0., pz: float = 0., e: float = 0., m: float = 0.,
+                 check_on_shell: bool = True):
         """
         Check on shell within tolerance TOL.
         """
-        self.momentum = pylorentz.Momentum4(self.e, self.px, self.py, self.pz)
+        self.pdg = pdg
+        self.status = status
+        self.mothers = mothers
+        self.daughters = daughters
+        self.cols = cols
+        self._px = px
+        self._py = py
+        self._pz = pz
+        self._e = e
+        self.m = m
+        self.check_on_shell = check_on_shell
+        self.clear_cache()
         if (self.check_on_shell):
             self.check_on_shell_particles()
 
+    def __repr__(self):
+        return "Particle({})".format(", ".join("{}={!r}".format(name, getattr(self, name))
+                                               for name in Particle.FIELDS))
+
+    def __eq__(self, other):
+        if (other.__class__ is not self.__class__):
+            return NotImplemented
+        return (tuple(getattr(self, name) for name in Particle.FIELDS)
+                == tuple(getattr(other, name) for name in Particle.FIELDS))
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return self.as_dict()
+
+    def __setstate__(self, state):
+        Particle.__init__(self, **dict(state, check_on_shell=False))
+        self.check_on_shell = state["check_on_shell"]
+
+    def as_dict(self):
+        """
+        Returns the FIELDS of the particle as a dict.
+        """
+        return {name: getattr(self, name) for name in Particle.FIELDS}
+
+    def replace(self, **changes):
+        """
+        Returns a copy of the particle with the given FIELDS changed.
+
+        :param changes: new values of the fields, by name.
+        """
+        unknown = set(changes) - set(Particle.FIELDS)
+        if (unknown):
+            raise(TypeError("Particle has no fields {}".format(sorted(unknown))))
+        return Particle(**dict(self.as_dict(), **changes))
+
+    def clear_cache(self):
+        """
+        Discards the cached four-momentum and kinematics of the particle.
+        """
+        self._momentum = None
+        self._rap = None
+        self._eta = None
+        self._phi = None
+        self._perp = None
+        self._mass = None
+
+    @property
+    def px(self):
+        return self._px
+
+    @px.setter
+    def px(self, val):
+        self._px = val
+        self.clear_cache()
+
+    @property
+    def py(self):
+        return self._py
+
+    @py.setter
+    def py(self, val):
+        self._py = val
+        self.clear_cache()
+
+    @property
+    def pz(self):
+        return self._pz
+
+    @pz.setter
+    def pz(self, val):
+        self._pz = val
+        self.clear_cache()
+
+    @property
+    def e(self):
+        return self._e
+
+    @e.setter
+    def e(self, val):
+        self._e = val
+        self.clear_cache()
+
+    @property
     def momentum(self):
         """
         Returns the momentum of the particle.
         """
-        return pylorentz.Momentum4(self.e, self.px, self.py, self.pz)
+        if (self._momentum is None):
+            self._momentum = pylorentz.Momentum4(self._e, self._px, self._py, self._pz)
+        return self._momentum
 
     def m_calc(self):
         """
         Calculate mass from momentum.
         """
-        p = self.momentum
-        return np.sqrt(np.abs(p.e**2 - p.p_x**2 - p.p_y**2 - p.p_z**2))
+        if (self._mass is None):
+            self._mass = kinematics.mass(self._px, self._py, self._pz, self._e)
+        return self._mass
 
     def rap(self):
         """
-        Wrapper around rapidity from pylorentz.
+        Rapidity of the particle, +/-inf along the beam axis.
         """
-        p = self.momentum
-        if (p.e - p.p_z == 0.):
-            return np.inf
-        elif (p.e + p.p_z == 0.):
-            return -np.inf
+        if (self._rap is None):
+            self._rap = kinematics.rapidity(self._pz, self._e)
+        return self._rap
 
-        return 0.5 * np.log((p.e + p.p_z)/(p.e - p.p_z))
+    def eta(self):
+        """
+        Pseudorapidity of the particle, +/-inf along the beam axis.
+        """
+        if (self._eta is None):
+            self._eta = kinematics.pseudorapidity(self._px, self._py, self._pz)
+        return self._eta
 
     def phi(self):
         """
-        Wrapper around phi from pylorentz.
+        Azimuthal angle of the particle.
         """
-        p = self.momentum
-        return np.arctan2(p.p_y, p.p_x)
+        if (self._phi is None):
+            self._phi = kinematics.phi(self._px, self._py)
+        return self._phi
 
     def perp(self):
         """
-        Wrapper around p_T from pylorentz.
+        Transverse momentum of the particle.
         """
-        p = self.momentum
-        return np.sqrt(p.p_x**2 + p.p_y**2)
+        if (self._perp is None):
+            self._perp = kinematics.perp(self._px, self._py)
+        return self._perp
 
     def p_x(self):
         """
@@ -127,6 +237,7 @@ class Particle():
         """
         return (self.status < 0)
 
+    @profiling.timed("on_shell")
     def check_on_shell_particles(self):
         """
         Checks on-shellness of the particle compared to the init mass.
@@ -2,15 +2,41 @@
 """
 Plotter class definition.
 """
+import copy
+import os
 import matplotlib.pyplot as plt
 from matplotlib import cm
 from matplotlib.colors import ListedColormap
 import numpy as np
 from typing import Tuple
-from .event import Event
+from . import kinematics
+from . import profiling
+from .batch import ParticleTable, EventBatch, iter_event_chunks
+from .event import Event, ROLE_FINAL
+from .observables import PARTONS, final_mask
+from .render import FigureRenderer, render_many
 from .utils import is_number
 
 
+def _trim_npy(filename: str, out, n_events: int):
+    """
+    Rewrites a .npy file with only its first `n_events` entries, and returns
+    a memory map of the new file.
+
+    :param filename: str name of the .npy file.
+    :param out: np.memmap of the file.
+    :param n_events: int, number of entries kept.
+    """
+    tmp_name = filename + ".tmp"
+    trimmed = np.lib.format.open_memmap(tmp_name, mode="w+", dtype=out.dtype,
+                                        shape=(n_events,) + out.shape[1:])
+    trimmed[:] = out[:n_events]
+    trimmed.flush()
+    del trimmed, out
+    os.replace(tmp_name, filename)
+    return np.lib.format.open_memmap(filename, mode="r+")
+
+
 class Plotter():
     """
     Plotting class for examining events from MC event generators.
@@ -120,6 +146,57 @@ class Plotter():
         new_colors[:int(min_val), :] = white
         self.color_map = ListedColormap(new_colors)
 
+    def bin_centres(self):
+        """
+        Returns the midpoints between neighbouring bin centres along the
+        phi and rapidity axes, cached for the current extents and bins.
+
+        A value falls in the bin whose centre, on the grid spanning the
+        extent, is nearest to it, with ties resolved towards the lower bin.
+        """
+        key = (tuple(self.phi_extent), tuple(self.rap_extent), self.bins)
+        if getattr(self, "_bin_key", None) != key:
+            phi_grid = np.linspace(self.phi_extent[0], self.phi_extent[1], self.bins)
+            rap_grid = np.linspace(self.rap_extent[0], self.rap_extent[1], self.bins)
+            self._phi_mid = 0.5 * (phi_grid[1:] + phi_grid[:-1])
+            self._rap_mid = 0.5 * (rap_grid[1:] + rap_grid[:-1])
+            self._bin_key = key
+        return self._phi_mid, self._rap_mid
+
+    def fill_image(self, image, rap, phi, fill_val):
+        """
+        Adds values to an image at the bins of the given rapidities and phis.
+
+        Entries outside of the (open) extents are discarded.
+
+        :param image: (bins x bins) array to fill, indexed [phi, rap].
+        :param rap, phi, fill_val: float arrays of equal length.
+        """
+        phi_mid, rap_mid = self.bin_centres()
+        keep = ((rap > self.rap_extent[0]) & (rap < self.rap_extent[1])
+                & (phi > self.phi_extent[0]) & (phi < self.phi_extent[1]))
+        np.add.at(image, (np.searchsorted(phi_mid, phi[keep]),
+                          np.searchsorted(rap_mid, rap[keep])), fill_val[keep])
+        return image
+
+    def get_fill_values(self, event: Event, particles):
+        """
+        Returns the z-axis values of the particles of an event.
+
+        :param event: Event the particles belong to.
+        :param particles: array-like container of Particles.
+        """
+        if (self.z_func):
+            fill_val = [self.z_func(p) for p in particles]
+            for val in fill_val:
+                if (not is_number(val)):
+                    raise(TypeError("custom z function must return a float or int"))
+        else:
+            fill_val = [p.perp() for p in particles]
+        fill_val = np.array(fill_val, dtype=np.float64)
+        return fill_val * event.wgt if (self.include_wgt) else fill_val
+
+    @profiling.timed("get_image")
     def get_image(self, event: Event = None, idx_products = None):
         """
         Returns a square array populated with the z-axis values of the event.
@@ -128,52 +205,219 @@ class Plotter():
         :param idx_products: optional array-like container for indices of
                particles not to be included in the heat map.
         """
-        y_phi = []
-        if (not idx_products):
-            for idx, p in enumerate(event.particles):
-                if (p.is_final() and p.is_parton()):
-                    fill_val = self.z_func(p) if (self.z_func) else p.perp()
-                    if (not is_number(fill_val)):
-                        raise(TypeError("custom z function must return a float or int"))
-                    fill_val *= event.wgt if (self.include_wgt) else 1
-                    y_phi.append([idx, p.rap(), p.phi(), fill_val])
+        parts = event.particles
+        if (isinstance(parts, ParticleTable)):
+            pdg, px, py, pz, e = parts.pdg, parts.px, parts.py, parts.pz, parts.e
         else:
-            for idx, p in enumerate(event.particles):
-                if (p.is_final() and p.is_parton() and (idx not in idx_products)):
-                    fill_val = self.z_func(p) if (self.z_func) else p.perp()
-                    if (not is_number(fill_val)):
-                        raise(TypeError("custom z function must return a float or int"))
-                    fill_val *= event.wgt if (self.include_wgt) else 1
-                    y_phi.append([idx, p.rap(), p.phi(), fill_val])
+            columns = np.array([(p.pdg, p.px, p.py, p.pz, p.e) for p in parts],
+                               dtype=np.float64).reshape(-1, 5)
+            pdg, px, py, pz, e = columns.T
 
-        y_phi.sort(key = lambda x: x[3])
+        selected = (event.particle_roles() == ROLE_FINAL) & np.isin(np.abs(pdg), PARTONS)
+        if (idx_products):
+            selected[np.asarray(idx_products, dtype=np.int64)] = False
+        idx = np.flatnonzero(selected)
 
+        if (self.z_func):
+            fill_val = self.get_fill_values(event, [parts[i] for i in idx])
+        else:
+            fill_val = kinematics.perp(px[idx], py[idx])
+            fill_val = fill_val * event.wgt if (self.include_wgt) else fill_val
+
+        # fill in order of increasing value, as the values were summed before
+        order = np.argsort(fill_val, kind="stable")
+        idx = idx[order]
         image = np.zeros((self.bins, self.bins))
-        for j, part in enumerate(y_phi):
-            phi = np.abs(np.linspace(self.phi_extent[0], self.phi_extent[1],
-                         self.bins) - part[2]).argmin()
-            rap = np.abs(np.linspace(self.rap_extent[0], self.rap_extent[1],
-                         self.bins) - part[1]).argmin()
-            if ((part[1] > self.rap_extent[0] and part[1] < self.rap_extent[1])
-                and (part[2] > self.phi_extent[0] and part[2] < self.phi_extent[1])):  # noqa: E129
-                image[phi, rap] += part[3]
+        self.fill_image(image, kinematics.rapidity(pz[idx], e[idx]),
+                        kinematics.phi(px[idx], py[idx]), fill_val[order])
 
         if (idx_products):
-            y_phi_products = []
-            for loc in idx_products:
-                p = event.particles[loc]
-                fill_val = self.z_func(p) if (self.z_func) else p.perp()
-                if (not is_number(fill_val)):
-                    raise(TypeError("custom z function must return a float or int"))
-                fill_val *= event.wgt if (self.include_wgt) else 1
-                y_phi_products.append([p.pdg, p.rap(), p.phi(), fill_val])
-
+            products = [parts[loc] for loc in idx_products]
+            fill_val = self.get_fill_values(event, products)
+            y_phi_products = [[p.pdg, p.rap(), p.phi(), val]
+                              for p, val in zip(products, fill_val.tolist())]
             y_phi_products.sort(key = lambda x: x[3])
             return image, y_phi_products
 
         return image
 
-    def plot_y_phi(self, image = None, products = None, title: str = None):
+    def get_flat_bins(self, rap, phi):
+        """
+        Returns a mask of the entries inside the (open) extents and their
+        flattened bin index phi_bin * bins + rap_bin.
+
+        :param rap, phi: float arrays of equal length.
+        """
+        phi_mid, rap_mid = self.bin_centres()
+        keep = ((rap > self.rap_extent[0]) & (rap < self.rap_extent[1])
+                & (phi > self.phi_extent[0]) & (phi < self.phi_extent[1]))
+        return keep, (np.searchsorted(phi_mid, phi[keep]) * self.bins
+                      + np.searchsorted(rap_mid, rap[keep]))
+
+    def get_channel_values(self, table: ParticleTable, idx, channel):
+        """
+        Returns the values of a channel for rows `idx` of a particle table.
+
+        :param table: ParticleTable of the particles.
+        :param idx: int array of rows.
+        :param channel: "z" for the z-axis of the plotter, "pt", "energy",
+               "multiplicity" or a Callable function of a Particle.
+        """
+        if (channel == "z"):
+            channel = self.z_func if (self.z_func) else "pt"
+
+        if (callable(channel)):
+            values = [channel(table[i]) for i in idx]
+            for val in values:
+                if (not is_number(val)):
+                    raise(TypeError("custom z function must return a float or int"))
+            return np.array(values, dtype=np.float64)
+        elif (channel == "pt"):
+            return kinematics.perp(table.px[idx], table.py[idx])
+        elif (channel == "energy"):
+            return table.e[idx].astype(np.float64)
+        elif (channel == "multiplicity"):
+            return np.ones(len(idx))
+        raise(ValueError("Unknown image channel {}".format(channel)))
+
+    def get_batch_entries(self, batch: EventBatch, channels = None, weighted: bool = True):
+        """
+        Returns the event index, rapidity, phi and z-axis value of every final
+        state parton in a batch of events.
+
+        :param batch: EventBatch of the events.
+        :param channels: optional array-like container of channels as in
+               get_channel_values, in which case the values are returned as
+               a (channels x entries) array.
+        :param weighted: bool, whether to multiply the values by the event
+               weights if the plotter includes weights.
+        """
+        table = batch.table
+        idx = np.flatnonzero(final_mask(batch, partons_only=True))
+        ev_idx = batch.event_index[idx]
+        fill_val = np.array([self.get_channel_values(table, idx, c)
+                             for c in (channels or ["z"])]).reshape(-1, len(idx))
+        if (self.include_wgt and weighted):
+            fill_val = fill_val * batch.wgt[ev_idx]
+        return (ev_idx, kinematics.rapidity(table.pz[idx], table.e[idx]),
+                kinematics.phi(table.px[idx], table.py[idx]),
+                fill_val if (channels) else fill_val[0])
+
+    def get_images(self, events, channels = None, chunk_size: int = 1024, out = None,
+                   filename: str = None, sparse: bool = False):
+        """
+        Returns the images of many events as a single array.
+
+        The images have shape (N, bins, bins), or (N, C, bins, bins) if
+        channels are given, and are filled chunk by chunk so that only one
+        chunk of events is held in memory besides the output.
+
+        :param events: EventBatch, Reader or array-like container of Events.
+        :param channels: optional array-like container of channels, each one
+               of "z" for the z-axis of the plotter, "pt", "energy",
+               "multiplicity" or a Callable function of a Particle.
+        :param chunk_size: int, number of events filled at a time.
+        :param out: optional preallocated array or np.memmap of the output shape.
+        :param filename: optional str name of a .npy file the images are
+               written to through a memory map, which is returned.
+        :param sparse: bool, return the non-zero entries as a tuple of a
+               (ndim x nnz) int array of coordinates, an array of values and
+               the shape of the dense array.
+
+        The length of a Reader is only an upper bound on the number of events
+        it returns, e.g. if it has a selection, so an output of that length
+        is trimmed to the events returned.
+        """
+        n_channels = len(channels) if (channels) else 1
+        image_size = n_channels * self.bins * self.bins
+        n_events = len(events) if (hasattr(events, "__len__")) else None
+        exact = not hasattr(events, "iter_batches")
+        shape = ((n_channels,) if (channels) else ()) + (self.bins, self.bins)
+
+        if (out is None and filename is not None):
+            if (n_events is None):
+                raise(ValueError("Number of events must be known to write images to file"))
+            out = np.lib.format.open_memmap(filename, mode="w+", dtype=np.float64,
+                                            shape=(n_events,) + shape)
+        if (out is None and not sparse and n_events is not None and exact):
+            out = np.zeros((n_events,) + shape)
+
+        chunks, coords, values = [], [], []
+        start = 0
+        for batch in iter_event_chunks(events, chunk_size):
+            ev_idx, rap, phi, fill_val = self.get_batch_entries(batch, channels)
+            fill_val = fill_val.reshape(n_channels, -1)
+            keep, bins = self.get_flat_bins(rap, phi)
+            flat = ((ev_idx[keep] * n_channels)[None, :] * self.bins * self.bins
+                    + (np.arange(n_channels) * self.bins * self.bins)[:, None] + bins[None, :])
+
+            if (sparse):
+                keys, inverse = np.unique(flat, return_inverse=True)
+                sums = np.bincount(inverse.reshape(-1), fill_val[:, keep].reshape(-1), len(keys))
+                nonzero = sums != 0.
+                keys = keys[nonzero]
+                coords.append(np.array(np.unravel_index(keys, (len(batch),) + shape)))
+                coords[-1][0] += start
+                values.append(sums[nonzero])
+            else:
+                images = np.bincount(flat.reshape(-1), fill_val[:, keep].reshape(-1),
+                                     len(batch) * image_size).reshape((len(batch),) + shape)
+                if (out is not None):
+                    out[start:start + len(batch)] = images
+                else:
+                    chunks.append(images)
+            start += len(batch)
+
+        if (sparse):
+            ndim = len(shape) + 1
+            coords = np.concatenate(coords, axis=1) if (coords) else np.zeros((ndim, 0), dtype=np.int64)
+            values = np.concatenate(values) if (values) else np.zeros(0)
+            return coords, values, (start,) + shape
+        if (out is None):
+            return np.concatenate(chunks) if (chunks) else np.zeros((0,) + shape)
+        if (isinstance(out, np.memmap)):
+            out.flush()
+            if (filename is not None and start < len(out)):
+                return _trim_npy(filename, out, start)
+        return out[:start] if (start < len(out)) else out
+
+    # Kept as a method for callers of Plotter.iter_event_chunks
+    iter_event_chunks = staticmethod(iter_event_chunks)
+
+    def accumulator(self, errors: bool = False, n_weights: int = None):
+        """
+        Returns an empty ImageAccumulator with the settings of this plotter.
+
+        :param errors: bool, whether to accumulate the sum of squares of the
+               bin values of each event for statistical errors.
+        :param n_weights: optional int, number of event weights to accumulate
+               a separate image for.
+        """
+        return ImageAccumulator(self, errors, n_weights)
+
+    def renderer(self, usetex: bool = False, dpi: int = 100):
+        """
+        Returns a FigureRenderer reusing one figure to write many images.
+
+        :param usetex: bool, whether to typeset labels with LaTeX, otherwise
+               matplotlib's mathtext is used.
+        :param dpi: int, resolution of the saved figures.
+        """
+        return FigureRenderer.from_plotter(self, usetex, dpi)
+
+    def render_many(self, images, paths, workers: int = 1, usetex: bool = False, dpi: int = 100):
+        """
+        Writes the figures of many images with parallel headless renderers.
+
+        :param images: array-like container of (bins x bins) images.
+        :param paths: array-like container of str names of the files written.
+        :param workers: int, number of worker processes.
+        :param usetex: bool, whether to typeset labels with LaTeX.
+        :param dpi: int, resolution of the saved figures.
+        """
+        return render_many(self, images, paths, workers, usetex, dpi)
+
+    def plot_y_phi(self, image = None, products = None, title: str = None, usetex: bool = True):
         """
         Renders a square heatmap of the y-phi plane.
 
@@ -182,10 +426,11 @@ class Plotter():
                for particles to be displayed as scatter points
         :param title: title of the figure to be saved, if not specified the figure
                will not be saved.
+        :param usetex: bool, whether to typeset labels with LaTeX.
         """
         if image is None:
             raise(ValueError("Must provide an image to plot"))
-        plt.rc('text', usetex=True)
+        plt.rc('text', usetex=usetex)
         plt.rc('font', family='serif')
         plt.xlabel(r'$y$')
         plt.ylabel(r'$\phi \quad [\textrm{rad}]$')
@@ -209,3 +454,209 @@ class Plotter():
             plt.savefig(title, bbox_inches='tight')
         plt.clf()
         return image
+
+
+class ImageAccumulator():
+    """
+    Accumulates the y-phi images of many events into a single image.
+
+    Events and batches of events are binned with the extents, bins, custom
+    z function and weighting of a Plotter, and summed into a float64 array.
+    Accumulators filled separately, e.g. in parallel worker processes, can
+    be merged with `+` or merge.
+
+    With `n_weights` set, one image is accumulated for each of the weights
+    of the events, e.g. scale and PDF variations, in a single pass. The
+    images have shape (n_weights, bins, bins) and the values are always
+    multiplied by the corresponding event weight.
+
+    :param plotter: Plotter providing the binning and z-axis values.
+    :param errors: bool, whether to accumulate the sum of squares of the
+           bin values of each event for statistical errors.
+    :param n_weights: optional int, number of event weights.
+    """
+
+    def __init__(self, plotter: Plotter, errors: bool = False, n_weights: int = None):
+        self.plotter = plotter
+        self.rap_extent = list(plotter.rap_extent)
+        self.phi_extent = list(plotter.phi_extent)
+        self.bins = plotter.bins
+        self.include_wgt = plotter.include_wgt or (n_weights is not None)
+        self.n_weights = n_weights
+        shape = (() if (n_weights is None) else (n_weights,)) + (self.bins, self.bins)
+        self.sumw = np.zeros(shape)
+        self.sumw2 = np.zeros(shape) if (errors) else None
+        self.n_events = 0
+        self.sum_wgt = 0. if (n_weights is None) else np.zeros(n_weights)
+
+    def __getstate__(self):
+        """
+        Drops the plotter when pickling, which may hold unpicklable functions.
+        """
+        state = self.__dict__.copy()
+        state["plotter"] = None
+        return state
+
+    def fill(self, events):
+        """
+        Adds the images of an Event, an EventBatch or an iterable of either.
+
+        :param events: Event, EventBatch or iterable of Events or EventBatches.
+        """
+        if (self.plotter is None):
+            raise(ValueError("Cannot fill an accumulator without a plotter"))
+
+        if (isinstance(events, EventBatch)):
+            self.fill_batch(events)
+        elif (isinstance(events, Event) and self.n_weights is not None):
+            self.fill_batch(EventBatch.from_events([events]))
+        elif (isinstance(events, Event)):
+            image = self.plotter.get_image(events)
+            self.sumw += image
+            if (self.sumw2 is not None):
+                self.sumw2 += image**2
+            self.n_events += 1
+            self.sum_wgt += events.wgt
+        else:
+            for ev in events:
+                self.fill(ev)
+        return self
+
+    def tail(self, reader, batch_size: int = 1000, interval: float = 1., timeout: float = None):
+        """
+        Fills the accumulator with the events of a file as they are appended
+        to it, yielding the accumulator after each new batch, e.g. to redraw
+        a live image of a running generator:
+
+            reader = ReaderLHEF("events.lhe", wgt_idx=0, follow=True)
+            for acc in plotter.accumulator().tail(reader, interval=5.):
+                plotter.plot_y_phi(acc.mean())
+
+        Only the new events are binned, so each update costs time
+        proportional to the data appended since the last one.
+
+        :param reader: ReaderLHEF created with follow=True.
+        :param batch_size: int, maximum number of events of each update.
+        :param interval: float, seconds between polls of the file when no new
+               event is found.
+        :param timeout: optional float, seconds without new events after which
+               to stop.
+        """
+        for batch in reader.tail(batch_size, interval, timeout):
+            self.fill(batch)
+            yield self
+
+    @profiling.timed("fill_batch", count=profiling.batch_length)
+    def fill_batch(self, batch: EventBatch):
+        """
+        Adds the images of all events of a batch in a single pass.
+
+        :param batch: EventBatch of the events.
+        """
+        if (self.n_weights is not None):
+            return self.fill_weights(batch)
+
+        ev_idx, rap, phi, fill_val = self.plotter.get_batch_entries(batch)
+        keep, bins = self.plotter.get_flat_bins(rap, phi)
+        size = self.bins * self.bins
+        self.sumw += np.bincount(bins, fill_val[keep], size).reshape(self.bins, self.bins)
+
+        if (self.sumw2 is not None):
+            # sum the values of each event in each bin before squaring
+            keys, inverse = np.unique(ev_idx[keep] * size + bins, return_inverse=True)
+            per_event = np.bincount(inverse.reshape(-1), fill_val[keep], len(keys))
+            self.sumw2 += np.bincount(keys % size, per_event**2, size).reshape(self.bins, self.bins)
+
+        self.n_events += len(batch)
+        self.sum_wgt += float(np.sum(batch.wgt))
+        return self
+
+    def fill_weights(self, batch: EventBatch):
+        """
+        Adds the images of all events of a batch for every event weight.
+
+        The values of each event in each bin are summed once and scaled by
+        all weights of the event together.
+
+        :param batch: EventBatch of the events, with `n_weights` weights.
+        """
+        if (batch.weights.shape[1] != self.n_weights):
+            raise(ValueError("Events have {} weights, the accumulator {}".format(
+                batch.weights.shape[1], self.n_weights)))
+
+        ev_idx, rap, phi, fill_val = self.plotter.get_batch_entries(batch, weighted=False)
+        keep, bins = self.plotter.get_flat_bins(rap, phi)
+        size = self.bins * self.bins
+        keys, inverse = np.unique(ev_idx[keep] * size + bins, return_inverse=True)
+        per_event = np.bincount(inverse.reshape(-1), fill_val[keep], len(keys))
+        values = per_event[:, None] * batch.weights[keys // size]
+        flat = (np.arange(self.n_weights) * size + (keys % size)[:, None]).reshape(-1)
+        shape = (self.n_weights, self.bins, self.bins)
+
+        self.sumw += np.bincount(flat, values.reshape(-1), self.n_weights * size).reshape(shape)
+        if (self.sumw2 is not None):
+            self.sumw2 += np.bincount(flat, values.reshape(-1)**2,
+                                      self.n_weights * size).reshape(shape)
+
+        self.n_events += len(batch)
+        self.sum_wgt = self.sum_wgt + np.sum(batch.weights, axis=0)
+        return self
+
+    def merge(self, other):
+        """
+        Adds the contents of another accumulator with the same binning.
+
+        :param other: ImageAccumulator to add.
+        """
+        if ((self.rap_extent, self.phi_extent, self.bins)
+                != (other.rap_extent, other.phi_extent, other.bins)):
+            raise(ValueError("Cannot merge accumulators with different binning"))
+        if ((self.sumw2 is None) != (other.sumw2 is None)):
+            raise(ValueError("Cannot merge accumulators with and without errors"))
+        if (self.n_weights != other.n_weights):
+            raise(ValueError("Cannot merge accumulators with different numbers of weights"))
+
+        self.sumw += other.sumw
+        if (self.sumw2 is not None):
+            self.sumw2 += other.sumw2
+        self.n_events += other.n_events
+        self.sum_wgt = self.sum_wgt + other.sum_wgt
+        if (self.plotter is None):
+            self.plotter = other.plotter
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def __add__(self, other):
+        result = copy.copy(self)
+        result.sumw = self.sumw.copy()
+        result.sumw2 = None if (self.sumw2 is None) else self.sumw2.copy()
+        return result.merge(other)
+
+    def norm(self):
+        """
+        Normalisation of the average image, the sum of event weights if the
+        values include the weights and otherwise the number of events.
+
+        With multiple weights, an (n_weights, 1, 1) array of the sum of each
+        weight, which broadcasts against the images.
+        """
+        norm = self.sum_wgt if (self.include_wgt) else self.n_events
+        if (np.any(np.asarray(norm) == 0)):
+            raise(ValueError("Cannot normalise an empty accumulator"))
+        return norm if (self.n_weights is None) else np.reshape(norm, (-1, 1, 1))
+
+    def mean(self):
+        """
+        Returns the average image of the accumulated events.
+        """
+        return self.sumw / self.norm()
+
+    def errors(self):
+        """
+        Returns the statistical error of each bin of the average image.
+        """
+        if (self.sumw2 is None):
+            raise(ValueError("Accumulator was created without errors"))
+        return np.sqrt(self.sumw2) / self.norm()
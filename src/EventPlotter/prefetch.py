@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Reader wrapper that reads events ahead in a background thread.
+"""
+import asyncio
+import queue
+import threading
+from .reader import Reader
+
+
+# Marks the end of the wrapped reader in the queue
+_END = object()
+
+
+class PrefetchReader(Reader):
+    """
+    Reads events or batches from another reader in a background thread.
+
+    Reading, decompressing, parsing and building the events run on the
+    thread while the consumer analyses previous events, holding at most
+    `depth` items in memory. Exceptions raised by the wrapped reader are
+    raised again by the consumer. Besides iteration, the reader supports
+    `async for`, awaiting the next item without blocking the event loop.
+
+    :param reader: Reader to read from, e.g. a ReaderLHEF.
+    :param depth: int, maximum number of events or batches read ahead.
+    :param batch_size: optional int, yield EventBatches of this many events
+           read with the iter_batches method of the reader instead of Events.
+    """
+
+    def __init__(self, reader: Reader, depth: int = 8, batch_size: int = None):
+        if depth < 1:
+            raise(ValueError("Prefetch depth must be larger than 0"))
+        if batch_size is not None and not hasattr(reader, "iter_batches"):
+            raise(ValueError("Reader does not support reading batches"))
+
+        self.reader = reader
+        self.depth = depth
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=depth)
+        self.stop = threading.Event()
+        self.done = False
+        self.thread = threading.Thread(target=self._fill, daemon=True)
+        self.thread.start()
+
+    def _fill(self):
+        """
+        Reads items into the queue until the reader is exhausted or closed.
+        """
+        try:
+            items = (self.reader if (self.batch_size is None)
+                     else self.reader.iter_batches(self.batch_size))
+            for item in items:
+                if self.stop.is_set():
+                    return
+                self._put(item)
+            self._put(_END)
+        except Exception as err:
+            self._put(err)
+
+    def _put(self, item):
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, block: bool = True):
+        """
+        Returns the next item, _END at the end of the reader, or None if no
+        item is available without blocking.
+        """
+        if self.done:
+            return _END
+        try:
+            item = self.queue.get(block)
+        except queue.Empty:
+            return None
+        if item is _END or isinstance(item, Exception):
+            self.done = True
+            if isinstance(item, Exception):
+                raise item
+        return item
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """
+        Returns the next event, or batch, waiting for it if needed.
+        """
+        item = self._get()
+        if item is _END:
+            raise StopIteration
+        return item
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        """
+        Awaits the next event, or batch, in an executor if none is ready.
+        """
+        item = self._get(block=False)
+        if item is None:
+            item = await asyncio.get_running_loop().run_in_executor(None, self._get)
+        if item is _END:
+            raise StopAsyncIteration
+        return item
+
+    def close(self):
+        """
+        Stops the background thread and closes the wrapped reader.
+        """
+        self.stop.set()
+        self.thread.join()
+        self.done = True
+        if hasattr(self.reader, "close"):
+            self.reader.close()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+"""
+Opt-in instrumentation of the reading, event construction and plotting stages.
+
+Instrumented functions check for an active Profiler on every call and only
+measure themselves when one is enabled, so the cost when profiling is off
+is a single global lookup:
+
+    with profiling.profile(trace=True) as prof:
+        for ev in ReaderLHEF("events.lhe.gz"):
+            ...
+    print(prof.report())
+    prof.write_trace("trace.json")
+"""
+import functools
+import json
+import os
+import threading
+import time
+
+
+_active = None
+
+
+class Profiler():
+    """
+    Accumulates the calls, time, items and bytes processed by each stage.
+
+    :param trace: bool, whether to also record every call as an event of a
+           Chrome trace timeline, viewable in chrome://tracing or Perfetto.
+    """
+
+    def __init__(self, trace: bool = False):
+        self.trace = trace
+        self.stages = {}
+        self.events = []
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def record(self, name: str, start: float, stop: float, items: int = 1, nbytes: int = 0):
+        """
+        Adds one call of a stage.
+
+        :param name: str name of the stage.
+        :param start, stop: floats, time.perf_counter() at the start and end
+               of the call.
+        :param items: int number of items, e.g. events, processed by the call.
+        :param nbytes: int number of bytes read by the call.
+        """
+        with self.lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = {"calls": 0, "seconds": 0., "items": 0, "bytes": 0}
+            stage["calls"] += 1
+            stage["seconds"] += stop - start
+            stage["items"] += int(items)
+            stage["bytes"] += int(nbytes)
+            if self.trace:
+                self.events.append({"name": name, "ph": "X", "pid": os.getpid(),
+                                    "tid": threading.get_ident(),
+                                    "ts": (start - self.start) * 1E6,
+                                    "dur": (stop - start) * 1E6})
+
+    def merge(self, other):
+        """
+        Adds the stages of another profiler, e.g. one run in a worker process.
+
+        :param other: Profiler to add.
+        """
+        for name, stage in other.stages.items():
+            mine = self.stages.setdefault(name, {"calls": 0, "seconds": 0., "items": 0, "bytes": 0})
+            for key in mine:
+                mine[key] += stage[key]
+        self.events.extend(other.events)
+        return self
+
+    def summary(self):
+        """
+        Returns the totals and throughput of each stage as a dict keyed by
+        the names of the stages.
+        """
+        summary = {}
+        for name, stage in self.stages.items():
+            seconds = stage["seconds"]
+            summary[name] = dict(stage,
+                                 items_per_s=stage["items"] / seconds if (seconds) else 0.,
+                                 mb_per_s=stage["bytes"] / 2**20 / seconds if (seconds) else 0.)
+        return summary
+
+    def report(self):
+        """
+        Returns a table of the summary of the stages, slowest first.
+        """
+        rows = ["{:<20} {:>10} {:>10} {:>12} {:>14} {:>10}".format(
+            "stage", "calls", "seconds", "items", "items/s", "MB/s")]
+        for name, stage in sorted(self.summary().items(), key=lambda x: -x[1]["seconds"]):
+            rows.append("{:<20} {:>10d} {:>10.4f} {:>12d} {:>14.1f} {:>10.2f}".format(
+                name, stage["calls"], stage["seconds"], stage["items"],
+                stage["items_per_s"], stage["mb_per_s"]))
+        return "\n".join(rows)
+
+    def write_summary(self, filename: str):
+        """
+        Writes the summary of the stages to a json file.
+
+        :param filename: str name of the file.
+        """
+        with open(filename, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def write_trace(self, filename: str):
+        """
+        Writes the recorded calls as a Chrome trace json file.
+
+        :param filename: str name of the file.
+        """
+        if not self.trace:
+            raise(ValueError("Profiler was created without tracing"))
+        with open(filename, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+    def __enter__(self):
+        enable(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        disable()
+
+
+def enable(profiler: Profiler = None):
+    """
+    Activates a profiler, a new one by default, and returns it.
+
+    :param profiler: optional Profiler to activate.
+    """
+    global _active
+    _active = Profiler() if (profiler is None) else profiler
+    return _active
+
+
+def disable():
+    """
+    Deactivates profiling and returns the profiler which was active.
+    """
+    global _active
+    profiler, _active = _active, None
+    return profiler
+
+
+def active():
+    """
+    Returns the active Profiler, or None if profiling is disabled.
+    """
+    return _active
+
+
+def profile(trace: bool = False):
+    """
+    Returns a new Profiler which is active within a with block.
+
+    :param trace: bool, whether to record a Chrome trace timeline.
+    """
+    return Profiler(trace)
+
+
+def result_length(result, *args, **kwargs):
+    """
+    Counts the items of the return value of an instrumented function.
+    """
+    return len(result)
+
+
+def batch_length(result, instance, batch, *args, **kwargs):
+    """
+    Counts the events of the batch passed to an instrumented method.
+    """
+    return len(batch)
+
+
+def timed(name: str, count=None):
+    """
+    Decorator recording the calls of a function as the stage `name` when
+    profiling is enabled.
+
+    :param name: str name of the stage.
+    :param count: optional Callable returning the number of items processed,
+           called with the return value followed by the arguments of the
+           function. By default each call counts as one item.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            stop = time.perf_counter()
+            items = 1 if (count is None) else count(result, *args, **kwargs)
+            profiler.record(name, start, stop, items)
+            return result
+        return wrapper
+    return decorator
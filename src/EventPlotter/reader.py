@@ -2,14 +2,26 @@
 """
 Event file reader class definition.
 """
-from .event import Event
+import collections
+import time
+import numpy as np
+from .event import Event, ValidationError, ROLE_OTHER, ROLE_BEAM, ROLE_INCOMING, ROLE_INTERMEDIATE, ROLE_FINAL
 from .particle import Particle
-import xml.etree.ElementTree as ET
+from .batch import ParticleTable, EventBatch
+from .lhe import LHEParser, LHEInit, LHERecord
+from .hepmc import HepMCParser, HepMCRecord
+from .streams import open_stream, split_compression, read_head
+from .index import load_index
+from .selection import Selection
+from . import profiling
 
 
 class Reader():
     """
     Minimal reader class to allow custom derived classes for new formats.
+
+    Readers are context managers, closing their event file when leaving the
+    with block, so file handles are released promptly in long-running jobs.
     """
 
     def __init__(self, filename: str):
@@ -28,45 +40,116 @@ class Reader():
         """
         return self
 
-    def __exit__(self):
+    def close(self):
+        """
+        Releases the event file, if any.
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
         """
-        Closes the event file buffer on destruction if needed.
+        Closes the event file buffer when leaving a with block.
         """
+        self.close()
 
 
-class ReaderLHEF(Reader):
+class StreamReader(Reader):
     """
-    Derived reader class for LHE formatted event input.
+    Base class of the readers streaming events from a text file, which are
+    parsed in bulk into raw records by a parser of the format.
+
+    Derived classes create the `parser`, providing next_event and
+    read_events methods returning records, and build Events and EventBatches
+    from the records with make_event and make_batch.
+
+    :param filename: str name of event file, optionally compressed.
+    :param wgt_idx: optional int indexing which weight to save as the
+           nominal weight `wgt`. All weights are kept in `weights`.
+    :param threaded: bool, whether to decompress compressed files in a
+           background thread.
+    :param validate: str, how events failing momentum conservation are
+           handled: "raise" a ValueError, "drop" them from the output, or
+           "none" to skip validation altogether. Read and failed events
+           are counted in `n_events` and `n_failed`.
+    :param selection: optional Selection applied to the parsed events
+           before any Particles or Events are built, see filter.
     """
 
-    def __init__(self, filename: str, wgt_idx: int=None):
-        """
-        Initialises a LHE reader object from the event file `filename` ending in .lhe.
+    VALIDATION = ("raise", "drop", "none")
 
-        We use the xml implementation of the LHE format to simplify the implementation.
-        :param filename: str name of event file.
-        :param wgt_idx: optional int indexing which weight to save.
-        """
-        if not str(filename).endswith(".lhe"):
-            raise(ValueError("Event file must end with the .lhe extension."))
+    # Number of events a selection is applied to at once when iterating
+    SELECTION_CHUNK = 256
 
-        self.buffer = ET.iterparse(filename, events=("start", "end"))
+    def __init__(self, filename: str, wgt_idx: int=None, threaded: bool=True,
+                 validate: str="raise", selection: Selection=None):
+        if validate not in StreamReader.VALIDATION:
+            raise(ValueError("Validation must be one of {}".format(StreamReader.VALIDATION)))
+
+        self.filename = str(filename)
+        self.stream = open_stream(self.filename, threaded=threaded)
+        self.parser = None
         self.current_event = None
-        self.init_info = None
         self.wgt_idx = wgt_idx
-        self.beams = []
         self.com_energy = 0.
-        while not self.init_info:
-            tmp_xml_event = next(self.buffer)
-            if tmp_xml_event[1].tag == "init":
-                self.set_init_info(tmp_xml_event[1].text)
+        self.system = Particle()
+        self.weight_ids = []
+        self.validate = validate
+        self.n_events = 0
+        self.n_failed = 0
+        self.selection = selection
+        self._pending = collections.deque()
+
+    def close(self):
+        """
+        Closes the event file.
+        """
+        self.stream.close()
 
+    def filter(self, min_pt: float=None, n_partons=None, y_range=None):
+        """
+        Skips the events failing the given cuts, which are evaluated on the
+        parsed arrays of many events at once, so no Particles or Events are
+        built for rejected events. The cuts are appended to any previous
+        selection and the fraction of events passing each is given by
+        `selection.efficiencies()`.
+
+        :param min_pt: optional float, minimum transverse momentum of the
+               leading final state parton.
+        :param n_partons: optional int minimum number of final state partons,
+               or (min, max) tuple of the allowed numbers.
+        :param y_range: optional (low, high) window the rapidities of all
+               final state partons must lie in.
+        """
+        cuts = Selection(min_pt, n_partons, y_range)
+        if self.selection is None:
+            self.selection = cuts
+        else:
+            for name, cut in cuts.cuts:
+                self.selection.add(name, cut)
+        return self
 
     def advance(self):
         """
-        Wrapper around next for event buffer
+        Returns the raw record of the next event in the file passing the
+        selection of the reader, if any.
         """
-        return next(self.buffer)
+        if self.selection is None:
+            record = self.parser.next_event()
+            if record is None:
+                raise StopIteration
+            self.n_events += 1
+            return record
+
+        while not self._pending:
+            records = self.parser.read_events(self.SELECTION_CHUNK)
+            if not records:
+                raise StopIteration
+            self.n_events += len(records)
+            passed = self.selection.apply(self.make_batch(records))
+            self._pending.extend(rec for rec, keep in zip(records, passed) if keep)
+        return self._pending.popleft()
 
     def __iter__(self):
         """
@@ -78,53 +161,430 @@ class ReaderLHEF(Reader):
         """
         Advances the reader by one event.
         """
-        xml_event = self.advance()
-        wgts = None
+        while True:
+            record = self.advance()
+            if self.validate != "drop":
+                break
+            try:
+                event = self.make_event(record)
+            except ValidationError:
+                event = None
+            if event is not None and event.check_momentum():
+                self.current_event = event
+                return event
+            self.n_failed += 1
+
+        try:
+            self.current_event = self.make_event(record)
+        except ValidationError:
+            self.n_failed += 1
+            raise
+        return self.current_event
+
+    def select_weight(self, record):
+        """
+        Returns the weight at `wgt_idx` of an event record.
+
+        :param record: raw record of the event.
+        """
+        if self.wgt_idx >= len(record.weights):
+            raise(ValueError("Event has no weight at index {}".format(self.wgt_idx)))
+        return float(record.weights[self.wgt_idx])
+
+    def batch_weights(self, records):
+        """
+        Returns the nominal weights, or None without `wgt_idx`, and the
+        (n_events, n_weights) array of all weights of event records.
+
+        :param records: list of raw event records.
+        """
+        wgt = None
+        if self.wgt_idx is not None:
+            wgt = [self.select_weight(rec) for rec in records]
+
+        n_weights = {len(rec.weights) for rec in records}
+        if len(n_weights) > 1:
+            raise(ValueError("All events must have the same number of weights"))
+        n_weights = n_weights.pop() if records else len(self.weight_ids)
+        weights = np.zeros((len(records), n_weights))
+        if records and n_weights:
+            weights = np.concatenate([rec.weights for rec in records]).reshape(len(records), -1)
+        return wgt, weights
+
+    def read_weights(self, size: int):
+        """
+        Reads the process ids and nominal weights of up to `size` events,
+        without parsing their particles, e.g. for a WeightSummary. The
+        nominal weight is the one at `wgt_idx`, if given, and otherwise the
+        event weight of the format. The arrays are empty at the end of the
+        file.
+
+        :param size: int, maximum number of events to read.
+        """
+        if self.selection is not None:
+            raise(ValueError("Weights cannot be read without particles with a selection"))
+        processes, nominal, weights = self.parser.read_weights(size)
+        self.n_events += len(nominal)
+        if self.wgt_idx is not None:
+            if any(self.wgt_idx >= len(wgts) for wgts in weights):
+                raise(ValueError("Event has no weight at index {}".format(self.wgt_idx)))
+            nominal = np.array([wgts[self.wgt_idx] for wgts in weights], dtype=np.float64)
+        return processes, nominal
+
+    def get_weight_ids(self, record, n_weights: int):
+        """
+        Returns the ids of the weights of an event, those declared by the
+        file if it declares as many weights, and None otherwise.
+
+        :param record: optional raw record of the event.
+        :param n_weights: int, number of weights of the event.
+        """
+        if len(self.weight_ids) == n_weights:
+            return list(self.weight_ids)
+        return [None] * n_weights
+
+    def read_batch(self, size: int):
+        """
+        Reads up to `size` events into a columnar EventBatch.
+
+        No Particle or Event objects are constructed and the particle lines of
+        all events are parsed in a single call. The batch is empty at the end
+        of the file.
+
+        Momentum conservation is checked for the whole batch at once,
+        following the `validate` setting of the reader, after the selection
+        of the reader, if any, is applied.
+
+        Events already read ahead by the selection of iteration with next
+        are returned first.
+
+        :param size: int, maximum number of events read into the batch.
+        """
+        if self._pending:
+            return self.pending_batch(size)
+        return self.process_records(self.parser.read_events(size))
+
+    def iter_batches(self, size: int):
+        """
+        Yields EventBatches of up to `size` events until the file is exhausted.
+
+        :param size: int, maximum number of events in each batch.
+        """
+        while self._pending:
+            batch = self.pending_batch(size)
+            if len(batch):
+                yield batch
+        records = self.parser.read_events(size)
+        while records:
+            batch = self.process_records(records)
+            if len(batch):
+                yield batch
+            records = self.parser.read_events(size)
+
+    def pending_batch(self, size: int):
+        """
+        Builds the EventBatch of up to `size` records read ahead by advance,
+        which are already counted and passed the selection of the reader.
+
+        :param size: int, maximum number of events in the batch.
+        """
+        records = [self._pending.popleft() for idx in range(min(size, len(self._pending)))]
+        return self.validate_batch(self.make_batch(records))
+
+    def process_records(self, records):
+        """
+        Builds the EventBatch of the records passing the selection and
+        validation of the reader.
+
+        :param records: list of raw event records.
+        """
+        self.n_events += len(records)
+        batch = self.make_batch(records)
+        if self.selection is not None:
+            batch = self.selection.select(batch)
+        return self.validate_batch(batch)
+
+    def validate_batch(self, batch: EventBatch):
+        """
+        Counts, and raises on or drops, the events of a batch that fail
+        momentum conservation according to the `validate` setting.
+
+        :param batch: EventBatch of the events.
+        """
+        if self.validate == "none":
+            return batch
+
+        valid = batch.check_momentum()
+        n_failed = int(len(batch) - np.count_nonzero(valid))
+        self.n_failed += n_failed
+        if n_failed and self.validate == "raise":
+            raise(ValidationError("Momentum not conserved in {} event(s)".format(n_failed)))
+        return batch.select(valid) if (n_failed) else batch
+
+
+class ReaderLHEF(StreamReader):
+    """
+    Derived reader class for LHE formatted event input.
+
+    Events start with a system row and the two beams of the file, which are
+    shared by all events rather than copied, followed by the particles of
+    the event. Their roles are set from the LHE status codes.
+    """
+
+    # Roles of the leading system and beam rows of each event
+    HEAD_ROLES = np.array([ROLE_OTHER, ROLE_BEAM, ROLE_BEAM], dtype=np.int8)
+
+    EXTENSIONS = (".lhe",)
+
+    MAGIC = b"<LesHouchesEvents"
+
+    def __init__(self, filename: str, wgt_idx: int=None, threaded: bool=True,
+                 start: int=None, stop: int=None, validate: str="raise",
+                 selection: Selection=None, follow: bool=False):
+        """
+        Initialises a LHE reader object from the event file `filename` ending in .lhe,
+        optionally compressed and ending in .lhe.gz, .lhe.bz2, .lhe.xz or .lhe.zst.
+        Files with other extensions are accepted if they start as LHE files.
+
+        The file is scanned as a stream of raw text by an LHEParser, so memory
+        use does not grow with the size of the file.
+        :param filename: str name of event file.
+        :param wgt_idx: optional int indexing which weight to save as the
+               nominal weight `wgt`. All weights are kept in `weights`.
+        :param threaded: bool, whether to decompress compressed files in a
+               background thread.
+        :param start, stop: optional ints, read only the events whose <event> tag
+               lies in the byte range [start, stop) of an uncompressed file.
+        :param validate: str, how events failing momentum conservation are
+               handled: "raise" a ValueError, "drop" them from the output, or
+               "none" to skip validation altogether. Read and failed events
+               are counted in `n_events` and `n_failed`.
+        :param selection: optional Selection applied to the parsed events
+               before any Particles or Events are built, see filter.
+        :param follow: bool, whether to follow an uncompressed file which is
+               still being written, see tail. Iteration then stops at the
+               last complete event and picks up newly appended events when
+               resumed.
+        """
+        if not has_format(filename, ReaderLHEF):
+            raise(ValueError("Event file must end with the .lhe extension, "
+                             "optionally followed by .gz, .bz2, .xz or .zst."))
+        if follow and split_compression(filename)[1]:
+            raise(ValueError("Only uncompressed files can be followed"))
+
+        super().__init__(filename, wgt_idx, threaded, validate, selection)
+        self.parser = LHEParser(self.stream, stop, follow)
+        self.init_info = None
+        self.beams = []
+        self._index = None
+        try:
+            self.set_init_info(self.parser.read_init())
+        except ValueError:
+            self.close()
+            raise
+        self.start = start
+        if start is not None and start > self.parser.position:
+            self.parser.seek(start)
+
+    @property
+    def index(self):
+        """
+        Byte offsets of the events of the file, or of the byte range
+        [start, stop) of the reader, loaded from or written to a sidecar
+        index file on first use.
+        """
+        if self._index is None:
+            offsets = load_index(self.filename)
+            if self.start is not None:
+                offsets = offsets[offsets >= self.start]
+            if self.parser.stop is not None:
+                offsets = offsets[offsets < self.parser.stop]
+            self._index = offsets
+        return self._index
+
+    def __len__(self):
+        """
+        Number of events in the file, or in the byte range of the reader.
+        """
+        return len(self.index)
+
+    def seek(self, idx: int):
+        """
+        Moves the reader such that the next event returned is event `idx`.
+
+        Compressed files are reopened without a background thread to allow
+        seeking, which requires decompressing from the start of the file.
+        :param idx: int, index of the event.
+        """
+        n = len(self)
+        if idx < -n or idx >= n:
+            raise(IndexError("Event index out of range"))
+        if not self.stream.seekable():
+            self.stream.close()
+            self.stream = open_stream(self.filename, threaded=False)
+            self.parser.stream = self.stream
+        self._pending.clear()
+        self.parser.seek(int(self.index[idx % n]))
 
-        # Write initialisation information if provided in LHE file
-        while xml_event[1].tag != "event":
-            if xml_event[0] == "end" and xml_event[1].tag == "init":
-                self.set_init_info(xml_event[1].text)
+    def __getitem__(self, idx):
+        """
+        Returns event `idx`, or a list of events for a slice.
+
+        Indices count all events of the file, or of the byte range of the
+        reader, so the selection of the reader and dropping of events
+        failing validation do not apply to indexed access.
+        The reader continues from the event after the last one returned.
+        """
+        if isinstance(idx, slice):
+            return [self[pos] for pos in range(*idx.indices(len(self)))]
+
+        self.seek(idx)
+        record = self.parser.next_event()
+        self.n_events += 1
+        self.current_event = self.make_event(record)
+        return self.current_event
+
+    def tail(self, batch_size: int=None, interval: float=1., timeout: float=None):
+        """
+        Yields the events of a followed file as they are appended to it, e.g.
+        by a running generator, or EventBatches of up to `batch_size` events.
 
-            xml_event = self.advance()
+        The reader keeps its position in the file, so each poll only reads
+        the data appended since the previous one. Tailing stops at the closing
+        </LesHouchesEvents> tag, or when no new event has been appended for
+        `timeout` seconds.
 
-        # Look only at events for event record
-        while not (xml_event[1].tag == "event" and xml_event[0] == "end"):
-            # Keep weights if provided
-            if xml_event[1].tag == "weights" and xml_event[0] == "end":
-                wgts = [float(x) for x in xml_event[1].text.strip().split()]
+        :param batch_size: optional int, yield batches of this size instead
+               of Events.
+        :param interval: float, seconds to wait before polling the file again
+               when no new event is found.
+        :param timeout: optional float, seconds without new events after which
+               to stop, by default tail until the end of the file is written.
+        """
+        if not self.parser.follow:
+            raise(ValueError("Reader must be created with follow=True to tail a file"))
+
+        idle_since = time.monotonic()
+        while True:
+            n_read = self.n_events
+            yield from (self if (batch_size is None) else self.iter_batches(batch_size))
+            if self.parser.finished:
+                return
+            if self.n_events > n_read:
+                idle_since = time.monotonic()
+            elif timeout is not None and time.monotonic() - idle_since >= timeout:
+                return
+            else:
+                time.sleep(interval)
+
+    def watch(self, callback, batch_size: int=None, interval: float=1., timeout: float=None):
+        """
+        Calls `callback` with each event, or EventBatch, of a followed file as
+        it is appended, see tail for the arguments. Returns the number of
+        events read.
 
-            xml_event = self.advance()
+        :param callback: Callable taking an Event, or an EventBatch if
+               `batch_size` is given.
+        """
+        for item in self.tail(batch_size, interval, timeout):
+            callback(item)
+        return self.n_events
 
-        text_event = xml_event[1].text.strip().split("\n")
+    @profiling.timed("build_event")
+    def make_event(self, record: LHERecord):
+        """
+        Builds an Event from the raw record of an LHE event.
 
-        # Add particles to event container, starting with system and beams
-        parts = []
-        parts.append(Particle())
-        parts.append(self.beams[0])
-        parts.append(self.beams[1])
-        for idx, line in enumerate(text_event[1:]):
-            data = line.split()
+        :param record: LHERecord of the event.
+        """
+        # Add particles to event container, starting with the system and beams
+        # shared by all events of the file
+        parts = [self.system, self.beams[0], self.beams[1]]
+        for data in record.particles.tolist():
             parts.append(Particle(pdg=int(data[0]),
                                   status=self.convert_status(int(data[1])),
+                                  mothers=(int(data[2]), int(data[3])),
                                   cols=(int(data[4]), int(data[5])),
-                                  px=float(data[6]),
-                                  py=float(data[7]),
-                                  pz=float(data[8]),
-                                  e=float(data[9]),
-                                  m=float(data[10]),
+                                  px=data[6],
+                                  py=data[7],
+                                  pz=data[8],
+                                  e=data[9],
+                                  m=data[10],
                                   check_on_shell=False
                                   )
                          )
 
+        validate = self.validate == "raise"
+        roles = np.concatenate([ReaderLHEF.HEAD_ROLES,
+                                self.convert_roles(record.particles[:, 1].astype(np.int64))])
         if self.wgt_idx is not None:
             return Event(particles=parts,
                          root_s=self.com_energy,
                          set_info=False,
-                         wgt=wgts[self.wgt_idx]
+                         wgt=self.select_weight(record),
+                         validate=validate,
+                         weights=record.weights,
+                         roles=roles
                          )
 
-        return Event(particles=parts, root_s=self.com_energy, set_info=False)
+        return Event(particles=parts, root_s=self.com_energy, set_info=False, validate=validate,
+                     weights=record.weights, roles=roles)
+
+    @profiling.timed("build_batch", count=profiling.result_length)
+    def make_batch(self, records):
+        """
+        Builds an EventBatch from the raw records of LHE events.
+
+        Each event holds the same leading system and beam rows as the events
+        returned by iteration, so particle indices agree between the two.
+
+        :param records: list of LHERecords.
+        """
+        n_parts = np.array([len(rec.particles) for rec in records], dtype=np.int64)
+        offsets = np.zeros(len(records) + 1, dtype=np.int64)
+        np.cumsum(n_parts + 3, out=offsets[1:])
+        table = ParticleTable(pdg=np.zeros(offsets[-1], dtype=np.int64))
+
+        if records:
+            data = np.concatenate([rec.particles for rec in records])
+            starts = offsets[:-1]
+            rows = np.ones(offsets[-1], dtype=bool)
+            rows[starts] = False
+            table.roles[starts] = ROLE_OTHER
+            for beam_idx, beam in enumerate(self.beams):
+                rows[starts + 1 + beam_idx] = False
+                table[starts + 1 + beam_idx] = beam
+                table.roles[starts + 1 + beam_idx] = ROLE_BEAM
+
+            table.pdg[rows] = data[:, 0]
+            table.status[rows] = self.convert_status_array(data[:, 1].astype(np.int64))
+            table.mothers[rows] = data[:, 2:4]
+            table.cols[rows] = data[:, 4:6]
+            table.px[rows] = data[:, 6]
+            table.py[rows] = data[:, 7]
+            table.pz[rows] = data[:, 8]
+            table.e[rows] = data[:, 9]
+            table.m[rows] = data[:, 10]
+            table.roles[rows] = self.convert_roles(data[:, 1].astype(np.int64))
+
+        wgt, weights = self.batch_weights(records)
+        return EventBatch(table, offsets, root_s=np.full(len(records), self.com_energy), wgt=wgt,
+                          weights=weights,
+                          weight_ids=self.get_weight_ids(records[0] if records else None,
+                                                         weights.shape[1]))
+
+    def get_weight_ids(self, record: LHERecord, n_weights: int):
+        """
+        Returns the ids of the weights of an event, taken from its <rwgt>
+        block, or else from the <initrwgt> block of the file if it declares
+        as many weights, and None otherwise.
+
+        :param record: optional LHERecord of the event.
+        :param n_weights: int, number of weights of the event.
+        """
+        if record is not None and any(wid is not None for wid in record.weight_ids):
+            return list(record.weight_ids)
+        return super().get_weight_ids(record, n_weights)
 
     def convert_status(self, lhe_status: int):
         """
@@ -141,14 +601,35 @@ class ReaderLHEF(Reader):
         else:
             return lhe_status
 
-    def set_init_info(self, info: str=None):
+    def convert_status_array(self, lhe_status):
+        """
+        Convert an array of LHE status codes to Pythia-friendly format.
+
+        :param lhe_status: int array, statuses in LHE format.
+        """
+        return np.select([lhe_status == -1, lhe_status == 2, lhe_status == 1],
+                         [-21, -22, 23], lhe_status)
+
+    def convert_roles(self, lhe_status):
+        """
+        Returns the role index of particles from an array of their LHE
+        status codes: incoming (-1), final (1) and otherwise intermediate.
+
+        :param lhe_status: int array, statuses in LHE format.
+        """
+        return np.select([lhe_status == -1, lhe_status == 1], [ROLE_INCOMING, ROLE_FINAL],
+                         ROLE_INTERMEDIATE).astype(np.int8)
+
+    def set_init_info(self, info: LHEInit=None):
         """
         Set info from initialisation of LHE file.
 
-        :param info: str, the xml data in string format.
+        :param info: LHEInit, or str of the xml data of the <init> block.
         """
+        if isinstance(info, str):
+            info = LHEInit.from_text(info)
         if self.init_info is None:
-            init_info = [float(i) for i in info.strip().split("\n")[0].split()]
+            init_info = info.beam_info
             self.beams.append(Particle(pdg=int(init_info[0]),
                                        status=-1,
                                        pz=init_info[2],
@@ -161,3 +642,221 @@ class ReaderLHEF(Reader):
                               )
             self.com_energy = self.beams[0].E() + self.beams[1].E()
             self.init_info = init_info
+            self.processes = info.processes
+            self.weight_ids = list(info.weight_ids)
+
+
+class ReaderHepMC3(StreamReader):
+    """
+    Derived reader class for HepMC3 ASCII formatted event input.
+
+    Events hold a leading system row followed by the particles of the file,
+    so particle indices agree with the HepMC particle ids. The mothers and
+    daughters of a particle are the first and last particles going into its
+    production vertex and coming out of its end vertex. Status codes are
+    converted to the Pythia-like convention of the LHE reader: beams (4)
+    become -4, incoming partons of the hard process (21) become -21, final
+    state particles (1) keep status 1 and all other particles get status 0.
+    """
+
+    EXTENSIONS = (".hepmc", ".hepmc3")
+
+    MAGIC = b"HepMC::Asciiv3"
+
+    def __init__(self, filename: str, wgt_idx: int=None, threaded: bool=True,
+                 start: int=None, stop: int=None, validate: str="none",
+                 selection: Selection=None):
+        """
+        Initialises a HepMC3 reader object from the event file `filename` ending in
+        .hepmc or .hepmc3, optionally compressed. Files with other extensions are
+        accepted if they start as HepMC3 ASCII files.
+
+        The file is scanned as a stream of raw text by a HepMCParser, so memory
+        use does not grow with the size of the file.
+        :param filename: str name of event file.
+        :param wgt_idx: optional int indexing which weight to save as the
+               nominal weight `wgt`. All weights are kept in `weights`.
+        :param threaded: bool, whether to decompress compressed files in a
+               background thread.
+        :param start, stop: optional ints, read only the events whose E line
+               lies in the byte range [start, stop) of an uncompressed file.
+        :param validate: str, how events failing momentum conservation are
+               handled, see ReaderLHEF. Showered events do not conserve
+               momentum between the incoming partons and the final state, so
+               validation is off by default.
+        :param selection: optional Selection applied to the parsed events
+               before any Particles or Events are built.
+        """
+        if not has_format(filename, ReaderHepMC3):
+            raise(ValueError("Event file must end with the .hepmc or .hepmc3 extension, "
+                             "optionally followed by .gz, .bz2, .xz or .zst."))
+
+        super().__init__(filename, wgt_idx, threaded, validate, selection)
+        self.parser = HepMCParser(self.stream, stop)
+        try:
+            self.run_info = self.parser.read_run()
+        except ValueError:
+            self.close()
+            raise
+        self.weight_ids = list(self.run_info.weight_ids)
+        if start is not None and start > self.parser.position:
+            self.parser.seek(start)
+
+    def convert_status_array(self, hepmc_status):
+        """
+        Convert an array of HepMC status codes to Pythia-friendly format.
+
+        :param hepmc_status: int array, statuses in HepMC format.
+        """
+        return np.select([hepmc_status == 4, hepmc_status == 21, hepmc_status == 1],
+                         [-4, -21, 1], 0)
+
+    def convert_roles(self, hepmc_status):
+        """
+        Returns the role index of particles from an array of their HepMC
+        status codes: beams (4), incoming (21), final (1) and otherwise
+        intermediate.
+
+        :param hepmc_status: int array, statuses in HepMC format.
+        """
+        return np.select([hepmc_status == 4, hepmc_status == 21, hepmc_status == 1],
+                         [ROLE_BEAM, ROLE_INCOMING, ROLE_FINAL], ROLE_INTERMEDIATE).astype(np.int8)
+
+    def make_table(self, record: HepMCRecord):
+        """
+        Returns the ParticleTable of an event, starting with the system row.
+
+        :param record: HepMCRecord of the event.
+        """
+        data = record.particles
+        mothers, daughters = record.relations()
+        table = ParticleTable(pdg=np.zeros(len(data) + 1, dtype=np.int64))
+        table.pdg[1:] = data[:, 2]
+        table.status[1:] = self.convert_status_array(data[:, 8].astype(np.int64))
+        table.mothers[1:] = mothers
+        table.daughters[1:] = daughters
+        table.px[1:] = data[:, 3]
+        table.py[1:] = data[:, 4]
+        table.pz[1:] = data[:, 5]
+        table.e[1:] = data[:, 6]
+        table.m[1:] = data[:, 7]
+        table.roles[0] = ROLE_OTHER
+        table.roles[1:] = self.convert_roles(data[:, 8].astype(np.int64))
+        return table
+
+    def root_s(self, record: HepMCRecord):
+        """
+        Returns the CoM energy of an event, the sum of its beam energies,
+        which also sets `com_energy` on the first event.
+
+        :param record: HepMCRecord of the event.
+        """
+        data = record.particles
+        root_s = float(np.sum(data[data[:, 8] == 4, 6]))
+        if not self.com_energy:
+            self.com_energy = root_s
+        return root_s
+
+    @profiling.timed("build_event")
+    def make_event(self, record: HepMCRecord):
+        """
+        Builds an Event from the raw record of a HepMC event.
+
+        :param record: HepMCRecord of the event.
+        """
+        t = self.make_table(record)
+        parts = [self.system]
+        for pdg, status, mothers, daughters, px, py, pz, e, m in zip(
+                t.pdg[1:].tolist(), t.status[1:].tolist(), t.mothers[1:].tolist(),
+                t.daughters[1:].tolist(), t.px[1:].tolist(), t.py[1:].tolist(),
+                t.pz[1:].tolist(), t.e[1:].tolist(), t.m[1:].tolist()):
+            parts.append(Particle(pdg=pdg, status=status, mothers=tuple(mothers),
+                                  daughters=tuple(daughters), px=px, py=py, pz=pz, e=e, m=m,
+                                  check_on_shell=False))
+
+        wgt = 1. if (self.wgt_idx is None) else self.select_weight(record)
+        return Event(particles=parts, root_s=self.root_s(record), set_info=False, wgt=wgt,
+                     validate=self.validate == "raise", weights=record.weights, roles=t.roles)
+
+    @profiling.timed("build_batch", count=profiling.result_length)
+    def make_batch(self, records):
+        """
+        Builds an EventBatch from the raw records of HepMC events.
+
+        :param records: list of HepMCRecords.
+        """
+        tables = [self.make_table(rec) for rec in records]
+        offsets = np.zeros(len(records) + 1, dtype=np.int64)
+        np.cumsum([len(t) for t in tables], out=offsets[1:])
+        table = ParticleTable.concatenate(tables)
+
+        wgt, weights = self.batch_weights(records)
+        return EventBatch(table, offsets, root_s=[self.root_s(rec) for rec in records], wgt=wgt,
+                          weights=weights, weight_ids=self.get_weight_ids(None, weights.shape[1]))
+
+
+# Reader classes recognised by open_events, by extension or leading bytes
+READERS = [ReaderLHEF, ReaderHepMC3]
+
+
+def register_reader(cls):
+    """
+    Adds a reader class to the formats recognised by open_events and
+    returns it, so it can be used as a class decorator.
+
+    :param cls: Reader class with an `EXTENSIONS` tuple of the extensions
+           of its files and optionally a `MAGIC` bytes string found at the
+           start of them. It is constructed with the name of the file, and
+           to be used with a ParallelReader must also accept the `start` and
+           `stop` keyword arguments.
+    """
+    if cls not in READERS:
+        READERS.append(cls)
+    return cls
+
+
+def has_format(filename: str, cls):
+    """
+    Returns whether a file, optionally compressed, has one of the extensions
+    of a reader class or starts with its magic bytes.
+
+    :param filename: str name of the file.
+    :param cls: Reader class.
+    """
+    if split_compression(filename)[0].endswith(tuple(cls.EXTENSIONS)):
+        return True
+    magic = getattr(cls, "MAGIC", None)
+    return bool(magic) and magic in read_head(filename)
+
+
+def reader_class(filename: str):
+    """
+    Returns the registered reader class of an event file, chosen from its
+    extension, after any compression extension, or else from its first bytes.
+
+    :param filename: str name of the file.
+    """
+    base = split_compression(filename)[0]
+    for cls in READERS:
+        if base.endswith(tuple(cls.EXTENSIONS)):
+            return cls
+    head = read_head(filename)
+    for cls in READERS:
+        magic = getattr(cls, "MAGIC", None)
+        if magic and magic in head:
+            return cls
+    raise(ValueError("Unknown format of event file {}".format(filename)))
+
+
+def open_events(filename: str, **kwargs):
+    """
+    Opens an event file with the reader of its format, e.g.:
+
+        with open_events("events.hepmc.gz", wgt_idx=0) as reader:
+            for ev in reader:
+                ...
+
+    :param filename: str name of the file.
+    :param kwargs: keyword arguments passed to the reader.
+    """
+    return reader_class(filename)(filename, **kwargs)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""
+Headless figure rendering of y-phi images on the Agg backend.
+"""
+import collections
+import matplotlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+
+def to_mathtext(label: str):
+    """
+    Converts a LaTeX label to the subset of TeX understood by mathtext.
+
+    :param label: str label.
+    """
+    return label.replace(r"\textrm{", r"\mathrm{")
+
+
+class FigureRenderer():
+    """
+    Renders y-phi images to files with a single reusable Figure.
+
+    Unlike Plotter.plot_y_phi, the renderer does not use the global pyplot
+    state: the figure, axes, image and colorbar are created once and only
+    the image data and product markers are replaced between renders, so
+    separate renderers can be used from separate threads.
+
+    :param rap_extent, phi_extent: extents of the image axes.
+    :param color_map: matplotlib colormap of the image.
+    :param z_label: str label of the colorbar.
+    :param usetex: bool, whether to typeset labels with LaTeX, otherwise the
+           much faster built-in mathtext is used.
+    :param dpi: int, resolution of the saved figures.
+    """
+
+    def __init__(self, rap_extent, phi_extent, color_map, z_label: str,
+                 usetex: bool = False, dpi: int = 100):
+        self.usetex = usetex
+        self.dpi = dpi
+        self.markers = []
+        labels = [r'$y$', r'$\phi \quad [\textrm{rad}]$', z_label]
+        if (not usetex):
+            labels = [to_mathtext(label) for label in labels]
+
+        with matplotlib.rc_context(self.rc_params()):
+            self.figure = Figure()
+            FigureCanvasAgg(self.figure)
+            self.axes = self.figure.add_subplot()
+            self.axes.set_xlabel(labels[0])
+            self.axes.set_ylabel(labels[1])
+
+            rap_length = np.abs(rap_extent[0] - rap_extent[1])
+            phi_length = np.abs(phi_extent[0] - phi_extent[1])
+            self.image = self.axes.imshow(np.zeros((2, 2)), interpolation='none', origin='lower',
+                                          aspect=rap_length/phi_length,
+                                          extent=[rap_extent[0], rap_extent[1],
+                                                  phi_extent[0], phi_extent[1]],
+                                          cmap=color_map)
+            self.colorbar = self.figure.colorbar(self.image, ax=self.axes)
+            self.colorbar.set_label(labels[2])
+
+    @classmethod
+    def from_plotter(cls, plotter, usetex: bool = False, dpi: int = 100):
+        """
+        Creates a renderer with the extents, colormap and label of a Plotter.
+        """
+        return cls(plotter.rap_extent, plotter.phi_extent, plotter.color_map,
+                   plotter.z_label, usetex, dpi)
+
+    def rc_params(self):
+        return {"text.usetex": self.usetex, "font.family": "serif"}
+
+    def render(self, image, path: str, products = None):
+        """
+        Writes the figure of an image to `path`.
+
+        :param image: a (bins x bins) dimensional numpy array
+        :param path: str name of the file written, the format is taken from
+               its extension.
+        :param products: (optional) array-like container [id,y,phi,fill_value]
+               for particles to be displayed as scatter points
+        """
+        if image is None:
+            raise(ValueError("Must provide an image to plot"))
+        image = np.asarray(image)
+        self.image.set_data(image)
+        self.image.set_clim(np.min(image), np.max(image))
+
+        for marker in self.markers:
+            marker.remove()
+        self.markers = []
+        with matplotlib.rc_context(self.rc_params()):
+            if products:
+                for pt in products:
+                    self.markers.append(self.axes.scatter(pt[1], pt[2], c="black", marker="x"))
+                    self.markers.append(self.axes.annotate(r"id="+str(round(pt[0])),
+                                                           (pt[1]+0.1, pt[2]+0.1)))
+            self.figure.savefig(path, bbox_inches='tight', dpi=self.dpi)
+        return path
+
+
+# Renderer of each worker process of render_many
+_worker_renderer = None
+
+
+def _init_worker(settings):
+    global _worker_renderer
+    _worker_renderer = FigureRenderer(**settings)
+
+
+def _render_chunk(images, paths):
+    return [_worker_renderer.render(image, path) for image, path in zip(images, paths)]
+
+
+def render_many(plotter, images, paths, workers: int = 1, usetex: bool = False,
+                dpi: int = 100, chunk_size: int = 64):
+    """
+    Writes the figures of many images, in parallel over worker processes.
+
+    Each worker creates a single FigureRenderer and reuses it for all the
+    images it is handed.
+
+    :param plotter: Plotter providing the extents, colormap and label.
+    :param images: array-like container of (bins x bins) images, e.g. the
+           output of Plotter.get_images.
+    :param paths: array-like container of str names of the files written.
+    :param workers: int, number of worker processes.
+    :param usetex: bool, whether to typeset labels with LaTeX.
+    :param dpi: int, resolution of the saved figures.
+    :param chunk_size: int, number of images sent to a worker at a time,
+           with at most two chunks per worker sent ahead.
+    """
+    paths = list(paths)
+    if (len(images) != len(paths)):
+        raise(ValueError("Must provide one path per image"))
+
+    settings = {"rap_extent": plotter.rap_extent, "phi_extent": plotter.phi_extent,
+                "color_map": plotter.color_map, "z_label": plotter.z_label,
+                "usetex": usetex, "dpi": dpi}
+    if (workers == 1):
+        renderer = FigureRenderer(**settings)
+        return [renderer.render(image, path) for image, path in zip(images, paths)]
+
+    # chunks are sliced when submitted, so that at most `depth` chunks of
+    # images are copied at a time, e.g. from a memory mapped array
+    depth = 2 * workers
+    written = []
+    pending = collections.deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(settings,)) as pool:
+        for start in range(0, len(paths), chunk_size):
+            if (len(pending) >= depth):
+                written.extend(pending.popleft().result())
+            pending.append(pool.submit(_render_chunk, np.asarray(images[start:start + chunk_size]),
+                                       paths[start:start + chunk_size]))
+        while pending:
+            written.extend(pending.popleft().result())
+    return written
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+Event selections evaluated on columnar event batches.
+
+Cuts are functions of an EventBatch returning a mask of the events which
+pass, so a selection can be applied by a reader to the parsed arrays of
+many events at once, before any Particle or Event objects are built.
+"""
+import functools
+import numpy as np
+from . import kinematics
+from . import profiling
+from .batch import EventBatch
+from .observables import final_mask
+
+
+def leading_pt(batch: EventBatch, min_pt: float):
+    """
+    Mask of the events whose leading final state parton has a transverse
+    momentum of at least `min_pt`.
+
+    :param batch: EventBatch of the events.
+    :param min_pt: float, minimum transverse momentum.
+    """
+    t = batch.table
+    pt = np.where(final_mask(batch, partons_only=True), kinematics.perp(t.px, t.py), -np.inf)
+    return batch.segment_max(pt) >= min_pt
+
+
+def parton_multiplicity(batch: EventBatch, n_min: int, n_max: int = None):
+    """
+    Mask of the events with between `n_min` and `n_max` (inclusive) final
+    state partons.
+
+    :param batch: EventBatch of the events.
+    :param n_min: int, minimum number of partons.
+    :param n_max: optional int, maximum number of partons.
+    """
+    n = batch.segment_sum(final_mask(batch, partons_only=True).astype(np.int64))
+    return (n >= n_min) & ((n <= n_max) if (n_max is not None) else True)
+
+
+def rapidity_window(batch: EventBatch, low: float, high: float):
+    """
+    Mask of the events whose final state partons all have rapidities
+    within [low, high].
+
+    :param batch: EventBatch of the events.
+    :param low, high: floats, edges of the window.
+    """
+    t = batch.table
+    rap = kinematics.rapidity(t.pz, t.e)
+    outside = final_mask(batch, partons_only=True) & ((rap < low) | (rap > high))
+    return batch.segment_sum(outside.astype(np.int64)) == 0
+
+
+class Selection():
+    """
+    Ordered list of cuts with a record of how many events pass each of them.
+
+    Each cut is only counted for the events passing all the cuts before it,
+    giving a cut flow. The standard cuts are set with the keyword
+    arguments, further cuts can be appended with add.
+
+    :param min_pt: optional float, minimum transverse momentum of the
+           leading final state parton.
+    :param n_partons: optional int minimum number of final state partons,
+           or (min, max) tuple of the allowed numbers.
+    :param y_range: optional (low, high) window the rapidities of all
+           final state partons must lie in.
+    """
+
+    def __init__(self, min_pt: float = None, n_partons=None, y_range=None):
+        self.cuts = []
+        self.n_total = 0
+        self.n_passed = []
+        if (min_pt is not None):
+            self.add("min_pt", functools.partial(leading_pt, min_pt=min_pt))
+        if (n_partons is not None):
+            n_min, n_max = (n_partons, None) if (np.ndim(n_partons) == 0) else n_partons
+            self.add("n_partons", functools.partial(parton_multiplicity, n_min=n_min, n_max=n_max))
+        if (y_range is not None):
+            low, high = y_range
+            self.add("y_range", functools.partial(rapidity_window, low=low, high=high))
+
+    def __len__(self):
+        """
+        Number of cuts in the selection.
+        """
+        return len(self.cuts)
+
+    def add(self, name: str, cut):
+        """
+        Appends a cut to the selection.
+
+        :param name: str name of the cut in the cut flow.
+        :param cut: Callable taking an EventBatch and returning a bool array
+               with one entry per event. It must be picklable for the
+               selection to be used with a ParallelReader.
+        """
+        self.cuts.append((name, cut))
+        self.n_passed.append(0)
+        return self
+
+    @profiling.timed("selection", count=profiling.batch_length)
+    def apply(self, batch: EventBatch):
+        """
+        Returns the mask of the events of a batch passing all cuts, and adds
+        them to the cut flow.
+
+        :param batch: EventBatch of the events.
+        """
+        mask = np.ones(len(batch), dtype=bool)
+        self.n_total += len(batch)
+        for idx, (name, cut) in enumerate(self.cuts):
+            if (np.any(mask)):
+                mask &= np.asarray(cut(batch), dtype=bool)
+            self.n_passed[idx] += int(np.count_nonzero(mask))
+        return mask
+
+    def select(self, batch: EventBatch):
+        """
+        Returns a batch of the events passing all cuts.
+
+        :param batch: EventBatch of the events.
+        """
+        mask = self.apply(batch)
+        return batch if (np.all(mask)) else batch.select(mask)
+
+    def efficiencies(self):
+        """
+        Returns the fraction of events passing each cut, out of the events
+        passing the previous cuts, keyed by the names of the cuts, followed
+        by the fraction passing all cuts keyed by "total".
+        """
+        effs = {}
+        n_before = self.n_total
+        for (name, cut), n_passed in zip(self.cuts, self.n_passed):
+            effs[name] = n_passed / n_before if (n_before) else 0.
+            n_before = n_passed
+        effs["total"] = n_before / self.n_total if (self.n_total) else 0.
+        return effs
+
+    def merge(self, other):
+        """
+        Adds the cut flow of another selection with the same cuts, e.g. one
+        applied in a separate process.
+
+        :param other: Selection to add.
+        """
+        if ([name for name, cut in self.cuts] != [name for name, cut in other.cuts]):
+            raise(ValueError("Cannot merge selections with different cuts"))
+        self.n_total += other.n_total
+        self.n_passed = [a + b for a, b in zip(self.n_passed, other.n_passed)]
+        return self
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+"""
+Buffered binary input streams for plain and compressed event files.
+"""
+import bz2
+import gzip
+import io
+import lzma
+import os
+import queue
+import threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Size of the reads from the underlying (compressed) file
+CHUNK_SIZE = 1 << 20
+
+
+def _open_zstd(filename):
+    if zstandard is None:
+        raise(ImportError("The zstandard module is required to read .zst files."))
+    return zstandard.ZstdDecompressor().stream_reader(open(filename, "rb"), read_size=CHUNK_SIZE,
+                                                      closefd=True)
+
+
+COMPRESSION = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+    ".zst": _open_zstd,
+}
+
+
+def split_compression(filename: str):
+    """
+    Splits a filename into its base name and compression extension.
+
+    The extension is an empty string for uncompressed files.
+
+    :param filename: str name of the file.
+    """
+    filename = str(filename)
+    for ext in COMPRESSION:
+        if filename.endswith(ext):
+            return filename[:-len(ext)], ext
+    return filename, ""
+
+
+def source_stamp(filename: str):
+    """
+    Returns the size and modification time identifying a version of a file.
+
+    :param filename: str name of the file.
+    """
+    stat = os.stat(filename)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class ThreadedStream(io.RawIOBase):
+    """
+    Raw stream that reads ahead from another stream in a background thread.
+
+    Chunks are read (and for compressed files, decompressed) on the thread
+    while the consumer parses previous chunks, so that decompression
+    overlaps with parsing.
+
+    :param stream: binary file-like object to read from.
+    :param chunk_size: int, size of each read from `stream`.
+    :param depth: int, maximum number of chunks held in memory.
+    """
+
+    def __init__(self, stream, chunk_size: int = CHUNK_SIZE, depth: int = 4):
+        super().__init__()
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.queue = queue.Queue(maxsize=depth)
+        self.stop = threading.Event()
+        self.chunk = memoryview(b"")
+        self.eof = False
+        self.thread = threading.Thread(target=self._fill, daemon=True)
+        self.thread.start()
+
+    def _fill(self):
+        """
+        Reads chunks into the queue until the end of the stream or close.
+        """
+        try:
+            chunk = True
+            while chunk and not self.stop.is_set():
+                chunk = self.stream.read(self.chunk_size)
+                self._put(chunk)
+        except Exception as err:
+            self._put(err)
+
+    def _put(self, item):
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        """
+        Copies the next available bytes into `buf`, returning their number.
+        """
+        if not len(self.chunk):
+            if self.eof:
+                return 0
+            item = self.queue.get()
+            if isinstance(item, Exception):
+                raise item
+            if not item:
+                self.eof = True
+                return 0
+            self.chunk = memoryview(item)
+
+        n = min(len(buf), len(self.chunk))
+        buf[:n] = self.chunk[:n]
+        self.chunk = self.chunk[n:]
+        return n
+
+    def close(self):
+        """
+        Stops the background thread and closes the underlying stream.
+        """
+        if not self.closed:
+            self.stop.set()
+            self.thread.join()
+            self.stream.close()
+        super().close()
+
+
+def open_stream(filename: str, threaded: bool = True, buffer_size: int = CHUNK_SIZE):
+    """
+    Opens a plain or compressed file as a buffered binary stream.
+
+    The compression is identified by the extension of the filename, one of
+    .gz, .bz2, .xz or .zst (the latter if the zstandard module is installed).
+
+    :param filename: str name of the file.
+    :param threaded: bool, whether to decompress in a background thread.
+    :param buffer_size: int, size of the read buffer.
+    """
+    ext = split_compression(filename)[1]
+    if not ext:
+        return open(filename, "rb", buffering=buffer_size)
+
+    stream = COMPRESSION[ext](filename)
+    if threaded:
+        return io.BufferedReader(ThreadedStream(stream, buffer_size), buffer_size)
+    return io.BufferedReader(stream, buffer_size)
+
+
+def read_head(filename: str, size: int = 4096):
+    """
+    Returns the first `size` bytes of a plain or compressed file, used to
+    identify its format, or an empty string if it cannot be read.
+
+    :param filename: str name of the file.
+    :param size: int, number of bytes to read.
+    """
+    errors = (OSError, EOFError, ImportError, lzma.LZMAError)
+    if zstandard is not None:
+        errors += (zstandard.ZstdError,)
+    try:
+        with open_stream(filename, threaded=False, buffer_size=size) as stream:
+            return stream.read(size)
+    except errors:
+        return b""
@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+"""
+Summary statistics of the weights of event samples.
+
+The weights and process ids of events are read without parsing their
+particles, and are added to compensated running sums, so the statistics of
+large samples do not suffer from rounding errors. Summaries of separate
+files, or byte ranges of a file, are filled in parallel and merged.
+"""
+import copy
+import functools
+import math
+import numpy as np
+from .parallel import ParallelReader
+from .reader import open_events
+
+
+# Number of events whose weights are read at once
+SUMMARY_CHUNK = 100000
+
+
+def _add(total: list, value: float):
+    """
+    Adds `value` to a [sum, compensation] pair with Neumaier summation.
+    """
+    s = total[0] + value
+    if (abs(total[0]) >= abs(value)):
+        total[1] += (total[0] - s) + value
+    else:
+        total[1] += (value - s) + total[0]
+    total[0] = s
+
+
+def _add_array(total: list, values):
+    """
+    Adds the sum of an array to a [sum, compensation] pair, including the
+    rounding error of the sum.
+    """
+    s = math.fsum(values)
+    _add(total, s)
+    total[1] += math.fsum(np.append(values, -s))
+
+
+def _cross_section(sumw: float, sumw2: float, n_events: int, norm: str):
+    """
+    Returns the cross section and its statistical error from weight sums.
+    """
+    if (norm not in WeightSummary.NORMS):
+        raise(ValueError("Normalisation must be one of {}".format(WeightSummary.NORMS)))
+    if (not n_events):
+        return 0., 0.
+    error = math.sqrt(max(sumw2 - sumw**2 / n_events, 0.))
+    if (norm == "average"):
+        return sumw / n_events, error / n_events
+    return sumw, error
+
+
+class WeightSummary():
+    """
+    Running sums of the nominal weights of events, in total and per process,
+    with the cross sections declared by the files read.
+
+    Summaries filled from different files or parts of a file are combined
+    with merge, or `+`. The sums are compensated, so they are accurate to
+    the precision of the weights for any number of events.
+    """
+
+    # Conventions of the weight normalisation: the cross section is the
+    # average or the sum of the event weights
+    NORMS = ("average", "sum")
+
+    def __init__(self):
+        self.n_events = 0
+        self.n_negative = 0
+        self._sumw = [0., 0.]
+        self._sumw2 = [0., 0.]
+        self._sumw_negative = [0., 0.]
+        # process id: [number of events, compensated sumw, compensated sumw2]
+        self.processes = {}
+        # file name: (NPRUP, 4) array of XSECUP, XERRUP, XMAXUP, LPRUP
+        self.init_processes = {}
+
+    def __len__(self):
+        """
+        Number of events in the summary.
+        """
+        return self.n_events
+
+    def fill(self, processes, weights):
+        """
+        Adds the weights of events to the sums.
+
+        :param processes: int array of the process ids of the events.
+        :param weights: float array of the nominal weights of the events.
+        """
+        processes = np.asarray(processes, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        if (processes.shape != weights.shape):
+            raise(ValueError("Each event requires a process id and a weight"))
+        if (not len(weights)):
+            return self
+
+        negative = weights < 0.
+        self.n_events += len(weights)
+        self.n_negative += int(np.count_nonzero(negative))
+        _add_array(self._sumw, weights)
+        _add_array(self._sumw2, weights**2)
+        _add_array(self._sumw_negative, weights[negative])
+
+        ids, inverse = np.unique(processes, return_inverse=True)
+        for idx, pid in enumerate(ids.tolist()):
+            wgts = weights[inverse == idx]
+            stats = self.processes.setdefault(pid, [0, [0., 0.], [0., 0.]])
+            stats[0] += len(wgts)
+            _add_array(stats[1], wgts)
+            _add_array(stats[2], wgts**2)
+        return self
+
+    def read(self, reader, chunk_size: int = SUMMARY_CHUNK):
+        """
+        Adds the weights of all remaining events of a reader, read without
+        parsing their particles, and the cross sections declared by its file.
+
+        :param reader: Reader with a read_weights method, e.g. a ReaderLHEF.
+        :param chunk_size: int, number of events read at once.
+        """
+        if (not hasattr(reader, "read_weights")):
+            raise(ValueError("Reader {} cannot read weights on their own".format(
+                type(reader).__name__)))
+        processes = getattr(reader, "processes", None)
+        if (processes is not None):
+            self.init_processes[reader.filename] = np.array(processes, dtype=np.float64)
+
+        while True:
+            ids, weights = reader.read_weights(chunk_size)
+            if (not len(weights)):
+                return self
+            self.fill(ids, weights)
+
+    def merge(self, other):
+        """
+        Adds the sums of another summary, e.g. one filled in a separate
+        process. The declared cross sections of files read by both are kept
+        once.
+
+        :param other: WeightSummary to add.
+        """
+        self.n_events += other.n_events
+        self.n_negative += other.n_negative
+        for name in ("_sumw", "_sumw2", "_sumw_negative"):
+            for value in getattr(other, name):
+                _add(getattr(self, name), value)
+        for pid, (n, sumw, sumw2) in other.processes.items():
+            stats = self.processes.setdefault(pid, [0, [0., 0.], [0., 0.]])
+            stats[0] += n
+            for total, values in ((stats[1], sumw), (stats[2], sumw2)):
+                for value in values:
+                    _add(total, value)
+        for filename, processes in other.init_processes.items():
+            self.init_processes.setdefault(filename, processes)
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def __add__(self, other):
+        return copy.deepcopy(self).merge(other)
+
+    @property
+    def sumw(self):
+        """
+        Sum of the weights.
+        """
+        return self._sumw[0] + self._sumw[1]
+
+    @property
+    def sumw2(self):
+        """
+        Sum of the squared weights.
+        """
+        return self._sumw2[0] + self._sumw2[1]
+
+    @property
+    def sumw_negative(self):
+        """
+        Sum of the negative weights.
+        """
+        return self._sumw_negative[0] + self._sumw_negative[1]
+
+    @property
+    def n_eff(self):
+        """
+        Effective number of events, (sum w)^2 / sum w^2.
+        """
+        return self.sumw**2 / self.sumw2 if (self.sumw2) else 0.
+
+    @property
+    def negative_fraction(self):
+        """
+        Fraction of the events with negative weights.
+        """
+        return self.n_negative / self.n_events if (self.n_events) else 0.
+
+    def cross_section(self, norm: str = "average"):
+        """
+        Returns the cross section of the sample and its statistical error.
+
+        :param norm: str, "average" if the cross section is the mean weight,
+               or "sum" if it is the sum of the weights of the sample.
+        """
+        return _cross_section(self.sumw, self.sumw2, self.n_events, norm)
+
+    def process_counts(self):
+        """
+        Returns the number of events of each process id.
+        """
+        return {pid: stats[0] for pid, stats in sorted(self.processes.items())}
+
+    def process_cross_sections(self, norm: str = "average"):
+        """
+        Returns the cross section and its statistical error of each process
+        id, as the contribution of its events to the cross section of the
+        whole sample.
+
+        :param norm: str, weight normalisation, see cross_section.
+        """
+        return {pid: _cross_section(sum(sumw), sum(sumw2), self.n_events, norm)
+                for pid, (n, sumw, sumw2) in sorted(self.processes.items())}
+
+    def init_cross_section(self):
+        """
+        Returns the cross section and error declared by the <init> blocks of
+        the files: the sums over the processes of each file, averaged over
+        the files as independent runs of the same sample.
+        """
+        if (not self.init_processes):
+            return 0., 0.
+        xsecs = [(np.sum(proc[:, 0]), np.sqrt(np.sum(proc[:, 1]**2)))
+                 for proc in self.init_processes.values()]
+        n_files = len(xsecs)
+        return (float(sum(xsec for xsec, err in xsecs) / n_files),
+                float(math.sqrt(sum(err**2 for xsec, err in xsecs)) / n_files))
+
+    def as_dict(self, norm: str = "average"):
+        """
+        Returns the statistics of the summary as a dict, e.g. for printing
+        or writing to JSON.
+
+        :param norm: str, weight normalisation, see cross_section.
+        """
+        xsec, xerr = self.cross_section(norm)
+        init_xsec, init_xerr = self.init_cross_section()
+        return {"n_events": self.n_events, "sumw": self.sumw, "sumw2": self.sumw2,
+                "n_eff": self.n_eff, "negative_fraction": self.negative_fraction,
+                "cross_section": xsec, "cross_section_error": xerr,
+                "init_cross_section": init_xsec, "init_cross_section_error": init_xerr,
+                "process_counts": self.process_counts()}
+
+
+def _summarise_shard(shard, chunk_size, reader_kwargs):
+    """
+    Returns the WeightSummary of the events of a shard.
+    """
+    filename, start, stop = shard
+    with open_events(filename, start=start, stop=stop, **reader_kwargs) as reader:
+        return WeightSummary().read(reader, chunk_size)
+
+
+def summarise(files, wgt_idx: int = None, workers: int = None, chunks_per_file: int = 1,
+              chunk_size: int = SUMMARY_CHUNK, **reader_kwargs):
+    """
+    Returns the WeightSummary of the events of several event files, read
+    in parallel without parsing their particles.
+
+    :param files: str or array-like container of str names of LHE or
+           HepMC3 files.
+    :param wgt_idx: optional int index of the weight to summarise, by
+           default the event weight of the format (XWGTUP for LHE files, the
+           first weight for HepMC3 files).
+    :param workers: optional int, number of worker processes, see
+           ParallelReader.
+    :param chunks_per_file: int, number of byte ranges each uncompressed
+           file is split into.
+    :param chunk_size: int, number of events whose weights are read at once.
+    :param reader_kwargs: further keyword arguments passed to the reader of
+           each file.
+    """
+    reader = ParallelReader(files, workers, chunks_per_file, wgt_idx=wgt_idx, **reader_kwargs)
+    job = functools.partial(_summarise_shard, chunk_size=chunk_size,
+                            reader_kwargs=reader.reader_kwargs)
+    return functools.reduce(WeightSummary.merge, reader.map_shards(job), WeightSummary())
@@ -0,0 +1,134 @@
+"""
+Synthetic LHE samples shared by the reader tests.
+"""
+import numpy as np
+
+
+sample_init_info = [2212.0, 2212.0, 3500.0, 3500.0, 0.0, 0.0,
+                    303400.0, 303400.0, -3.0, 1.0]
+
+init_block = """<init>
+  2212  2212  3.5000000e+03  3.5000000e+03 0 0 303400 303400 -3 1
+  1.2500000e+01  5.0000000e-01  1.0000000e+00  1
+</init>
+"""
+
+# id, status, mothers, cols, px, py, pz, e, m
+event_particles = [
+    (3, -1, 0, 0, 501, 0, 0., 0., 80.387, 80.387, 0.),
+    (1, -1, 0, 0, 502, 0, 0., 0., -435.476, 435.476, 0.),
+    (2, 1, 1, 2, 501, 0, 125.233, 40.134, -315.891, 342.17125, 0.),
+    (21, 1, 1, 2, 502, 503, -0.469, 1.953, -4.284, 4.731, 0.),
+    (3, 1, 1, 2, 503, 0, -52.286, -22.262, -5.853, 57.129, 0.206),
+    (-12, 1, 1, 2, 0, 0, -65.701, -41.757, -38.699, 86.936, 0.11),
+    (11, 1, 1, 2, 0, 0, -6.777, 21.931, 9.638, 24.896, 0.15),
+]
+
+
+def event_block(idx: int, rwgt: bool = False):
+    """
+    Returns the text of event `idx`, mirrored in the transverse plane for odd
+    indices and with weights (idx+1, 2*(idx+1), 3*(idx+1)).
+    """
+    sign = -1 if (idx % 2) else 1
+    wgt = float(idx + 1)
+    lines = ["<event>",
+             " {} 1 {:.6e} 9.1188000e+01 7.5467711e-03 1.1800000e-01".format(
+                 len(event_particles), wgt)]
+    for (pdg, status, m1, m2, c1, c2, px, py, pz, e, m) in event_particles:
+        lines.append(" {:>8d} {:>2d} {:>4d} {:>4d} {:>4d} {:>4d} {:.10e} {:.10e} {:.10e} {:.10e} "
+                     "{:.10e} 0.0000e+00 9.0000e+00".format(pdg, status, m1, m2, c1, c2,
+                                                            sign*px, sign*py, pz, e, m))
+    if rwgt:
+        lines.append("<rwgt>")
+        for j in range(3):
+            lines.append("<wgt id='{}'> {:.6e} </wgt>".format(1001 + j, (j + 1)*wgt))
+        lines.append("</rwgt>")
+    else:
+        lines.append("<weights> {:.6e} {:.6e} {:.6e} </weights>".format(wgt, 2*wgt, 3*wgt))
+    lines.append("</event>")
+    return "\n".join(lines) + "\n"
+
+
+def lhe_text(n_events: int = 5, rwgt: bool = False):
+    """
+    Returns the text of an LHE file with `n_events` events.
+    """
+    text = '<LesHouchesEvents version="3.0">\n<header>\n<!-- synthetic -->\n</header>\n'
+    text += init_block
+    text += "".join(event_block(idx, rwgt) for idx in range(n_events))
+    return text + "</LesHouchesEvents>\n"
+
+
+def write_lhe(path, n_events: int = 5, rwgt: bool = False):
+    """
+    Writes a synthetic LHE file to `path` and returns the path as a str.
+    """
+    with open(path, "w") as f:
+        f.write(lhe_text(n_events, rwgt))
+    return str(path)
+
+
+def ht_control(n_events: int = 5):
+    """
+    Returns the scalar sum of final state transverse momenta of each event.
+    """
+    ht = sum(np.hypot(p[6], p[7]) for p in event_particles if p[1] == 1)
+    return np.full(n_events, ht)
+
+
+# id, parent, pdg, px, py, pz, e, m, status: two beams, the incoming partons
+# of the hard vertex, its final state and a copy of the electron
+hepmc_particles = [
+    (1, 0, 2212, 0., 0., 3500., 3500., 0.938, 4),
+    (2, 0, 2212, 0., 0., -3500., 3500., 0.938, 4),
+    (3, -1, 3, 0., 0., 80.387, 80.387, 0., 21),
+    (4, -2, 1, 0., 0., -435.476, 435.476, 0., 21),
+    (5, -3, 2, 125.233, 40.134, -315.891, 342.17125, 0., 1),
+    (6, -3, 21, -0.469, 1.953, -4.284, 4.731, 0., 1),
+    (7, -3, 3, -52.286, -22.262, -5.853, 57.129, 0.206, 1),
+    (8, -3, -12, -65.701, -41.757, -38.699, 86.936, 0.11, 1),
+    (9, -3, 11, -6.777, 21.931, 9.638, 24.896, 0.15, 2),
+    (10, 9, 11, -6.777, 21.931, 9.638, 24.896, 0.15, 1),
+]
+
+hepmc_vertices = ["V -1 0 [1]", "V -2 0 [2]", "V -3 0 [3,4]"]
+
+
+def hepmc_event(idx: int):
+    """
+    Returns the text of HepMC3 event `idx`, mirrored in the transverse plane
+    and written in MeV for odd indices, with weights (idx+1, 2*(idx+1)).
+    """
+    sign, unit = (-1, 1000.) if (idx % 2) else (1, 1.)
+    wgt = float(idx + 1)
+    lines = ["E {} {} {}".format(idx, len(hepmc_vertices), len(hepmc_particles)),
+             "U {} MM".format("MEV" if (idx % 2) else "GEV"),
+             "W {:.6e} {:.6e}".format(wgt, 2*wgt),
+             "A 0 alphaQCD 0.118"]
+    vertices = {int(v.split()[1]): v for v in hepmc_vertices}
+    for (pid, parent, pdg, px, py, pz, e, m, status) in hepmc_particles:
+        if (parent < 0 and parent in vertices):
+            lines.append(vertices.pop(parent))
+        lines.append("P {} {} {} {:.10e} {:.10e} {:.10e} {:.10e} {:.10e} {}".format(
+            pid, parent, pdg, sign*px*unit, sign*py*unit, pz*unit, e*unit, m*unit, status))
+    return "\n".join(lines) + "\n"
+
+
+def hepmc_text(n_events: int = 5):
+    """
+    Returns the text of a HepMC3 ASCII file with `n_events` events.
+    """
+    text = ("HepMC::Version 3.02.05\nHepMC::Asciiv3-START_EVENT_LISTING\n"
+            "W nominal muR=2\nT synthetic\\|1.0\n")
+    text += "".join(hepmc_event(idx) for idx in range(n_events))
+    return text + "HepMC::Asciiv3-END_EVENT_LISTING\n\n"
+
+
+def write_hepmc(path, n_events: int = 5):
+    """
+    Writes a synthetic HepMC3 file to `path` and returns the path as a str.
+    """
+    with open(path, "w") as f:
+        f.write(hepmc_text(n_events))
+    return str(path)
@@ -0,0 +1,132 @@
+import pytest
+import numpy as np
+from EventPlotter import Particle, Event, ParticleTable, ParticleView, EventBatch
+
+
+p1 = Particle(2212, status=-1, px=0., py=0., pz=3.5e+03, e=3.5e+03)
+p2 = Particle(2212, status=-1, px=0., py=0., pz=-3.5e+03, e=3.5e+03)
+A = Particle(3, status=-1, px=0., py=0., pz=80.387, e=80.387)
+B = Particle(1, status=-1, px=0., py=0., pz=-435.476, e=435.476)
+C = Particle(2, status=1, px=125.233, py=40.134, pz=-315.891, e=342.17125, m=0.)
+D = Particle(21, status=1, px=-0.469, py=1.953, pz=-4.284, e=4.731, m=0.)
+E = Particle(3, status=1, px=-52.286, py=-22.262, pz=-5.853, e=57.129, m=0.206)
+F = Particle(-12, status=1, px=-65.701, py=-41.757, pz=-38.699, e=86.936, m=0.11)
+G = Particle(11, status=1, px=-6.777, py=21.931, pz=9.638, e=24.896, m=0.15)
+
+event_balanced_beams = Event([p1, p2, A, B, C, D, E, F, G], 7000, wgt=0.5)
+event_balanced = Event([A, B, C, D, E, F, G], 7000, wgt=2.)
+
+
+def test_table_roundtrip():
+    particles = [p1, p2, A, B, C, D, E, F, G]
+    table = ParticleTable.from_particles(particles)
+    assert len(table) == len(particles)
+    assert table.px.dtype == np.float64
+    for view, part in zip(table, particles):
+        assert isinstance(view, ParticleView)
+        assert isinstance(view, Particle)
+        assert view.pdg == part.pdg
+        assert view.E() == part.E()
+        assert view.perp() == part.perp()
+        assert view.rap() == part.rap()
+
+    copies = table.to_particles()
+    assert isinstance(copies[4], Particle)
+    assert (copies[4].pdg, copies[4].px, copies[4].e) == (C.pdg, C.px, C.e)
+
+
+def test_table_views():
+    table = ParticleTable.from_particles([A, B, C, D])
+    sub = table[2:]
+    assert len(sub) == 2
+    assert np.shares_memory(sub.px, table.px)
+
+    # writing through a view updates the parent table
+    sub[0].px = 1.
+    assert table.px[2] == 1.
+    table[3] = A
+    assert table[3].pdg == A.pdg
+    assert table[-1].pz == A.pz
+
+    with pytest.raises(IndexError):
+        table[4]
+    with pytest.raises(ValueError):
+        ParticleTable(pdg=[1, 2], px=[0.])
+
+
+def test_batch_events():
+    batch = EventBatch.from_events([event_balanced_beams, event_balanced])
+    assert len(batch) == 2
+    assert list(batch.counts) == [9, 7]
+    assert list(batch.offsets) == [0, 9, 16]
+    assert list(batch.event_index) == [0]*9 + [1]*7
+
+    for ev, control in zip(batch, [event_balanced_beams, event_balanced]):
+        assert isinstance(ev, Event)
+        assert len(ev) == len(control)
+        assert ev.wgt == control.wgt
+        assert ev.root_s == control.root_s
+        assert ev.incoming == control.incoming
+        assert ev.check_momentum()
+        for part, part_control in zip(ev, control):
+            assert part.pdg == part_control.pdg
+            assert part.perp() == part_control.perp()
+
+    # events are views into the batch
+    ev = batch[-1]
+    ev[6] = F
+    assert batch.table.pdg[-1] == F.pdg
+
+
+def test_batch_roles():
+    batch = EventBatch.from_events([event_balanced_beams, event_balanced])
+    assert np.array_equal(batch.table.roles, np.concatenate([event_balanced_beams.roles,
+                                                             event_balanced.roles]))
+    assert np.array_equal(np.flatnonzero(batch.incoming_mask()), [2, 3, 9, 10])
+    assert np.all(batch.check_momentum())
+
+    # overwritten rows have their roles derived again from their momenta
+    batch.table[2] = C
+    assert batch.table.roles[2] == -1
+    assert batch.particle_roles()[2] == 4
+
+
+def test_check_momentum_paths():
+    # a second incoming parton along +z is not used by either check
+    extra = Particle(21, status=-1, px=0., py=0., pz=10., e=10.)
+    ev_extra = Event([p1, p2, A, B, extra, C, D, E, F, G], 7000, validate=False)
+    # without an incoming parton along -z both checks fail
+    ev_missing = Event([p1, p2, A, C, D, E, F, G], 7000, set_info=False, validate=False)
+    events = [event_balanced, ev_extra, ev_missing, event_balanced_beams]
+    batch = EventBatch.from_events(events)
+    assert list(batch.check_momentum()) == [ev.check_momentum() for ev in events]
+    assert list(batch.check_momentum()) == [True, True, False, True]
+
+
+def test_unvalidated_views():
+    unbalanced = Event([A, B, C, D, E], 7000, validate=False)
+    batch = EventBatch.from_events([event_balanced, unbalanced])
+    assert list(batch.check_momentum()) == [True, False]
+    # views of events a reader did not validate can be indexed and iterated
+    assert not batch[1].check_momentum()
+    assert [len(ev) for ev in batch] == [7, 5]
+
+
+def test_batch_slicing():
+    batch = EventBatch.from_events([event_balanced_beams, event_balanced, event_balanced_beams])
+    sub = batch[1:]
+    assert len(sub) == 2
+    assert list(sub.offsets) == [0, 7, 16]
+    assert sub[1].wgt == event_balanced_beams.wgt
+
+    joined = EventBatch.concatenate([batch[:1], sub])
+    assert len(joined) == 3
+    assert np.array_equal(joined.offsets, batch.offsets)
+    assert np.array_equal(joined.table.px, batch.table.px)
+
+    with pytest.raises(IndexError):
+        batch[3]
+    with pytest.raises(ValueError):
+        batch[::2]
+    with pytest.raises(ValueError):
+        EventBatch(ParticleTable.from_particles([A, B]), [0, 1])
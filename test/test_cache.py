@@ -0,0 +1,71 @@
+import pytest
+import os
+import numpy as np
+from EventPlotter import ReaderLHEF, ReaderCache, Selection, write_cache
+from EventPlotter.cache import is_valid_cache, cache_dir_for
+from .samples import write_lhe, sample_init_info
+
+
+def test_roundtrip(tmp_path):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=5)
+    events = list(ReaderLHEF(filename, wgt_idx=0))
+    assert not is_valid_cache(filename, wgt_idx=0)
+
+    reader = ReaderCache(filename, wgt_idx=0)
+    assert is_valid_cache(filename, wgt_idx=0)
+    assert reader.init_info == sample_init_info
+    assert len(reader) == 5
+    assert isinstance(reader.batch.table.px.base, np.memmap)
+
+    cached = list(reader)
+    assert len(cached) == len(events)
+    for ev, control in zip(cached, events):
+        assert ev.wgt == control.wgt
+        assert ev.root_s == control.root_s
+        assert [p.pdg for p in ev] == [p.pdg for p in control]
+        assert [p.e for p in ev] == [p.e for p in control]
+
+    assert reader[3].wgt == events[3].wgt
+    assert list(reader[3].weights) == list(events[3].weights)
+    assert reader.batch.weights.shape == (5, 3)
+    reader.position = 0
+    assert [len(b) for b in reader.iter_batches(2)] == [2, 2, 1]
+    reader.close()
+
+
+def test_invalidation(tmp_path):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=3)
+    cache_dir = write_cache(filename, wgt_idx=0, batch_size=2)
+    assert cache_dir == cache_dir_for(filename)
+    assert len(ReaderCache(filename, wgt_idx=0, rebuild=False)) == 3
+
+    # a different weight index needs a new cache
+    assert not is_valid_cache(filename, wgt_idx=1)
+    with pytest.raises(ValueError):
+        ReaderCache(filename, wgt_idx=1, rebuild=False)
+
+    # changing the source file invalidates the cache
+    write_lhe(filename, n_events=4)
+    os.utime(filename, ns=(0, 0))
+    assert not is_valid_cache(filename, wgt_idx=0)
+    reader = ReaderCache(filename, wgt_idx=0)
+    assert len(reader) == 4
+    assert is_valid_cache(filename, wgt_idx=0)
+
+
+def test_reader_kwargs(tmp_path):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=3)
+    write_cache(filename, wgt_idx=0, selection=Selection(min_pt=1E6))
+    assert is_valid_cache(filename, wgt_idx=0, reader_kwargs={"selection": Selection(min_pt=1E6)})
+    assert len(ReaderCache(filename, wgt_idx=0, rebuild=False,
+                           selection=Selection(min_pt=1E6))) == 0
+
+    # a cache written with other reader arguments is stale
+    assert not is_valid_cache(filename, wgt_idx=0)
+    assert not is_valid_cache(filename, wgt_idx=0,
+                              reader_kwargs={"selection": Selection(min_pt=1.)})
+    with pytest.raises(ValueError):
+        ReaderCache(filename, wgt_idx=0, rebuild=False)
+    assert len(ReaderCache(filename, wgt_idx=0, validate="drop")) == 3
+    reader_kwargs = {"validate": "drop", "threaded": False}
+    assert is_valid_cache(filename, wgt_idx=0, reader_kwargs=reader_kwargs)
@@ -1,5 +1,8 @@
 import pytest
+import numpy as np
 from EventPlotter import Particle, Event
+from EventPlotter.event import (ROLE_BEAM, ROLE_INCOMING, ROLE_INTERMEDIATE, ROLE_FINAL,
+                                ROLE_UNKNOWN)
 
 
 p1 = Particle(2212, status=-1, px=0., py=0., pz=3.5e+03, e=3.5e+03)
@@ -47,7 +50,7 @@ def test_incoming():
     C_in = Particle(2, status=-1, px=125.233, py=40.134, pz=-315.891, e=342.17125, m=0.)
     D_in = Particle(21, status=-1, px=-0.469, py=1.953, pz=-4.284, e=4.731, m=0.)
     # test value error is raised for transverse incoming particles
-    with pytest.raises(ValueError):
+    with pytest.raises(ValueError, match="non-zero transverse momentum"):
         ev_inc_only = Event([C_in, D_in, C, D], 7000.)  # noqa: F841
 
 
@@ -62,3 +65,36 @@ def test_iterator():
         assert next(ev_iter) == event_balanced_beams[idx]
 
 
+def test_validate_flag():
+    event_unchecked = Event([A, B, C, D, E], 7000, validate=False)
+    assert not event_unchecked.check_momentum()
+    assert event_unchecked.check_momentum(tol=1E3)
+    assert event_balanced.calc_root_s_hat() == pytest.approx(2 * (80.387 * 435.476)**0.5)
+
+
+def test_roles():
+    assert list(event_balanced_beams.roles) == [ROLE_BEAM] * 2 + [ROLE_INCOMING] * 2 + [ROLE_FINAL] * 5
+    assert event_balanced.beams == [-1, -1] and event_balanced.incoming == [0, 1]
+
+    # roles set by a reader take precedence over the status codes
+    roles = [ROLE_FINAL, ROLE_INCOMING, ROLE_INCOMING, ROLE_FINAL, ROLE_FINAL, ROLE_FINAL,
+             ROLE_FINAL]
+    event = Event([G, A, B, C, D, E, F], 7000, roles=np.array(roles))
+    assert event.incoming == [1, 2] and event.check_momentum()
+    event = Event([A, B, C, D, E, F, G], 7000, roles=np.full(7, ROLE_UNKNOWN))
+    assert list(event.roles) == list(event_balanced.roles)
+
+
+def test_roles_invalidated():
+    event = Event([p1, p2, A, B, C, D, E, F, G], 7000, set_info=False,
+                  roles=np.array([ROLE_BEAM] * 2 + [ROLE_INCOMING] * 2 + [ROLE_FINAL] * 5))
+    event[4] = Particle(2, status=-22, px=125.233, py=40.134, pz=-315.891, e=342.17125)
+    assert event.roles[4] == ROLE_UNKNOWN and event.roles[0] == ROLE_BEAM
+    assert event.particle_roles()[4] == ROLE_INTERMEDIATE
+    assert not event.check_momentum()
+
+    event.particles = [A, B, C, D, E, F, G]
+    assert event.roles is None
+    assert list(event.particle_roles()) == [ROLE_INCOMING] * 2 + [ROLE_FINAL] * 5
+    event.find_incoming()
+    assert event.incoming == [0, 1] and event.check_momentum()
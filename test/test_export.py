@@ -0,0 +1,89 @@
+import pytest
+import numpy as np
+from EventPlotter import (EventBatch, ParticleTable, ReaderLHEF, ReaderParquet, ReaderHDF5,
+                          export_events, observables)
+from EventPlotter.export import ReaderColumnar
+from .samples import write_lhe
+
+
+READERS = {".parquet": ("pyarrow", ReaderParquet), ".h5": ("h5py", ReaderHDF5)}
+
+
+@pytest.fixture(params=list(READERS))
+def exported(request, tmp_path):
+    module, reader = READERS[request.param]
+    pytest.importorskip(module)
+    source = write_lhe(tmp_path / "sample.lhe", n_events=5, rwgt=True)
+    filename = export_events(ReaderLHEF(source, wgt_idx=1), tmp_path / ("sample" + request.param),
+                             batch_size=2)
+    reference = EventBatch.concatenate(ReaderLHEF(source, wgt_idx=1).iter_batches(5))
+    return filename, reader, reference
+
+
+def test_round_trip(exported):
+    filename, reader_cls, reference = exported
+    with reader_cls(filename) as reader:
+        assert len(reader) == 5
+        assert reader.n_row_groups == 3
+        batch = reader.read()
+    assert np.array_equal(batch.offsets, reference.offsets)
+    for name in ParticleTable.COLUMNS:
+        assert np.array_equal(getattr(batch.table, name), getattr(reference.table, name))
+    for name in EventBatch.EVENT_COLUMNS + ("weights",):
+        assert np.array_equal(getattr(batch, name), getattr(reference, name))
+    assert batch.weight_ids == ["1001", "1002", "1003"]
+
+    events = list(reader_cls(filename))
+    assert [ev.wgt for ev in events] == [2., 4., 6., 8., 10.]
+
+
+def test_columns(exported):
+    filename, reader_cls, reference = exported
+    with reader_cls(filename, columns=["px", "py", "wgt"], row_groups=[1]) as reader:
+        batch = reader.read()
+    # events 2 and 3, without the columns which were not requested
+    assert np.array_equal(batch.counts, reference.counts[2:4])
+    assert np.array_equal(batch.table.px, reference[2:4].table.px)
+    assert list(batch.wgt) == [6., 8.]
+    assert not np.any(batch.table.pdg) and not np.any(batch.table.mothers)
+    assert batch.weights.shape == (2, 0)
+
+    with reader_cls(filename, columns=["wgt"]) as reader:
+        assert [len(b) for b in reader.iter_batches(4)] == [2, 2, 1]
+    with pytest.raises(ValueError):
+        reader_cls(filename, columns=["colour"])
+
+
+def test_column_roles(exported):
+    filename, reader_cls, reference = exported
+    with reader_cls(filename, columns=["px", "py"]) as reader:
+        batch = reader.read()
+    # roles are read with any columns, so the final state is known
+    assert np.array_equal(batch.table.roles, reference.table.roles)
+    assert np.allclose(observables.h_t(batch), observables.h_t(reference))
+    assert np.all(observables.h_t(batch) > 0.)
+    assert len(list(batch)) == 5
+
+
+def test_parquet_offsets(tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+    source = write_lhe(tmp_path / "sample.lhe", n_events=2)
+    filename = export_events(ReaderLHEF(source), tmp_path / "sample.parquet")
+    schema = pyarrow.parquet.read_schema(filename)
+    # particle and weight lists have 64 bit offsets
+    assert pyarrow.types.is_large_list(schema.field("px").type)
+    assert pyarrow.types.is_large_list(schema.field("weights").type)
+
+
+def test_export_errors(tmp_path):
+    with pytest.raises(ValueError):
+        export_events([], tmp_path / "events.csv")
+
+
+def test_abstract_reader():
+    class ReaderNoRowGroups(ReaderColumnar):
+        n_row_groups = 1
+
+    with pytest.raises(TypeError):
+        ReaderNoRowGroups()
@@ -0,0 +1,163 @@
+import pytest
+import gzip
+import numpy as np
+from EventPlotter import (Event, EventBatch, HepMCParser, Reader, ReaderLHEF, ReaderHepMC3,
+                          open_events, read_many, register_reader)
+from EventPlotter.reader import READERS
+from EventPlotter.event import (ROLE_OTHER, ROLE_BEAM, ROLE_INCOMING, ROLE_INTERMEDIATE,
+                                ROLE_FINAL)
+from .samples import write_lhe, write_hepmc, hepmc_text, hepmc_particles
+
+
+def weight_list(event):
+    return [event.wgt]
+
+
+def test_parser(tmp_path):
+    filename = write_hepmc(tmp_path / "sample.hepmc", n_events=3)
+    with open(filename, "rb") as stream:
+        parser = HepMCParser(stream)
+        run = parser.read_run()
+        assert run.version == "3.02.05"
+        assert run.weight_ids == ["nominal", "muR=2"]
+
+        record = parser.next_event()
+        assert record.number == 0
+        assert record.particles.shape == (len(hepmc_particles), 9)
+        assert record.vertices == [(-1, [1]), (-2, [2]), (-3, [3, 4])]
+        assert list(record.weights) == [1., 2.]
+        stream.seek(record.offset)
+        assert stream.readline().startswith(b"E 0 ")
+        stream.seek(parser.position)
+
+        # momenta of events in MeV are converted to GeV
+        records = parser.read_events(10)
+        assert len(records) == 2
+        assert np.allclose(records[0].particles[:, 3:8],
+                           record.particles[:, 3:8] * [-1., -1., 1., 1., 1.])
+        assert parser.next_event() is None
+
+
+def test_relations(tmp_path):
+    filename = write_hepmc(tmp_path / "sample.hepmc", n_events=1)
+    with open(filename, "rb") as stream:
+        parser = HepMCParser(stream)
+        parser.read_run()
+        mothers, daughters = parser.next_event().relations()
+    assert mothers.tolist() == [[0, 0], [0, 0], [1, 1], [2, 2]] + [[3, 4]] * 5 + [[9, 9]]
+    assert daughters.tolist() == [[3, 3], [4, 4], [5, 9], [5, 9]] + [[0, 0]] * 4 + [[10, 10],
+                                                                                    [0, 0]]
+
+
+def test_reader(tmp_path):
+    filename = write_hepmc(tmp_path / "sample.hepmc3", n_events=4)
+    reader = ReaderHepMC3(filename, wgt_idx=1, validate="raise")
+    assert reader.weight_ids == ["nominal", "muR=2"]
+    events = list(reader)
+    assert len(events) == 4
+    assert reader.com_energy == 7000.
+    for idx, ev in enumerate(events):
+        assert isinstance(ev, Event)
+        assert len(ev) == len(hepmc_particles) + 1
+        assert ev.wgt == 2.*(idx + 1)
+        assert ev.beams == [1, 2] and ev.incoming == [3, 4]
+        assert [p.status for p in ev] == [0, -4, -4, -21, -21, 1, 1, 1, 1, 0, 1]
+        assert ev[3].daughters == (5, 9) and ev[10].mothers == (9, 9)
+        assert list(ev.roles) == [ROLE_OTHER, ROLE_BEAM, ROLE_BEAM, ROLE_INCOMING, ROLE_INCOMING,
+                                  ROLE_FINAL, ROLE_FINAL, ROLE_FINAL, ROLE_FINAL,
+                                  ROLE_INTERMEDIATE, ROLE_FINAL]
+    assert events[1][5].p_x() == pytest.approx(-125.233)
+
+    batch = EventBatch.concatenate(ReaderHepMC3(filename, wgt_idx=1).iter_batches(3))
+    assert batch.weight_ids == ["nominal", "muR=2"]
+    assert np.array_equal(batch.counts, [len(ev) for ev in events])
+    assert np.all(batch.check_momentum())
+    reference = EventBatch.from_events(events)
+    for name in ("pdg", "status", "mothers", "daughters", "px", "e", "roles"):
+        assert np.allclose(getattr(batch.table, name), getattr(reference.table, name))
+    assert np.array_equal(batch.weights, reference.weights)
+
+
+def test_status_convention(tmp_path):
+    # the hard process is marked with status 11 instead of 21, as e.g. by Herwig
+    filename = tmp_path / "sample.hepmc"
+    filename.write_text(hepmc_text(4).replace(" 0.0000000000e+00 21\n", " 0.0000000000e+00 11\n"))
+    events = list(ReaderHepMC3(filename, wgt_idx=0))
+    assert len(events) == 4
+    for ev in events:
+        assert ev.incoming == [-1, -1] and ev.beams == [1, 2]
+        assert [p.status for p in ev][3:5] == [0, 0]
+        assert not ev.check_momentum()
+    batch = ReaderHepMC3(filename).read_batch(10)
+    assert len(batch) == 4
+    assert [ev.incoming for ev in batch] == [[-1, -1]] * 4
+
+    # events without incoming partons fail validation in either path
+    assert list(ReaderHepMC3(filename, validate="drop")) == []
+    assert len(ReaderHepMC3(filename, validate="drop").read_batch(10)) == 0
+    with pytest.raises(ValueError):
+        next(ReaderHepMC3(filename, validate="raise"))
+
+
+def test_shards(tmp_path):
+    filename = write_hepmc(tmp_path / "sample.hepmc", n_events=10)
+    weights = read_many(filename, weight_list, workers=1, chunks_per_file=4, wgt_idx=0)
+    assert weights == [float(idx + 1) for idx in range(10)]
+
+
+def test_open_events(tmp_path):
+    lhe = write_lhe(tmp_path / "sample.lhe", n_events=2)
+    hepmc = str(tmp_path / "sample.hepmc.gz")
+    with gzip.open(hepmc, "wt") as f:
+        f.write(hepmc_text(2))
+    unnamed = write_hepmc(tmp_path / "sample.txt", n_events=2)
+
+    with open_events(lhe) as reader:
+        assert isinstance(reader, ReaderLHEF)
+    with open_events(hepmc, wgt_idx=0) as reader:
+        assert isinstance(reader, ReaderHepMC3)
+        assert [ev.wgt for ev in reader] == [1., 2.]
+    # formats are recognised from the start of files without known extensions
+    with open_events(unnamed) as reader:
+        assert isinstance(reader, ReaderHepMC3)
+        assert len(list(reader)) == 2
+
+    with pytest.raises(ValueError):
+        open_events(tmp_path / "missing.dat")
+    with pytest.raises(ValueError):
+        ReaderLHEF(unnamed)
+
+
+def test_register_reader(tmp_path):
+    filename = tmp_path / "sample.custom"
+    filename.write_text("custom events\n")
+
+    @register_reader
+    class ReaderCustom(Reader):
+        EXTENSIONS = (".custom",)
+
+        def __init__(self, filename: str):
+            self.filename = filename
+            self.closed = False
+
+        def close(self):
+            self.closed = True
+
+    try:
+        with open_events(filename) as reader:
+            assert isinstance(reader, ReaderCustom)
+        assert reader.closed
+    finally:
+        READERS.remove(ReaderCustom)
+
+
+def test_context_manager(tmp_path):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=2)
+    with ReaderLHEF(filename) as reader:
+        next(reader)
+    assert reader.stream.closed
+
+    with pytest.raises(RuntimeError):
+        with ReaderHepMC3(write_hepmc(tmp_path / "sample.hepmc")) as reader:
+            raise(RuntimeError("analysis failed"))
+    assert reader.stream.closed
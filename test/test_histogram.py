@@ -0,0 +1,147 @@
+import pickle
+import pytest
+import numpy as np
+from EventPlotter import Histogram1D, Histogram2D
+from EventPlotter.histogram import Histogram, save_npz, load_npz, write_yoda
+
+
+def test_fill_1d():
+    hist = Histogram1D(4, 0., 4., path="/test/h")
+    hist.fill([-1., 0., 0.5, 3.99, 4., 10., np.nan], weights=[1., 2., 3., 4., 5., 6., 7.])
+    assert list(hist.values(flow=True)) == [1., 5., 0., 0., 4., 11.]
+    assert list(hist.values()) == [5., 0., 0., 4.]
+    assert list(hist.n_entries) == [1., 2., 0., 0., 1., 2.]
+    assert np.allclose(hist.errors(), np.sqrt([13., 0., 0., 16.]))
+    assert hist.sumwx[1] == pytest.approx(1.5)
+    assert hist.integral(flow=True) == pytest.approx(21.)
+
+    hist.fill(1.5)
+    assert hist.values()[1] == 1.
+
+
+def test_matches_numpy():
+    rng = np.random.default_rng(1)
+    values, weights = rng.normal(0., 2., 10000), rng.uniform(-1., 2., 10000)
+    edges = [-5., -1., 0., 0.5, 2., 6.]
+    hist = Histogram1D(edges).fill(values, weights)
+    inner = (values >= edges[0]) & (values < edges[-1])
+    ref = np.histogram(values[inner], edges, weights=weights[inner])[0]
+    # numpy includes the last edge in the last bin
+    ref[-1] -= np.sum(weights[values == edges[-1]])
+    assert np.allclose(hist.values(), ref)
+    assert np.allclose(hist.sumw2[1:-1], np.histogram(values[inner], edges,
+                                                      weights=weights[inner]**2)[0])
+
+
+def test_fill_2d():
+    hist = Histogram2D(2, [0., 1., 3.], xrange=(0., 2.))
+    hist.fill([0.5, 1.5, 1.5, -1.], [0.5, 2., 5., 0.5], weights=2.)
+    assert hist.values().tolist() == [[2., 0.], [0., 2.]]
+    assert hist.values(flow=True)[0, 1] == 2.
+    assert hist.values(flow=True)[2, 3] == 2.
+    assert hist.sumwxy[2, 2] == pytest.approx(6.)
+
+    rng = np.random.default_rng(2)
+    x, y = rng.uniform(0., 2., 1000), rng.uniform(0., 3., 1000)
+    hist = Histogram2D([0., 0.5, 2.], [0., 1., 3.]).fill(x, y)
+    assert np.allclose(hist.values(), np.histogram2d(x, y, [[0., 0.5, 2.], [0., 1., 3.]])[0])
+
+
+def test_merge():
+    values = np.linspace(-1., 5., 101)
+    whole = Histogram1D(5, 0., 5.).fill(values, values)
+    first = Histogram1D(5, 0., 5.).fill(values[:40], values[:40])
+    second = Histogram1D(5, 0., 5.).fill(values[40:], values[40:])
+    total = first + second
+    assert np.allclose(total.sumw, whole.sumw)
+    assert np.allclose(first.sumw, Histogram1D(5, 0., 5.).fill(values[:40], values[:40]).sumw)
+    first += pickle.loads(pickle.dumps(second))
+    for name in Histogram1D.STATS:
+        assert np.allclose(getattr(first, name), getattr(whole, name))
+
+    with pytest.raises(ValueError):
+        whole.merge(Histogram1D(4, 0., 5.))
+    with pytest.raises(ValueError):
+        Histogram1D(0, 0., 1.)
+    with pytest.raises(ValueError):
+        Histogram1D([0., 2., 1.])
+
+
+def test_scale():
+    hist = Histogram1D(2, 0., 2.).fill([0.5, 1.5], [1., 2.]).scale(3.)
+    assert list(hist.values()) == [3., 6.]
+    assert list(hist.sumw2[1:-1]) == [9., 36.]
+    assert list(hist.n_entries[1:-1]) == [1., 1.]
+
+
+def test_output(tmp_path):
+    h1 = Histogram1D([0., 1., 10.], path="/ht").fill([0.5, 2., 20.], [1., 2., 3.])
+    h2 = Histogram2D(2, 3, (0., 1.), (0., 3.), path="/y_phi").fill([0.2, 0.7], [2.5, 0.5])
+
+    filename = str(tmp_path / "hists.npz")
+    save_npz([h1, h2], filename)
+    loaded = load_npz(filename)
+    assert set(loaded) == {"/ht", "/y_phi"}
+    assert isinstance(loaded["/y_phi"], Histogram2D)
+    for hist in [h1, h2]:
+        for name in hist.STATS:
+            assert np.all(getattr(loaded[hist.path], name) == getattr(hist, name))
+    with pytest.raises(ValueError):
+        save_npz([h1, h1], filename)
+
+    filename = str(tmp_path / "hists.yoda")
+    write_yoda([h1, h2], filename)
+    text = open(filename).read()
+    assert "BEGIN YODA_HISTO1D /ht" in text
+    assert "BEGIN YODA_HISTO2D /y_phi" in text
+    assert "Type: Histo1D\n" in text and "Type: Histo2D\n" in text
+    assert text.count("END YODA_") == 2
+    rows = [line.split() for line in text.split("\n") if line.startswith("1.000000e+00\t")]
+    assert [float(x) for x in rows[0][:4]] == [1., 10., 2., 4.]
+
+
+def test_multi_weight(tmp_path):
+    rng = np.random.default_rng(4)
+    values, weights = rng.uniform(-1., 11., 1000), rng.uniform(0., 2., (1000, 3))
+    hist = Histogram1D(10, 0., 10., path="/x", n_weights=3, weight_ids=["nom", "up", None])
+    hist.fill(values, weights)
+    assert hist.sumw.shape == (12, 3)
+    for idx in range(3):
+        single = Histogram1D(10, 0., 10.).fill(values, weights[:, idx])
+        variation = hist.variation(idx)
+        for name in Histogram1D.STATS:
+            assert np.allclose(getattr(variation, name), getattr(single, name))
+    assert hist.variation(1).path == "/x[up]"
+    assert hist.variation(2).path == "/x[2]"
+
+    # a single weight per entry is shared by all variations
+    shared = Histogram1D(10, 0., 10., n_weights=2).fill(values, weights[:, 0])
+    assert np.allclose(shared.values()[:, 1], hist.values()[:, 0])
+    with pytest.raises(ValueError):
+        hist.fill(values, weights[:, :2])
+    with pytest.raises(ValueError):
+        hist.merge(Histogram1D(10, 0., 10.))
+
+    h2 = Histogram2D(2, 2, (0., 10.), (0., 1.), n_weights=3).fill(values, 0.5, weights)
+    assert np.allclose(h2.values(flow=True).sum(axis=(0, 1)), weights.sum(axis=0))
+
+    filename = str(tmp_path / "hists.npz")
+    save_npz([hist, h2], filename)
+    loaded = load_npz(filename)["/x"]
+    assert loaded.n_weights == 3
+    assert loaded.weight_ids == ["nom", "up", None]
+    assert np.all(loaded.sumw == hist.sumw)
+
+    filename = str(tmp_path / "hists.yoda")
+    write_yoda([hist], filename)
+    text = open(filename).read()
+    assert "BEGIN YODA_HISTO1D /x[nom]" in text
+    assert text.count("END YODA_") == 3
+
+
+def test_abstract_histogram():
+    class HistogramNoAxes(Histogram):
+        bin_shape = (3,)
+
+    with pytest.raises(TypeError):
+        HistogramNoAxes()
@@ -0,0 +1,105 @@
+import pytest
+import gzip
+import os
+import numpy as np
+from EventPlotter import ReaderLHEF, Selection, build_index, load_index
+from EventPlotter import index
+from .samples import write_lhe, lhe_text
+
+
+def test_build_index(tmp_path, monkeypatch):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=6)
+    offsets = build_index(filename)
+    assert len(offsets) == 6
+    with open(filename, "rb") as f:
+        for offset in offsets:
+            f.seek(offset)
+            assert f.readline() == b"<event>\n"
+
+    # tags split across scan blocks are found exactly once
+    monkeypatch.setattr(index, "SCAN_SIZE", 7)
+    assert np.array_equal(build_index(filename), offsets)
+
+    # offsets match those of the parsed records
+    reader = ReaderLHEF(filename)
+    assert [reader.advance().offset for i in range(6)] == list(offsets)
+    reader.close()
+
+
+def test_index_tags(tmp_path, monkeypatch):
+    # only tags starting a line are events, as for the LHEParser
+    text = lhe_text(n_events=4).replace("</header>", "<event> in the header\n</header>", 1)
+    text = text.replace("</init>\n", "</init>\n<!-- <event> tags follow -->\n", 1)
+    text = text.replace("<event>", "  <event>", 2)
+    filename = str(tmp_path / "tags.lhe")
+    with open(filename, "w") as f:
+        f.write(text)
+    reader = ReaderLHEF(filename)
+    control = [reader.advance().offset for i in range(4)]
+    reader.close()
+    assert list(build_index(filename)) == control
+    monkeypatch.setattr(index, "SCAN_SIZE", 5)
+    assert list(build_index(filename)) == control
+
+
+def test_sidecar(tmp_path):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=3)
+    offsets = load_index(filename)
+    assert os.path.exists(index.index_path(filename))
+    assert np.array_equal(load_index(filename), offsets)
+
+    write_lhe(filename, n_events=5)
+    os.utime(filename, ns=(0, 0))
+    assert len(load_index(filename)) == 5
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+def test_random_access(tmp_path, compressed):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=6)
+    events = list(ReaderLHEF(filename, wgt_idx=0))
+    if compressed:
+        with open(filename, "rb") as f_in, gzip.open(filename + ".gz", "wb") as f_out:
+            f_out.write(f_in.read())
+        filename += ".gz"
+
+    reader = ReaderLHEF(filename, wgt_idx=0)
+    assert len(reader) == 6
+    assert reader[4].wgt == events[4].wgt
+    assert next(reader).wgt == events[5].wgt
+    assert reader[-6].wgt == events[0].wgt
+    assert [ev.wgt for ev in reader[1:5:2]] == [events[1].wgt, events[3].wgt]
+
+    reader.seek(2)
+    assert [ev.wgt for ev in reader] == [ev.wgt for ev in events[2:]]
+    with pytest.raises(IndexError):
+        reader[6]
+    reader.close()
+
+
+def test_indexed_selection(tmp_path):
+    filename = tmp_path / "sample.lhe"
+    blocks = lhe_text(4).split("<event>")
+    # event 1 does not conserve momentum
+    blocks[2] = blocks[2].replace("-1.2523300000e+02", "-1.0000000000e+02", 1)
+    filename.write_text("<event>".join(blocks))
+
+    def make_reader():
+        return ReaderLHEF(filename, wgt_idx=0, validate="drop", selection=Selection(min_pt=1E6))
+
+    assert list(make_reader()) == []
+    reader = make_reader()
+    # indexed access ignores the selection and dropping of the reader
+    assert len(reader) == 4
+    assert [ev.wgt for ev in reader[0:4]] == [1., 2., 3., 4.]
+    assert not reader[1].check_momentum()
+
+
+def test_indexed_range(tmp_path):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=6)
+    offsets = load_index(filename)
+    reader = ReaderLHEF(filename, wgt_idx=0, start=int(offsets[2]), stop=int(offsets[5]))
+    assert len(reader) == 3
+    assert [ev.wgt for ev in reader[:]] == [3., 4., 5.]
+    assert reader[-1].wgt == 5.
+    with pytest.raises(IndexError):
+        reader[3]
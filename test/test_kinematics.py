@@ -0,0 +1,49 @@
+import pytest
+import numpy as np
+from EventPlotter import Particle, ParticleTable, kinematics
+
+
+A = Particle(21, status=-1, px=0, py=0, pz=200, e=200)
+B = Particle(12, status=-1, px=0, py=0, pz=-350, e=350)
+C = Particle(1, status=1, px=0, py=0, pz=-150, e=550, m=529.15)
+D = Particle(22, status=1, px=-2.026831e+01, py=-1.871849e+01,
+             pz=-1.510034e+02, e=1.535032e+02, m=0.139)
+E = Particle(-11, status=1, px=-6.838323e+00, py=-3.602227e+02,
+             pz=1.114048e+02, e=3.771183e+02, m=0.167)
+Z = Particle(check_on_shell=False)
+
+particles = [A, B, C, D, E, Z]
+table = ParticleTable.from_particles(particles)
+
+
+def test_rapidity_edges():
+    rap = kinematics.rapidity(table.pz, table.e)
+    assert rap[0] == np.inf
+    assert rap[1] == -np.inf
+    # a particle at rest at zero energy follows the +inf convention
+    assert rap[5] == np.inf
+    assert kinematics.rapidity(0., 0.) == np.inf
+    assert kinematics.rapidity(-1., 1.) == -np.inf
+
+
+@pytest.mark.parametrize("func, method", [
+    (ParticleTable.rap, Particle.rap),
+    (ParticleTable.eta, Particle.eta),
+    (ParticleTable.phi, Particle.phi),
+    (ParticleTable.perp, Particle.perp),
+    (ParticleTable.m_calc, Particle.m_calc),
+])
+def test_batch_matches_scalar(func, method):
+    values = func(table)
+    assert values.shape == (len(particles),)
+    for val, part in zip(values, particles):
+        assert val == method(part)
+
+
+def test_pseudorapidity():
+    eta = kinematics.pseudorapidity(table.px, table.py, table.pz)
+    assert eta[0] == np.inf
+    assert eta[1] == -np.inf
+    # massless particles have equal rapidity and pseudorapidity
+    assert eta[3] == pytest.approx(D.rap(), 1E-3)
+    assert np.ndim(kinematics.pseudorapidity(1., 0., 1.)) == 0
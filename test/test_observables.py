@@ -0,0 +1,97 @@
+import itertools
+import pytest
+import numpy as np
+from EventPlotter import Particle, Event, EventBatch, observables
+
+
+A = Particle(3, status=-1, px=0., py=0., pz=80.387, e=80.387)
+B = Particle(1, status=-1, px=0., py=0., pz=-435.476, e=435.476)
+C = Particle(2, status=1, px=125.233, py=40.134, pz=-315.891, e=342.17125, m=0.)
+D = Particle(21, status=1, px=-0.469, py=1.953, pz=-4.284, e=4.731, m=0.)
+E = Particle(3, status=1, px=-52.286, py=-22.262, pz=-5.853, e=57.129, m=0.206)
+F = Particle(-12, status=1, px=-65.701, py=-41.757, pz=-38.699, e=86.936, m=0.11)
+G = Particle(11, status=1, px=-6.777, py=21.931, pz=9.638, e=24.896, m=0.15)
+
+
+def random_events(n, seed=3):
+    """
+    Events of random final states, including ones without partons.
+    """
+    rng = np.random.default_rng(seed)
+    events = []
+    for idx in range(n):
+        parts = []
+        for j in range(rng.integers(0, 6)):
+            px, py, pz = rng.normal(0., 50., 3)
+            pdg = int(rng.choice([1, 2, 21, 11, -12]))
+            parts.append(Particle(pdg, status=1, px=px, py=py, pz=pz,
+                                  e=np.sqrt(px**2 + py**2 + pz**2), check_on_shell=False))
+        p_tot = np.sum([[p.e, p.pz] for p in parts], axis=0) if parts else np.zeros(2)
+        plus, minus = (p_tot[0] + p_tot[1]) / 2., (p_tot[0] - p_tot[1]) / 2.
+        incoming = [Particle(21, status=-1, pz=plus + 1., e=plus + 1.),
+                    Particle(21, status=-1, pz=-minus - 1., e=minus + 1.)]
+        events.append(Event(incoming + parts, 7000., set_info=False, validate=False))
+    return events
+
+
+def loop_observables(event):
+    """
+    Per-particle loop versions of the observables, partons only where
+    the batched default is partons only.
+    """
+    final = [p for p in event if p.is_final()]
+    partons = sorted([p for p in final if p.is_parton()], key=lambda p: -p.perp())
+    ht = 0.
+    for p in final:
+        ht += p.perp()
+    total = np.zeros(4)
+    for p in final:
+        total += [p.e, p.px, p.py, p.pz]
+    masses = [(a.momentum + b.momentum).m for a, b in itertools.combinations(partons[:3], 2)]
+    gap = abs(partons[0].rap() - partons[1].rap()) if (len(partons) > 1) else np.nan
+    max_y = max([abs(p.rap()) for p in final], default=np.nan)
+    return len(final), ht, total, masses, gap, max_y
+
+
+def test_single_event():
+    event = Event([A, B, C, D, E, F, G], 7000)
+    assert observables.multiplicity(event)[0] == 5
+    assert observables.multiplicity(event, partons_only=True)[0] == 3
+    assert observables.h_t(event)[0] == pytest.approx(sum(p.perp() for p in [C, D, E, F, G]))
+    assert observables.h_t(event, partons_only=True)[0] == pytest.approx(
+        C.perp() + D.perp() + E.perp())
+    assert np.allclose(observables.total_momentum(event)[0],
+                       [A.e + B.e, 0., 0., A.pz + B.pz], atol=1E-2)
+    assert list(observables.leading(event, 3)[0]) == [2, 4, 3]
+    assert list(observables.leading(event, 4)[0]) == [2, 4, 3, -1]
+    assert observables.pair_masses(event)[0, 0] == pytest.approx(
+        (C.momentum + E.momentum).m)
+    assert observables.rapidity_gap(event)[0] == pytest.approx(abs(C.rap() - E.rap()))
+
+
+def test_matches_loops():
+    events = random_events(200)
+    batch = EventBatch.from_events(events)
+    mult = observables.multiplicity(batch)
+    ht = observables.h_t(batch)
+    total = observables.total_momentum(batch)
+    masses = observables.pair_masses(batch, n=3)
+    gap = observables.rapidity_gap(batch)
+    max_y = observables.max_abs_rapidity(batch)
+    assert masses.shape == (200, 3)
+    for idx, event in enumerate(events):
+        n, ht_loop, total_loop, masses_loop, gap_loop, max_y_loop = loop_observables(event)
+        assert mult[idx] == n
+        assert ht[idx] == pytest.approx(ht_loop)
+        assert np.allclose(total[idx], total_loop)
+        assert np.allclose(masses[idx, :len(masses_loop)], masses_loop)
+        assert np.all(np.isnan(masses[idx, len(masses_loop):]))
+        assert gap[idx] == pytest.approx(gap_loop, nan_ok=True)
+        assert max_y[idx] == pytest.approx(max_y_loop, nan_ok=True)
+
+
+def test_empty_batch():
+    batch = EventBatch()
+    assert len(observables.h_t(batch)) == 0
+    assert observables.pair_masses(batch, n=3).shape == (0, 3)
+    assert len(observables.max_abs_rapidity(batch)) == 0
@@ -0,0 +1,44 @@
+import pytest
+import numpy as np
+from EventPlotter import ParallelReader, read_many
+from .samples import write_lhe
+
+
+def event_weight(event):
+    return event.wgt
+
+
+def batch_weight(batch):
+    return float(np.sum(batch.wgt))
+
+
+def weight_list(event):
+    return [event.wgt]
+
+
+@pytest.mark.parametrize("chunks, workers", [
+    (1, 1),
+    (3, 1),
+    (7, 2),
+])
+def test_chunks(tmp_path, chunks, workers):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=10)
+    weights = read_many(filename, weight_list, workers=workers, chunks_per_file=chunks, wgt_idx=0)
+    # every event is read exactly once and in order
+    assert weights == [float(idx + 1) for idx in range(10)]
+
+
+def test_many_files(tmp_path):
+    files = [write_lhe(tmp_path / "sample_{}.lhe".format(idx), n_events=4) for idx in range(3)]
+    reader = ParallelReader(files, workers=2, chunks_per_file=2, wgt_idx=1)
+    assert len(reader.shards()) == 6
+    assert reader.map_reduce(event_weight) == 3 * 2. * (1 + 2 + 3 + 4)
+    assert reader.map_reduce(batch_weight, batch_size=3) == 3 * 2. * (1 + 2 + 3 + 4)
+    assert reader.map_reduce(event_weight, initial=100.) == 100. + 3 * 2. * (1 + 2 + 3 + 4)
+    assert reader.map_reduce(event_weight, reduce=max) == 8.
+
+    # more chunks than events leaves some shards empty
+    assert read_many(files[0], event_weight, workers=1, chunks_per_file=50, wgt_idx=0) == 10.
+
+    with pytest.raises(ValueError):
+        ParallelReader(files, chunks_per_file=0)
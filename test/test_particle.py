@@ -1,5 +1,6 @@
 import pytest
 import numpy as np
+import pickle
 import pylorentz
 from EventPlotter import Particle
 
@@ -101,3 +102,37 @@ def test_rapidity(part: Particle, rap_control: float):
 ])
 def test_perp(part: Particle, perp_control: float):
     assert part.perp() == pytest.approx(perp_control, Particle.TOL)
+
+
+def test_cached_kinematics():
+    part = Particle(21, status=1, px=3., py=4., pz=0., e=5., check_on_shell=False)
+    assert not hasattr(part, "__dict__")
+    assert part._momentum is None
+    assert part.perp() == 5.
+    assert part.phi() == np.arctan2(4., 3.)
+    assert part.momentum is part.momentum
+
+    # mutating a component invalidates the cached values
+    part.px = 0.
+    assert part.perp() == 4.
+    assert part.momentum.p_x == 0.
+    part.pz = 5.
+    assert part.rap() == np.inf
+    part.e = 10.
+    assert part.m_calc() == pytest.approx(np.sqrt(100. - 16. - 25.))
+
+
+def test_copy_and_compare():
+    part = Particle(11, status=1, px=-6.777, py=21.931, pz=9.638, e=24.896, m=0.15)
+    copied = pickle.loads(pickle.dumps(part))
+    assert copied == part
+    assert copied.perp() == part.perp()
+    assert copied != D
+    assert "pdg=11" in repr(part)
+
+    assert part.as_dict()["px"] == -6.777 and set(part.as_dict()) == set(Particle.FIELDS)
+    moved = part.replace(px=6.777)
+    assert moved.px == 6.777 and moved.perp() == pytest.approx(part.perp())
+    assert moved != part and moved.replace(px=-6.777) == part
+    with pytest.raises(TypeError):
+        part.replace(charge=-1)
@@ -1,7 +1,8 @@
 import pytest
 import numpy as np
-from EventPlotter import Particle, Event, Plotter
+from EventPlotter import Particle, Event, EventBatch, Plotter, ReaderLHEF
 import sys
+from .samples import lhe_text
 np.set_printoptions(threshold=sys.maxsize)
 
 
@@ -102,3 +103,152 @@ def test_get_image():
     with pytest.raises(ValueError):
         image_invalid = plots.plot_y_phi()  # noqa: F841
 
+
+def test_image_binning():
+    plotter = Plotter(rap_extent=[-2, 2], phi_extent=[-3, 3], bins=5)
+    image = np.zeros((5, 5))
+    # grid points at -2, -1, 0, 1, 2 in rapidity and -3, -1.5, 0, 1.5, 3 in phi
+    rap = np.array([-1.9, -0.5, 0.4, 1.6, 2., -2.5, 0.])
+    phi = np.array([-2.9, 0.6, 0.8, 2.9, 0., 0., 3.])
+    plotter.fill_image(image, rap, phi, np.ones(7))
+    assert image[0, 0] == 1.
+    assert image[2, 1] == 1.
+    assert image[3, 2] == 1.
+    assert image[4, 4] == 1.
+    # values on or beyond the extents are discarded
+    assert np.sum(image) == 4.
+
+
+def test_image_batch_view():
+    batch = EventBatch.from_events([event_balanced_beams])
+    for plotter in [plots, Plotter()]:
+        assert np.array_equal(plotter.get_image(batch[0]),
+                              plotter.get_image(event_balanced_beams))
+        image, products = plotter.get_image(batch[0], [7, 8])
+        assert products == plotter.get_image(event_balanced_beams, [7, 8])[1]
+
+
+@pytest.mark.parametrize("plotter", [
+    (plots),
+    (Plotter(bins=20)),
+])
+def test_accumulator(plotter):
+    events = [event_balanced_beams, event_balanced, event_balanced_beams]
+    batch = EventBatch.from_events(events)
+    control = sum(plotter.get_image(ev) for ev in events)
+
+    acc_events = plotter.accumulator(errors=True).fill(events)
+    acc_batch = plotter.accumulator(errors=True).fill(batch)
+    assert acc_events.n_events == acc_batch.n_events == 3
+    assert np.allclose(acc_events.sumw, control)
+    assert np.allclose(acc_batch.sumw, control)
+    assert np.allclose(acc_batch.sumw2, acc_events.sumw2)
+    assert np.allclose(acc_events.sumw2,
+                       sum(plotter.get_image(ev)**2 for ev in events))
+
+    merged = plotter.accumulator(errors=True).fill(batch[:1]) + plotter.accumulator(errors=True).fill(batch[1:])
+    assert np.allclose(merged.sumw, control)
+    assert np.allclose(merged.mean(), acc_events.mean())
+    assert np.all(merged.errors() >= 0.)
+
+    with pytest.raises(ValueError):
+        merged.merge(Plotter(bins=7).accumulator(errors=True))
+    with pytest.raises(ValueError):
+        plotter.accumulator().mean()
+    with pytest.raises(ValueError):
+        plotter.accumulator().errors()
+
+
+def test_accumulator_weights():
+    weights = np.array([[1., 0.5, 2.], [2., 1., 0.], [0.5, 0.5, 3.]])
+    events = [Event(list(ev.particles), 7000, wgt=w[0], weights=w)
+              for ev, w in zip([event_balanced_beams, event_balanced, event_balanced_beams], weights)]
+    batch = EventBatch.from_events(events)
+
+    acc = plots.accumulator(errors=True, n_weights=3).fill(batch)
+    assert acc.sumw.shape == (3, 50, 50)
+    assert np.allclose(acc.sum_wgt, weights.sum(axis=0))
+    for idx in range(3):
+        single = Plotter(rap_extent=[-4.5, 4.5], bins=50, custom_z_axis=lambda part: part.E(),
+                         include_wgt=True).accumulator(errors=True)
+        single.fill(EventBatch(batch.table, batch.offsets, root_s=batch.root_s, wgt=weights[:, idx]))
+        assert np.allclose(acc.sumw[idx], single.sumw)
+        assert np.allclose(acc.sumw2[idx], single.sumw2)
+        assert np.allclose(acc.mean()[idx], single.mean())
+
+    merged = plots.accumulator(n_weights=3).fill(events[0]) + plots.accumulator(n_weights=3).fill(events[1:])
+    assert np.allclose(merged.sumw, acc.sumw)
+    with pytest.raises(ValueError):
+        merged.merge(plots.accumulator())
+    with pytest.raises(ValueError):
+        plots.accumulator(n_weights=2).fill(batch)
+
+
+def test_get_images(tmp_path):
+    events = [event_balanced_beams, event_balanced, event_balanced_beams]
+    batch = EventBatch.from_events(events)
+    control = np.array([plots.get_image(ev) for ev in events])
+
+    images = plots.get_images(batch, chunk_size=2)
+    assert images.shape == (3, 50, 50)
+    assert np.allclose(images, control)
+    assert np.allclose(plots.get_images(iter(events), chunk_size=2), control)
+
+    channels = plots.get_images(events, channels=["pt", "energy", "multiplicity", "z"])
+    assert channels.shape == (3, 4, 50, 50)
+    assert np.allclose(channels[:, 3], control)
+    assert np.allclose(channels[:, 1], control)
+    assert np.sum(channels[0, 2]) == pytest.approx(3 * event_balanced_beams.wgt)
+
+    filename = str(tmp_path / "images.npy")
+    written = plots.get_images(batch, chunk_size=2, filename=filename)
+    assert np.allclose(np.load(filename), control)
+    assert isinstance(written, np.memmap)
+
+    coords, values, shape = plots.get_images(batch, chunk_size=2, sparse=True)
+    assert shape == (3, 50, 50)
+    dense = np.zeros(shape)
+    dense[tuple(coords)] = values
+    assert np.allclose(dense, control)
+    assert len(values) == np.count_nonzero(control)
+
+    with pytest.raises(ValueError):
+        plots.get_images(iter(events), filename=filename)
+    with pytest.raises(ValueError):
+        plots.get_images(batch, channels=["charge"])
+
+
+def test_images_reader(tmp_path):
+    filename = str(tmp_path / "sample.lhe")
+    with open(filename, "w") as f:
+        f.write(lhe_text(n_events=6))
+    plots = Plotter()
+    control = plots.get_images(ReaderLHEF(filename).read_batch(6))
+
+    # the length of a reader is only an upper bound of the events it returns
+    assert plots.get_images(ReaderLHEF(filename).filter(min_pt=1E6)).shape == (0, 50, 50)
+    reader = ReaderLHEF(filename)
+    next(reader)
+    assert np.allclose(plots.get_images(reader, chunk_size=4), control[1:])
+
+    images = str(tmp_path / "images.npy")
+    written = plots.get_images(ReaderLHEF(filename).filter(min_pt=1E6), filename=images)
+    assert written.shape == np.load(images).shape == (0, 50, 50)
+    reader = ReaderLHEF(filename)
+    next(reader)
+    written = plots.get_images(reader, chunk_size=4, filename=images)
+    assert isinstance(written, np.memmap)
+    assert np.allclose(written, control[1:]) and np.allclose(np.load(images), control[1:])
+
+
+def test_accumulator_tail(tmp_path):
+    filename = str(tmp_path / "live.lhe")
+    with open(filename, "w") as f:
+        f.write(lhe_text(n_events=3))
+
+    plotter = Plotter(rap_extent=[-4.5, 4.5], bins=10, include_wgt=True)
+    reader = ReaderLHEF(filename, wgt_idx=0, follow=True)
+    acc = plotter.accumulator()
+    assert [update.n_events for update in acc.tail(reader, batch_size=2)] == [2, 3]
+    reference = plotter.accumulator().fill(ReaderLHEF(filename, wgt_idx=0).read_batch(3))
+    assert np.allclose(acc.sumw, reference.sumw)
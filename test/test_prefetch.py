@@ -0,0 +1,83 @@
+import asyncio
+import time
+import pytest
+from EventPlotter import EventBatch, ReaderLHEF, PrefetchReader
+from .samples import write_lhe
+
+
+class FailingReader():
+    """
+    Reader yielding two items and then raising an error.
+    """
+
+    def __init__(self):
+        self.items = iter([1, 2])
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self.items)
+        except StopIteration:
+            raise ValueError("Malformed event")
+
+
+def test_events(tmp_path):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=7)
+    control = [(ev.wgt, [p.e for p in ev]) for ev in ReaderLHEF(filename, wgt_idx=1)]
+
+    with PrefetchReader(ReaderLHEF(filename, wgt_idx=1), depth=2) as reader:
+        events = [(ev.wgt, [p.e for p in ev]) for ev in reader]
+        assert events == control
+        with pytest.raises(StopIteration):
+            next(reader)
+
+    reader = PrefetchReader(ReaderLHEF(filename, wgt_idx=1), batch_size=3)
+    batches = list(reader)
+    assert [len(b) for b in batches] == [3, 3, 1]
+    assert list(EventBatch.concatenate(batches).wgt) == [w for w, e in control]
+
+
+def test_bounded_and_close(tmp_path):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=20)
+    reader = PrefetchReader(ReaderLHEF(filename), depth=3)
+    time.sleep(0.2)
+    assert reader.queue.qsize() == 3
+    next(reader)
+    reader.close()
+    assert not reader.thread.is_alive()
+    assert reader.reader.stream.closed
+    with pytest.raises(StopIteration):
+        next(reader)
+
+    with pytest.raises(ValueError):
+        PrefetchReader(ReaderLHEF(filename), depth=0)
+    with pytest.raises(ValueError):
+        PrefetchReader(FailingReader(), batch_size=2)
+
+
+def test_errors():
+    reader = PrefetchReader(FailingReader())
+    assert next(reader) == 1
+    assert next(reader) == 2
+    with pytest.raises(ValueError):
+        next(reader)
+    with pytest.raises(StopIteration):
+        next(reader)
+
+
+def test_async(tmp_path):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=5)
+
+    async def consume(reader):
+        return [ev.wgt async for ev in reader]
+
+    assert asyncio.run(consume(PrefetchReader(ReaderLHEF(filename, wgt_idx=0), depth=1))) \
+        == [1., 2., 3., 4., 5.]
+
+    async def consume_errors(reader):
+        return [item async for item in reader]
+
+    with pytest.raises(ValueError):
+        asyncio.run(consume_errors(PrefetchReader(FailingReader())))
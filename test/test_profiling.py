@@ -0,0 +1,65 @@
+import json
+import pytest
+from EventPlotter import Particle, Plotter, ReaderLHEF, profiling
+from .samples import write_lhe
+
+
+def test_disabled(tmp_path):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=3)
+    assert profiling.active() is None
+    list(ReaderLHEF(filename))
+    assert profiling.disable() is None
+
+
+def test_stages(tmp_path):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=5)
+    plotter = Plotter()
+    with profiling.profile(trace=True) as prof:
+        assert profiling.active() is prof
+        events = list(ReaderLHEF(filename))
+        for ev in events:
+            plotter.get_image(ev)
+        batch = ReaderLHEF(filename).read_batch(4)
+        plotter.accumulator().fill(batch)
+        Particle(1, status=1, px=3., e=3.)
+    assert profiling.active() is None
+
+    summary = prof.summary()
+    assert summary["parse"]["items"] == 9
+    assert summary["parse"]["calls"] == 6
+    assert summary["parse"]["bytes"] > 0
+    assert summary["build_event"]["items"] == 5
+    assert summary["find_incoming"]["calls"] == 5
+    assert summary["check_momentum"]["calls"] == 5
+    assert summary["build_batch"]["items"] == 4
+    assert summary["check_momentum_batch"]["items"] == 4
+    assert summary["get_image"]["calls"] == 5
+    assert summary["fill_batch"]["items"] == 4
+    assert "on_shell" in summary
+    assert all(stage["seconds"] >= 0. for stage in summary.values())
+    assert "build_event" in prof.report()
+
+    filename = str(tmp_path / "trace.json")
+    prof.write_trace(filename)
+    with open(filename) as f:
+        trace = json.load(f)["traceEvents"]
+    assert len(trace) == sum(stage["calls"] for stage in summary.values())
+    assert {"name", "ph", "ts", "dur", "pid", "tid"} <= set(trace[0])
+
+    filename = str(tmp_path / "summary.json")
+    prof.write_summary(filename)
+    with open(filename) as f:
+        assert json.load(f)["parse"]["items"] == 9
+
+    merged = profiling.Profiler().merge(prof).merge(prof)
+    assert merged.stages["parse"]["items"] == 18
+    with pytest.raises(ValueError):
+        merged.write_trace(filename)
+
+
+def test_enable():
+    prof = profiling.enable()
+    Particle(1, status=1, px=3., e=3.)
+    assert profiling.disable() is prof
+    Particle(1, status=1, px=3., e=3.)
+    assert prof.stages["on_shell"]["calls"] == 1
@@ -1,6 +1,18 @@
 import pytest
-import os
-from EventPlotter import Particle, Event, ReaderLHEF, Reader
+import bz2
+import gzip
+import io
+import lzma
+import threading
+import time
+import types
+import numpy as np
+from EventPlotter import (Particle, Event, EventBatch, ReaderLHEF, Reader, LHEParser,
+                          ValidationError)
+from EventPlotter import streams
+from EventPlotter.streams import ThreadedStream
+from EventPlotter.event import ROLE_OTHER, ROLE_BEAM, ROLE_INCOMING
+from .samples import write_lhe, lhe_text, event_particles, sample_init_info
 
 
 init_info = [2212.0, 2212.0, 3500.0, 3500.0, 0.0, 0.0,
@@ -8,14 +20,261 @@ init_info = [2212.0, 2212.0, 3500.0, 3500.0, 0.0, 0.0,
 
 def test_incorrect_ext():
     with pytest.raises(ValueError):
-        reader = ReaderLHEF("test/HEJFOG.lhe.gz", wgt_idx=0)
+        reader = ReaderLHEF("test/HEJFOG.hepmc.gz", wgt_idx=0)
+    with pytest.raises(ValueError):
+        reader = ReaderLHEF("test/HEJFOG.lhe.zip", wgt_idx=0)
 
 
 def test_reading():
-    os.system("gunzip test/HEJFOG.lhe.gz")
-    reader = ReaderLHEF("test/HEJFOG.lhe", wgt_idx=0)
+    reader = ReaderLHEF("test/HEJFOG.lhe.gz", wgt_idx=0)
     assert reader.init_info == init_info
     for idx, ev in enumerate(reader):
         assert isinstance(ev, Event)
 
-    os.system("gzip test/HEJFOG.lhe")
+
+def test_parser(tmp_path):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=4)
+    with open(filename, "rb") as stream:
+        parser = LHEParser(stream)
+        init = parser.read_init()
+        assert init.beam_info == sample_init_info
+        assert init.processes.shape == (1, 4)
+
+        record = parser.next_event()
+        assert record.header[0] == len(event_particles)
+        assert record.particles.shape == (len(event_particles), 13)
+        assert list(record.weights) == [1., 2., 3.]
+        stream.seek(record.offset)
+        assert stream.readline().startswith(b"<event>")
+        stream.seek(parser.position)
+
+        records = parser.read_events(10)
+        assert len(records) == 3
+        assert records[0].particles[2, 6] == -record.particles[2, 6]
+        assert parser.next_event() is None
+
+
+def test_reading_synthetic(tmp_path):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=5, rwgt=True)
+    reader = ReaderLHEF(filename, wgt_idx=1)
+    assert reader.init_info == sample_init_info
+    events = list(reader)
+    assert len(events) == 5
+    for idx, ev in enumerate(events):
+        assert isinstance(ev, Event)
+        assert len(ev) == len(event_particles) + 3
+        assert ev.wgt == 2.*(idx + 1)
+        assert ev.root_s == 7000.
+        assert [p.status for p in ev][3:5] == [-21, -21]
+        assert list(ev.roles[:5]) == [ROLE_OTHER, ROLE_BEAM, ROLE_BEAM,
+                                      ROLE_INCOMING, ROLE_INCOMING]
+        assert ev.beams == [1, 2] and ev.incoming == [3, 4]
+    # the system and beams are shared by all events of a file
+    assert events[0][1] is events[1][1] and events[0][0] is events[-1][0]
+    reader.close()
+
+
+def test_read_batch(tmp_path):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=5)
+    events = list(ReaderLHEF(filename, wgt_idx=0))
+    reader = ReaderLHEF(filename, wgt_idx=0)
+    batches = list(reader.iter_batches(2))
+    assert [len(b) for b in batches] == [2, 2, 1]
+
+    batch = EventBatch.concatenate(batches)
+    assert np.array_equal(batch.wgt, [ev.wgt for ev in events])
+    for ev, control in zip(batch, events):
+        assert [p.pdg for p in ev] == [p.pdg for p in control]
+        assert [p.status for p in ev] == [p.status for p in control]
+        assert [p.px for p in ev] == [p.px for p in control]
+        assert ev.incoming == control.incoming
+        assert np.array_equal(ev.roles, control.roles)
+    assert np.array_equal(batch.table.roles, EventBatch.from_events(events).table.roles)
+
+
+@pytest.mark.parametrize("opener, ext, threaded", [
+    (gzip.open, ".gz", True),
+    (gzip.open, ".gz", False),
+    (bz2.open, ".bz2", True),
+    (lzma.open, ".xz", True),
+])
+def test_compressed(tmp_path, opener, ext, threaded):
+    filename = write_lhe(tmp_path / "sample.lhe", n_events=5)
+    with open(filename, "rb") as f_in, opener(filename + ext, "wb") as f_out:
+        f_out.write(f_in.read())
+
+    events = list(ReaderLHEF(filename, wgt_idx=0))
+    reader = ReaderLHEF(filename + ext, wgt_idx=0, threaded=threaded)
+    assert reader.init_info == sample_init_info
+    compressed_events = list(reader)
+    assert len(compressed_events) == len(events)
+    for ev, control in zip(compressed_events, events):
+        assert ev.wgt == control.wgt
+        assert [p.px for p in ev] == [p.px for p in control]
+    reader.close()
+
+
+def test_threaded_stream():
+    data = bytes(range(256)) * 1000
+    stream = ThreadedStream(io.BytesIO(data), chunk_size=1000, depth=2)
+    assert stream.read() == data
+    stream.close()
+    assert stream.closed
+
+
+def test_read_head(tmp_path, monkeypatch):
+    class ZstdError(Exception):
+        pass
+
+    class BrokenZstd(io.RawIOBase):
+        def __init__(self, f, **kwargs):
+            f.close()
+
+        def readable(self):
+            return True
+
+        def readinto(self, buffer):
+            raise(ZstdError("invalid frame"))
+
+    decompressor = types.SimpleNamespace(stream_reader=BrokenZstd)
+    zstandard = types.SimpleNamespace(ZstdError=ZstdError, ZstdDecompressor=lambda: decompressor)
+    monkeypatch.setattr(streams, "zstandard", zstandard)
+    filename = tmp_path / "corrupt.lhe.zst"
+    filename.write_bytes(b"not a zstandard frame")
+    assert streams.read_head(str(filename)) == b""
+    filename = tmp_path / "corrupt.lhe.gz"
+    filename.write_bytes(b"not a gzip member")
+    assert streams.read_head(str(filename)) == b""
+
+
+def write_broken_lhe(tmp_path):
+    # the third and fifth events have a final state momentum imbalance
+    text = lhe_text(n_events=6)
+    blocks = text.split("<event>")
+    for idx in [3, 5]:
+        blocks[idx] = blocks[idx].replace("1.2523300000e+02", "1.3523300000e+02", 1)
+    filename = str(tmp_path / "broken.lhe")
+    with open(filename, "w") as f:
+        f.write("<event>".join(blocks))
+    return filename
+
+
+def test_validation(tmp_path):
+    filename = write_broken_lhe(tmp_path)
+    reader = ReaderLHEF(filename)
+    with pytest.raises(ValidationError):
+        list(reader)
+    # failed events are counted whether they are raised or dropped
+    assert (reader.n_events, reader.n_failed) == (3, 1)
+    with pytest.raises(ValueError):
+        ReaderLHEF(filename, validate="maybe")
+
+    reader = ReaderLHEF(filename, wgt_idx=0, validate="drop")
+    assert [ev.wgt for ev in reader] == [1., 2., 4., 6.]
+    assert (reader.n_events, reader.n_failed) == (6, 2)
+
+    reader = ReaderLHEF(filename, wgt_idx=0, validate="none")
+    events = list(reader)
+    assert len(events) == 6
+    assert not events[2].check_momentum()
+    assert reader.n_failed == 0
+
+    # invalid arguments are raised rather than counted as failed events
+    reader = ReaderLHEF(filename, wgt_idx=7, validate="drop")
+    with pytest.raises(ValueError, match="no weight at index 7"):
+        next(reader)
+    assert reader.n_failed == 0
+
+
+def test_batch_validation(tmp_path):
+    filename = write_broken_lhe(tmp_path)
+    batch = EventBatch.concatenate(ReaderLHEF(filename, validate="none").iter_batches(4))
+    assert list(batch.check_momentum()) == [True, True, False, True, False, True]
+
+    reader = ReaderLHEF(filename, wgt_idx=0, validate="drop")
+    batches = list(reader.iter_batches(2))
+    assert [len(b) for b in batches] == [2, 1, 1]
+    assert list(EventBatch.concatenate(batches).wgt) == [1., 2., 4., 6.]
+    assert (reader.n_events, reader.n_failed) == (6, 2)
+
+    with pytest.raises(ValueError):
+        ReaderLHEF(filename).read_batch(6)
+
+
+def test_weights(tmp_path):
+    filename = write_lhe(tmp_path / "rwgt.lhe", n_events=4, rwgt=True)
+    reader = ReaderLHEF(filename, wgt_idx=0)
+    batch = reader.read_batch(4)
+    assert batch.weights.shape == (4, 3)
+    assert np.array_equal(batch.weights, np.outer([1., 2., 3., 4.], [1., 2., 3.]))
+    assert batch.weight_ids == ["1001", "1002", "1003"]
+    assert list(batch[2].weights) == [3., 6., 9.]
+    assert list(batch.select([False, True, False, True]).weights[:, 2]) == [6., 12.]
+    assert batch[1:3].weight_ids == batch.weight_ids
+
+    # weight ids declared in the header apply to an unnamed <weights> block
+    header = ("<header>\n<initrwgt>\n<weightgroup name='scale'>\n"
+              "<weight id='muR=0.5'> dyn=0 </weight>\n<weight id=\"muR=1\"> dyn=0 </weight>\n"
+              "<weight id='muR=2'> dyn=0 </weight>\n</weightgroup>\n</initrwgt>\n")
+    filename = str(tmp_path / "initrwgt.lhe")
+    with open(filename, "w") as f:
+        f.write(lhe_text(n_events=3).replace("<header>\n", header))
+    reader = ReaderLHEF(filename, wgt_idx=0)
+    assert reader.init_info == sample_init_info
+    assert reader.weight_ids == ["muR=0.5", "muR=1", "muR=2"]
+    events = list(reader)
+    assert [list(ev.weights) for ev in events][1] == [2., 4., 6.]
+    reader = ReaderLHEF(filename, wgt_idx=0)
+    batch = EventBatch.concatenate(reader.iter_batches(2))
+    assert batch.weight_ids == reader.weight_ids
+    assert np.array_equal(batch.weights, np.array([list(ev.weights) for ev in events]))
+    assert np.array_equal(EventBatch.from_events(events).weights, batch.weights)
+
+
+def test_follow(tmp_path):
+    text = lhe_text(n_events=4)
+    events = text.split("<event>")
+    head = events[0] + "<event>" + events[1] + "<event>" + events[2]
+    # cut the third event in the middle of a particle line
+    partial = "<event>" + events[3][:200]
+    filename = str(tmp_path / "live.lhe")
+    with open(filename, "w") as f:
+        f.write(head + partial)
+
+    with pytest.raises(ValueError):
+        ReaderLHEF(filename + ".gz", follow=True)
+    with pytest.raises(ValueError):
+        list(ReaderLHEF(filename).tail())
+
+    reader = ReaderLHEF(filename, wgt_idx=0, follow=True)
+    assert [ev.wgt for ev in reader] == [1., 2.]
+    assert list(reader) == []
+    position = reader.parser.position
+
+    with open(filename, "a") as f:
+        f.write(text[len(head) + len(partial):])
+    assert [ev.wgt for ev in reader.tail(timeout=0.)] == [3., 4.]
+    assert reader.parser.position > position and reader.parser.finished
+    assert (reader.n_events, reader.n_failed) == (4, 0)
+
+
+def test_watch(tmp_path):
+    text = lhe_text(n_events=6)
+    split = text.index("<event>", text.index("<event>") + 1)
+    filename = str(tmp_path / "live.lhe")
+    with open(filename, "w") as f:
+        f.write(text[:split])
+
+    def append():
+        time.sleep(0.05)
+        with open(filename, "a") as f:
+            f.write(text[split:])
+
+    writer = threading.Thread(target=append)
+    writer.start()
+    sizes = []
+    reader = ReaderLHEF(filename, follow=True)
+    assert reader.watch(lambda batch: sizes.append(len(batch)), batch_size=4,
+                        interval=0.01, timeout=5.) == 6
+    writer.join()
+    assert sum(sizes) == 6 and max(sizes) <= 4
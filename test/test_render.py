@@ -0,0 +1,84 @@
+import pytest
+import os
+import numpy as np
+from EventPlotter import Plotter, FigureRenderer
+from EventPlotter import render
+from EventPlotter.render import to_mathtext
+
+
+plots = Plotter(rap_extent=[-4.5, 4.5], bins=20, chosen_map="cividis",
+                z_label=r"$E/p_\perp \quad [\textrm{GeV}]$")
+rng = np.random.default_rng(7)
+images = rng.random((5, 20, 20))
+
+
+def test_mathtext():
+    assert to_mathtext(plots.z_label) == r"$E/p_\perp \quad [\mathrm{GeV}]$"
+
+
+def test_renderer(tmp_path):
+    renderer = plots.renderer()
+    assert isinstance(renderer, FigureRenderer)
+    axes_image = renderer.image
+    products = [[11, 0.5, 1., 3.], [-12, -1., -2., 1.]]
+    for idx, image in enumerate(images[:2]):
+        path = str(tmp_path / "event-{}.png".format(idx))
+        renderer.render(image, path, products if (idx == 0) else None)
+        assert os.path.getsize(path) > 0
+        # the same image is reused and rescaled for each render
+        assert renderer.image is axes_image
+        assert np.array_equal(renderer.image.get_array(), image)
+        assert renderer.image.get_clim() == (np.min(image), np.max(image))
+
+    assert len(renderer.markers) == 0
+    with pytest.raises(ValueError):
+        renderer.render(None, str(tmp_path / "none.png"))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_render_many(tmp_path, workers):
+    paths = [str(tmp_path / "event-{}.png".format(idx)) for idx in range(len(images))]
+    assert plots.render_many(images, paths, workers=workers) == paths
+    for path in paths:
+        assert os.path.getsize(path) > 0
+
+    with pytest.raises(ValueError):
+        plots.render_many(images, paths[:2])
+
+
+class SerialPool():
+    """
+    Executor running each task when its result is requested, which records
+    the largest number of tasks submitted ahead.
+    """
+    max_pending = 0
+
+    def __init__(self, max_workers, initializer, initargs):
+        initializer(*initargs)
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def submit(self, func, *args):
+        pool = self
+
+        class Future():
+            def result(self):
+                pool.pending.remove(self)
+                return func(*args)
+
+        self.pending.append(Future())
+        SerialPool.max_pending = max(SerialPool.max_pending, len(self.pending))
+        return self.pending[-1]
+
+
+def test_render_many_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(render, "ProcessPoolExecutor", SerialPool)
+    paths = [str(tmp_path / "event-{}.png".format(idx)) for idx in range(len(images))]
+    assert render.render_many(plots, images, paths, workers=2, chunk_size=1) == paths
+    assert SerialPool.max_pending == 4
+    assert all(os.path.getsize(path) > 0 for path in paths)
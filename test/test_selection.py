@@ -0,0 +1,104 @@
+import pickle
+import pytest
+import numpy as np
+from EventPlotter import EventBatch, ReaderLHEF, ParallelReader, Selection
+from EventPlotter.selection import leading_pt, parton_multiplicity, rapidity_window
+from .samples import lhe_text
+from .test_observables import random_events
+
+
+def loop_cuts(event, min_pt, n_partons, y_range):
+    """
+    Per-particle loop versions of the standard cuts.
+    """
+    partons = [p for p in event if p.is_final() and p.is_parton()]
+    return (max([p.perp() for p in partons], default=-np.inf) >= min_pt,
+            n_partons[0] <= len(partons) <= n_partons[1],
+            all(y_range[0] <= p.rap() <= y_range[1] for p in partons))
+
+
+def batch_weights(batch):
+    return list(batch.wgt)
+
+
+def write_varied_lhe(tmp_path):
+    # the up quark of the odd events is softer than the leading pt cut
+    blocks = lhe_text(n_events=6).split("<event>")
+    for idx in [2, 4, 6]:
+        blocks[idx] = blocks[idx].replace("1.2523300000e+02", "1.0000000000e+01", 1)
+    filename = str(tmp_path / "varied.lhe")
+    with open(filename, "w") as f:
+        f.write("<event>".join(blocks))
+    return filename
+
+
+def test_cuts():
+    events = random_events(300)
+    batch = EventBatch.from_events(events)
+    control = np.array([loop_cuts(ev, 40., (2, 3), (-0.5, 1.)) for ev in events])
+    assert np.array_equal(leading_pt(batch, 40.), control[:, 0])
+    assert np.array_equal(parton_multiplicity(batch, 2, 3), control[:, 1])
+    assert np.array_equal(rapidity_window(batch, -0.5, 1.), control[:, 2])
+
+    selection = Selection(min_pt=40., n_partons=(2, 3), y_range=(-0.5, 1.))
+    assert len(selection) == 3
+    selected = selection.select(batch)
+    passed = np.all(control, axis=1)
+    assert len(selected) == np.count_nonzero(passed)
+    assert np.array_equal(selected.offsets, batch.select(passed).offsets)
+
+    effs = selection.efficiencies()
+    assert list(effs) == ["min_pt", "n_partons", "y_range", "total"]
+    assert effs["min_pt"] == pytest.approx(np.mean(control[:, 0]))
+    assert effs["n_partons"] == pytest.approx(np.mean(control[control[:, 0], 1]))
+    assert effs["total"] == pytest.approx(np.mean(passed))
+
+    # at least n partons for an int
+    assert np.array_equal(Selection(n_partons=2).apply(batch),
+                          [len([p for p in ev if p.is_final() and p.is_parton()]) >= 2
+                           for ev in events])
+
+    copy = pickle.loads(pickle.dumps(selection))
+    selection.merge(copy)
+    assert selection.n_total == 600
+    assert selection.efficiencies() == pytest.approx(effs)
+    with pytest.raises(ValueError):
+        selection.merge(Selection(min_pt=1.))
+
+
+def test_reader_filter(tmp_path):
+    filename = write_varied_lhe(tmp_path)
+    events = list(ReaderLHEF(filename, wgt_idx=0, validate="none"))
+    control = [all(loop_cuts(ev, 100., (3, 3), (-2., 2.))) for ev in events]
+    assert control == [True, False] * 3
+
+    reader = ReaderLHEF(filename, wgt_idx=0, validate="none").filter(min_pt=100.)
+    reader.filter(n_partons=(3, 3), y_range=(-2., 2.))
+    assert [ev.wgt for ev in reader] == [1., 3., 5.]
+    assert reader.n_events == 6
+    assert reader.selection.efficiencies()["min_pt"] == 0.5
+    assert reader.selection.efficiencies()["total"] == 0.5
+
+    reader = ReaderLHEF(filename, wgt_idx=0, validate="none").filter(min_pt=100.)
+    batches = list(reader.iter_batches(4))
+    assert [len(b) for b in batches] == [2, 1]
+    assert list(EventBatch.concatenate(batches).wgt) == [1., 3., 5.]
+    assert reader.selection.n_total == reader.n_events == 6
+
+    # events read ahead by next are not lost when switching to batches
+    reader = ReaderLHEF(filename, wgt_idx=0, validate="none").filter(min_pt=100.)
+    assert next(reader).wgt == 1.
+    batches = list(reader.iter_batches(1))
+    assert [b.wgt[0] for b in batches] == [3., 5.]
+    assert reader.selection.n_total == reader.n_events == 6
+    reader = ReaderLHEF(filename, wgt_idx=0, validate="none").filter(min_pt=100.)
+    next(reader)
+    assert list(reader.read_batch(10).wgt) == [3., 5.]
+
+    reader = ReaderLHEF(filename, wgt_idx=0, validate="none", selection=Selection(min_pt=1E3))
+    assert list(reader) == []
+    assert len(reader.read_batch(10)) == 0
+
+    parallel = ParallelReader([filename], workers=2, chunks_per_file=2, wgt_idx=0,
+                              validate="none", selection=Selection(min_pt=100.))
+    assert parallel.map_reduce(batch_weights, batch_size=2) == [1., 3., 5.]
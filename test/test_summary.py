@@ -0,0 +1,93 @@
+import pytest
+import numpy as np
+from EventPlotter import ReaderLHEF, ReaderHepMC3, Selection, WeightSummary, summarise
+from .samples import lhe_text, event_block, write_hepmc
+
+
+def write_processes(path, n_events: int = 6):
+    """
+    Writes an LHE file whose every third event belongs to process 2 and has
+    a negative weight.
+    """
+    text = lhe_text(0)
+    blocks = []
+    for idx in range(n_events):
+        block = event_block(idx)
+        if (idx % 3 == 2):
+            wgt = "{:.6e}".format(float(idx + 1))
+            block = block.replace(" 1 {} ".format(wgt), " 2 -{} ".format(wgt), 1)
+        blocks.append(block)
+    path.write_text(text.replace("</LesHouchesEvents>", "".join(blocks) + "</LesHouchesEvents>"))
+    return str(path)
+
+
+def test_summary(tmp_path):
+    filename = write_processes(tmp_path / "sample.lhe")
+    summary = WeightSummary().read(ReaderLHEF(filename), chunk_size=4)
+    assert len(summary) == 6
+    assert summary.sumw == pytest.approx(3.) and summary.sumw2 == pytest.approx(91.)
+    assert summary.sumw_negative == pytest.approx(-9.)
+    assert summary.n_eff == pytest.approx(9. / 91.)
+    assert summary.negative_fraction == pytest.approx(1. / 3.)
+    assert summary.process_counts() == {1: 4, 2: 2}
+
+    xsec, error = summary.cross_section()
+    assert xsec == pytest.approx(0.5) and error == pytest.approx(np.sqrt(91. - 1.5) / 6.)
+    assert summary.cross_section("sum")[0] == pytest.approx(3.)
+    per_process = summary.process_cross_sections()
+    assert per_process[1][0] == pytest.approx(2.) and per_process[2][0] == pytest.approx(-1.5)
+    assert summary.init_cross_section() == pytest.approx((12.5, 0.5))
+    assert summary.as_dict()["process_counts"] == {1: 4, 2: 2}
+
+    # the selected weight is summarised instead of XWGTUP
+    summary = WeightSummary().read(ReaderLHEF(filename, wgt_idx=2))
+    assert summary.sumw == pytest.approx(3. * 21.) and summary.n_negative == 0
+
+
+def test_summary_hepmc(tmp_path):
+    filename = write_hepmc(tmp_path / "sample.hepmc", n_events=4)
+    summary = WeightSummary().read(ReaderHepMC3(filename))
+    assert summary.sumw == pytest.approx(10.) and summary.process_counts() == {0: 4}
+    assert summary.init_cross_section() == (0., 0.)
+    summary = WeightSummary().read(ReaderHepMC3(filename, wgt_idx=1))
+    assert summary.sumw == pytest.approx(20.)
+
+
+def test_summarise(tmp_path):
+    lhe = write_processes(tmp_path / "sample.lhe", n_events=20)
+    hepmc = write_hepmc(tmp_path / "sample.hepmc", n_events=10)
+    control = WeightSummary().read(ReaderLHEF(lhe)).merge(WeightSummary().read(ReaderHepMC3(hepmc)))
+
+    for workers in (1, 2):
+        summary = summarise([lhe, hepmc], workers=workers, chunks_per_file=3, chunk_size=3)
+        assert summary.n_events == 30 and summary.n_negative == control.n_negative
+        assert summary.sumw == pytest.approx(control.sumw)
+        assert summary.sumw2 == pytest.approx(control.sumw2)
+        assert summary.process_counts() == control.process_counts()
+        assert list(summary.init_processes) == [lhe]
+
+    total = summarise(lhe, chunks_per_file=2) + summarise(hepmc)
+    assert total.process_counts() == control.process_counts()
+
+
+def test_stable_sums():
+    summary = WeightSummary()
+    for wgt in (1E16, 1., -1E16):
+        summary.fill([0], [wgt])
+    assert summary.sumw == 1.
+
+    other = WeightSummary().fill([1, 1], [1E16, 1.])
+    merged = WeightSummary().fill([1], [-1E16]).merge(other)
+    assert merged.sumw == 1. and merged.process_cross_sections("sum")[1][0] == 1.
+
+
+def test_summary_errors(tmp_path):
+    filename = write_processes(tmp_path / "sample.lhe")
+    with pytest.raises(ValueError):
+        WeightSummary().fill([1, 2], [1.])
+    with pytest.raises(ValueError):
+        WeightSummary().read(ReaderLHEF(filename, selection=Selection(min_pt=10.)))
+    with pytest.raises(ValueError):
+        WeightSummary().read(ReaderLHEF(filename, wgt_idx=5))
+    with pytest.raises(ValueError):
+        WeightSummary().cross_section("median")